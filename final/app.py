@@ -1,18 +1,61 @@
+import importlib
+import time
 import streamlit as st
-import os
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from dotenv import load_dotenv
-import psycopg2
 from utils.db import init_db, get_db_connection
 from utils.theme import apply_theme_aware_styles, get_theme_colors
-from views.landing import show_landing_page
-from views.auth import show_auth_page
-from views.dashboard import show_dashboard
-from views.tasks import show_tasks
-from views.focus import show_focus
-from views.vision_board import show_vision_board
-from views.assistant import show_assistant
-from views.rewards import show_rewards_page, show_reward_notification
-from models.rewards import Reward
+from utils.sessions import resume_session, end_session, sync_session_cookie
+from utils.email_outbox import start_sender
+from utils.ai_jobs import start_workers
+from utils.metrics import rerun_seconds, record_session, start_metrics_server
+from utils.profiling import PROFILING_ENABLED, profile_rerun
+from utils.session_state import SESSION_STATE_PANEL, compact_on_navigation, sample_session_state
+from utils.tracing import TRACE_PANEL, span, start_trace
+
+# Views are imported on first navigation so a page only pays for its own
+# dependencies (the landing page never loads the Gemini SDK, pandas or passlib)
+PAGES = {
+    "landing": ("views.landing", "show_landing_page"),
+    "auth": ("views.auth", "show_auth_page"),
+    "dashboard": ("views.dashboard", "show_dashboard"),
+    "tasks": ("views.tasks", "show_tasks"),
+    "focus": ("views.focus", "show_focus"),
+    "vision_board": ("views.vision_board", "show_vision_board"),
+    "assistant": ("views.assistant", "show_assistant"),
+    "rewards": ("views.rewards", "show_rewards_page"),
+}
+
+def show_page(page):
+    """Import a page's view module on first use and render it"""
+    module_name, function_name = PAGES[page]
+    # Drop the state of the page being left before this one loads its own
+    navigated = compact_on_navigation(page)
+    # importlib caches modules in sys.modules, so later reruns skip the import
+    module = importlib.import_module(module_name)
+    start = time.perf_counter()
+    try:
+        with span(f"page {page}"):
+            getattr(module, function_name)()
+    finally:
+        # st.rerun() ends a page by raising, so time it in finally
+        rerun_seconds.observe(time.perf_counter() - start, page=page)
+        # Measure what the session holds once the page has loaded its state
+        ctx = get_script_run_ctx()
+        if ctx is not None:
+            sample_session_state(ctx.session_id, force=navigated)
+
+@st.cache_resource(show_spinner=False)
+def init_db_once():
+    """Create tables once per server process instead of on every rerun"""
+    init_db()
+    # Deliver any email left in the outbox by a previous run
+    start_sender()
+    # Pick up AI jobs left pending, retrying or stale-running by a previous run
+    start_workers()
+    # Serve /metrics if METRICS_PORT is set
+    start_metrics_server()
+    return True
 
 # Set up page configuration before any other Streamlit commands
 st.set_page_config(
@@ -35,7 +78,7 @@ is_dark_theme = apply_theme_aware_styles()
 theme_colors = get_theme_colors()
 
 # Initialize the database once
-init_db()  # This will handle both main DB and rewards table initialization
+init_db_once()
 
 # Initialize session state variables if they don't exist
 if 'user_id' not in st.session_state:
@@ -70,6 +113,23 @@ def main():
     if 'new_rewards' not in st.session_state:
         st.session_state.new_rewards = []
 
+    # Counted for the active session and running focus timer gauges
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        record_session(ctx.session_id, st.session_state.get("timer_running", False))
+
+    # After a refresh or in a new tab, pick up the login from the session cookie
+    if not st.session_state.authenticated:
+        user_id = resume_session()
+        if user_id:
+            st.session_state.user_id = user_id
+            st.session_state.authenticated = True
+            if st.session_state.current_page in ("landing", "auth"):
+                st.session_state.current_page = "dashboard"
+
+    # Write any cookie change queued by login, resume or logout
+    sync_session_cookie()
+
     # Check if we need to redirect to rewards page after earning a badge
     if st.session_state.get('redirect_to_rewards', False) and st.session_state.authenticated:
         st.session_state.redirect_to_rewards = False  # Clear the flag
@@ -88,13 +148,13 @@ def main():
     # Show appropriate page based on authentication and current_page
     if not st.session_state.authenticated:
         if st.session_state.current_page == "landing":
-            show_landing_page()
+            show_page("landing")
         elif st.session_state.current_page == "auth":
-            show_auth_page()
+            show_page("auth")
         else:
             # Default to landing page
             st.session_state.current_page = "landing"
-            show_landing_page()
+            show_page("landing")
     else:
         # User is authenticated, show dashboard and sidebar
         with st.sidebar:
@@ -146,27 +206,38 @@ def main():
                     del st.session_state.assistant_messages
                 if "chat_history" in st.session_state:
                     del st.session_state.chat_history
+                if "assistant_conversation_id" in st.session_state:
+                    del st.session_state.assistant_conversation_id
                 
+                end_session()
                 st.session_state.authenticated = False
                 st.session_state.user_id = None
                 st.session_state.current_page = "landing"
                 st.rerun()
         
         # Render the selected page
-        if st.session_state.current_page == "dashboard":
-            show_dashboard()
-        elif st.session_state.current_page == "tasks":
-            show_tasks()
-        elif st.session_state.current_page == "focus":
-            show_focus()
-        elif st.session_state.current_page == "vision_board":
-            show_vision_board()
-        elif st.session_state.current_page == "assistant":
-            show_assistant()
-        elif st.session_state.current_page == "rewards":
-            show_rewards_page()
+        if st.session_state.current_page in PAGES and st.session_state.current_page not in ("landing", "auth"):
+            show_page(st.session_state.current_page)
         else:
-            show_dashboard()  # Default to dashboard
+            show_page("dashboard")  # Default to dashboard
+
+    # Latency breakdown of recent reruns, for debugging only: it lists every session's traces
+    if TRACE_PANEL:
+        from views.traces import show_trace_panel
+        show_trace_panel()
+    # Size of this session's state per key, and every session's total in this process
+    if SESSION_STATE_PANEL:
+        from views.session_state import show_session_state_panel
+        show_session_state_panel()
 
 if __name__ == "__main__":
-    main()
+    # One trace per rerun; db, AI, SMTP and image spans nest under it
+    with start_trace(f"rerun {st.session_state.current_page}", page=st.session_state.current_page,
+                     user_id=st.session_state.user_id):
+        if PROFILING_ENABLED:
+            # Profiles are grouped by the page the rerun started on
+            with profile_rerun(st.session_state.current_page, st.session_state.user_id,
+                               st.query_params.get("profile")):
+                main()
+        else:
+            main()
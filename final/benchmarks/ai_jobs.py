@@ -0,0 +1,96 @@
+"""
+Throughput of the background AI job queue with the fake AI provider.
+
+Creates a throwaway user with a few tasks, queues subtask and action plan jobs
+for each of them and reports how long the queue takes to drain compared with
+running the same generations one after another in the script thread, as the
+Tasks page used to. Needs the same database settings as the app; no API key.
+
+Run from the project root: python benchmarks/ai_jobs.py
+"""
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Must be set before utils.ai creates its provider
+os.environ.setdefault("AI_PROVIDER", "fake")
+
+from utils import ai, ai_jobs
+from utils.db import init_db, get_db_connection, add_new_task, get_active_ai_jobs, pop_finished_ai_jobs
+
+TASK_COUNT = 8
+TIMEOUT_SECONDS = 120
+
+def create_benchmark_user():
+    """Create a user and list for the run and return (user_id, list_id)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO users (first_name, last_name, email, password_hash) VALUES (%s, %s, %s, %s) RETURNING id",
+        ("Bench", "Mark", f"ai-jobs-{uuid.uuid4().hex}@example.com", "not-a-real-hash")
+    )
+    user_id = cursor.fetchone()["id"]
+    cursor.execute("INSERT INTO lists (user_id, name) VALUES (%s, %s) RETURNING id", (user_id, "Benchmark"))
+    list_id = cursor.fetchone()["id"]
+    conn.commit()
+    conn.close()
+    return user_id, list_id
+
+def delete_benchmark_user(user_id):
+    """Remove the user and everything that cascades from it"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+    conn.commit()
+    conn.close()
+
+def drain_queue(user_id, task_ids):
+    """Queue subtasks and a plan for every task and return (seconds, finished jobs)"""
+    start = time.perf_counter()
+    for index, task_id in enumerate(task_ids):
+        # Unique names so the response cache doesn't answer for the provider
+        task_name = f"Benchmark task {index} {uuid.uuid4().hex}"
+        ai_jobs.enqueue_job(user_id, task_id, "subtasks", task_name=task_name)
+        ai_jobs.enqueue_job(user_id, task_id, "action_plan", task_name=task_name, subtasks=[])
+    enqueue_seconds = time.perf_counter() - start
+
+    finished = []
+    while get_active_ai_jobs(user_id):
+        if time.perf_counter() - start > TIMEOUT_SECONDS:
+            print("Timed out waiting for the queue to drain")
+            break
+        time.sleep(0.05)
+    finished.extend(pop_finished_ai_jobs(user_id))
+    return enqueue_seconds, time.perf_counter() - start, finished
+
+def generation_seconds():
+    """Time one uncached generation takes with the configured provider"""
+    start = time.perf_counter()
+    ai.generate_subtasks(f"Timing {uuid.uuid4().hex}", use_cache=False)
+    return time.perf_counter() - start
+
+def main():
+    """Print queue drain time against the old blocking flow"""
+    init_db()
+    user_id, list_id = create_benchmark_user()
+    try:
+        task_ids = [add_new_task(list_id, user_id, f"Benchmark task {i}") for i in range(TASK_COUNT)]
+        enqueue_seconds, drain_seconds, finished = drain_queue(user_id, task_ids)
+
+        failed = [job for job in finished if job["status"] == "failed"]
+        per_generation = generation_seconds()
+        blocking_seconds = 2 * TASK_COUNT * per_generation
+
+        print(f"jobs: {len(finished)} finished, {len(failed)} failed, "
+              f"{ai_jobs.MAX_CONCURRENT_JOBS} workers, {per_generation:.2f}s per generation")
+        print(f"time the page was blocked enqueueing: {enqueue_seconds * 1000:.1f}ms "
+              f"(previously {blocking_seconds:.1f}s of generation in the script thread)")
+        print(f"queue drained in {drain_seconds:.2f}s, {len(finished) / drain_seconds:.1f} jobs/s")
+    finally:
+        delete_benchmark_user(user_id)
+
+if __name__ == "__main__":
+    main()
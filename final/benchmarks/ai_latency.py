@@ -0,0 +1,107 @@
+"""
+Latency of the first assistant turn against a local fake Gemini model.
+
+Compares the old flow, which sent the system prompt as its own chat message
+before the user's prompt, with the shared model and system instruction in
+utils/ai. No network access or API key is needed.
+
+Run from the project root: python benchmarks/ai_latency.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google.generativeai as genai
+from utils import ai, ai_providers
+
+# Simulated provider costs
+ROUND_TRIP_SECONDS = 0.25
+SECONDS_PER_INPUT_TOKEN = 0.0002
+ITERATIONS = 20
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeChat:
+    """Chat session that sleeps like a remote model call"""
+
+    def __init__(self, system_instruction, history):
+        self.system_instruction = system_instruction or ""
+        self.history = list(history)
+
+    def send_message(self, prompt):
+        # Every call resends the system instruction and the whole history
+        input_tokens = len(self.system_instruction.split()) + len(prompt.split())
+        input_tokens += sum(len(message.split()) for message in self.history)
+        time.sleep(ROUND_TRIP_SECONDS + input_tokens * SECONDS_PER_INPUT_TOKEN)
+        reply = f"Here is some productivity advice about: {prompt[:40]}"
+        self.history.extend([prompt, reply])
+        return FakeResponse(reply)
+
+class FakeGenerativeModel:
+    """Stand-in for genai.GenerativeModel"""
+
+    def __init__(self, model_name, system_instruction=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    def start_chat(self, history=None):
+        return FakeChat(self.system_instruction, history or [])
+
+    def generate_content(self, prompt, generation_config=None):
+        return FakeChat(self.system_instruction, []).send_message(prompt)
+
+def legacy_first_turn(prompt):
+    """The previous flow: new model per call, system prompt sent as its own message"""
+    model = FakeGenerativeModel(ai.ASSISTANT_MODEL)
+    chat = model.start_chat(history=[])
+    chat.send_message(ai.ASSISTANT_SYSTEM_PROMPT)
+    return chat.send_message(prompt).text
+
+def current_first_turn(prompt):
+    """The current flow through utils/ai"""
+    text, _, error = ai.get_ai_assistant_response(prompt)
+    if error:
+        raise RuntimeError(error)
+    return text
+
+def measure(turn):
+    """Return per-call latencies in seconds"""
+    timings = []
+    for i in range(ITERATIONS):
+        start = time.perf_counter()
+        turn(f"How do I stop procrastinating on report {i}?")
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def model_construction_cost(iterations=200):
+    """Average cost of building a real GenerativeModel, which the old code paid on every call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        genai.GenerativeModel(ai.ASSISTANT_MODEL, system_instruction=ai.ASSISTANT_SYSTEM_PROMPT)
+    return (time.perf_counter() - start) / iterations
+
+def main():
+    """Print latency for both flows"""
+    construction = model_construction_cost()
+
+    # Route the Gemini provider through the fake model
+    provider = ai_providers.GeminiProvider(api_key="fake-key")
+    provider._configured = True
+    ai_providers.genai.GenerativeModel = FakeGenerativeModel
+    ai.set_provider(provider)
+
+    for name, turn in (("legacy (system prompt as message)", legacy_first_turn),
+                       ("shared model + system instruction", current_first_turn)):
+        timings = measure(turn)
+        print(f"{name:<36} p50 {statistics.median(timings) * 1000:7.1f}ms  "
+              f"max {max(timings) * 1000:7.1f}ms")
+
+    print(f"GenerativeModel construction (real SDK): {construction * 1e6:.1f} µs per call")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Concurrent load check for the outbound AI call limits in utils/ai.
+
+Runs three scenarios against the fake AI provider and prints what the provider
+saw alongside the limiter's queued-wait metrics:
+
+1. Many sessions request subtasks for the same task at once. Single-flight
+   should turn them into one provider call.
+2. A burst of distinct requests. The provider should never see more calls at
+   once than the concurrency cap, or more than the token bucket allows.
+3. A burst that can't be served within the maximum queue wait. The excess
+   should be rejected with a friendly error instead of reaching the provider.
+
+Exits with status 1 if any check fails. No network access, API key or
+database is needed.
+
+Run from the project root: python benchmarks/ai_limits.py
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import ai
+from utils.ai_limits import AILimiter, SingleFlight
+from utils.ai_providers import FakeProvider
+
+LATENCY_SECONDS = 0.2
+
+class CountingProvider(FakeProvider):
+    """Fake provider that records how many calls it receives and how many overlap"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate(self, model_name, prompt, system_instruction=None, response_schema=None):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return super().generate(model_name, prompt, system_instruction, response_schema)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+def reset(limiter):
+    """Install a fresh provider, limiter and single-flight group"""
+    provider = CountingProvider(latency=LATENCY_SECONDS, tokens_per_second=0)
+    ai.set_provider(provider)
+    ai.set_limiter(limiter)
+    ai._single_flight = SingleFlight()
+    return provider
+
+def run_concurrently(count, call):
+    """Run call(i) on count threads at once and return the results and wall time"""
+    barrier = threading.Barrier(count)
+
+    def worker(i):
+        barrier.wait()
+        return call(i)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        results = list(executor.map(worker, range(count)))
+    return results, time.perf_counter() - start
+
+def format_stats(stats):
+    waits = [stats[name] for name in ("wait_p50", "wait_p95", "wait_max")]
+    waits = "/".join(f"{(wait or 0) * 1000:.0f}" for wait in waits)
+    return (f"calls {stats['calls']}, queued {stats['queued']}, rejected {stats['rejected']}, "
+            f"coalesced {stats['coalesced']}, peak in flight {stats['peak_in_flight']}, "
+            f"queued wait p50/p95/max {waits}ms")
+
+def check(name, passed, failures):
+    print(f"  [{'ok' if passed else 'FAIL'}] {name}")
+    if not passed:
+        failures.append(name)
+
+def identical_requests(failures):
+    sessions = 50
+    provider = reset(AILimiter(requests_per_minute=600, burst=20, max_concurrent=8, max_wait_seconds=10))
+    results, seconds = run_concurrently(sessions, lambda i: ai.generate_subtasks("Clean the garage", use_cache=False))
+
+    print(f"\n1. {sessions} sessions ask for the same subtasks ({seconds * 1000:.0f}ms)")
+    print(f"  provider calls {provider.calls}; {format_stats(ai.get_limiter_stats())}")
+    check("one provider call", provider.calls == 1, failures)
+    check("every session got the subtasks", all(subtasks and not error for subtasks, error in results), failures)
+
+def distinct_burst(failures):
+    requests, cap, per_minute, burst = 40, 4, 600, 10
+    provider = reset(AILimiter(requests_per_minute=per_minute, burst=burst, max_concurrent=cap, max_wait_seconds=30))
+    results, seconds = run_concurrently(requests, lambda i: ai.generate_subtasks(f"Task number {i}", use_cache=False))
+
+    # The bucket allows the burst up front, then refills at the configured rate
+    min_seconds = (requests - burst) / (per_minute / 60)
+    print(f"\n2. burst of {requests} distinct requests, cap {cap}, {per_minute}/min with burst {burst} ({seconds:.2f}s)")
+    print(f"  provider calls {provider.calls}, provider peak concurrency {provider.peak_in_flight}; "
+          f"{format_stats(ai.get_limiter_stats())}")
+    check(f"provider never saw more than {cap} calls at once", provider.peak_in_flight <= cap, failures)
+    check(f"burst spread over at least {min_seconds:.1f}s", seconds >= min_seconds * 0.95, failures)
+    check("no request failed", all(not error for _, error in results), failures)
+
+def overload(failures):
+    requests, max_wait = 30, 0.5
+    provider = reset(AILimiter(requests_per_minute=60, burst=5, max_concurrent=5, max_wait_seconds=max_wait))
+    results, seconds = run_concurrently(requests, lambda i: ai.generate_subtasks(f"Overload task {i}", use_cache=False))
+
+    errors = [error for _, error in results if error]
+    stats = ai.get_limiter_stats()
+    print(f"\n3. overload: {requests} requests, 60/min with burst 5, {max_wait}s max wait ({seconds:.2f}s)")
+    print(f"  provider calls {provider.calls}, errors {len(errors)}; {format_stats(stats)}")
+    if errors:
+        print(f"  example error: {errors[0]}")
+    check("excess requests were rejected", stats["rejected"] > 0 and len(errors) == stats["rejected"], failures)
+    check("rejected requests never reached the provider", provider.calls == requests - len(errors), failures)
+    check(f"nobody waited longer than {max_wait}s in the queue", (stats["wait_max"] or 0) <= max_wait + 0.05, failures)
+
+def main():
+    failures = []
+    identical_requests(failures)
+    distinct_burst(failures)
+    overload(failures)
+
+    print(f"\n{'all checks passed' if not failures else f'{len(failures)} check(s) failed'}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
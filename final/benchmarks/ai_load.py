@@ -0,0 +1,102 @@
+"""
+Load test of the assistant, subtask and action plan paths against the fake AI provider.
+
+Each simulated user runs a streamed assistant turn, a subtask generation and
+an action plan generation in a loop. The script reports p50/p95 latency per
+path and overall throughput at each concurrency level. The response cache is
+bypassed so every call reaches the provider. No network access, API key or
+database is needed.
+
+Run from the project root: python benchmarks/ai_load.py
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import ai
+from utils.ai_limits import AILimiter
+from utils.ai_providers import FakeProvider
+
+# Simulated provider: fixed round trip plus a streaming token rate
+LATENCY_SECONDS = float(os.getenv("AI_FAKE_LATENCY", "0.2"))
+TOKENS_PER_SECOND = float(os.getenv("AI_FAKE_TOKENS_PER_SECOND", "200"))
+
+# Outbound limits applied during the run; the production defaults come from AI_* variables
+REQUESTS_PER_MINUTE = float(os.getenv("AI_REQUESTS_PER_MINUTE", "6000"))
+MAX_CONCURRENT_CALLS = int(os.getenv("AI_MAX_CONCURRENT_CALLS", "16"))
+
+CONCURRENT_USERS = [1, 4, 16, 32]
+ITERATIONS_PER_USER = 3
+
+def assistant_turn(user, iteration):
+    result = {}
+    for _ in ai.stream_ai_assistant_response(f"User {user} question {iteration}: how do I focus?", [], result):
+        pass
+    return result["error"]
+
+def subtasks(user, iteration):
+    _, error = ai.generate_subtasks(f"Write report {user}-{iteration}", use_cache=False)
+    return error
+
+def action_plan(user, iteration):
+    _, error = ai.generate_action_plan(f"Write report {user}-{iteration}", subtasks=["Outline", "Draft"], use_cache=False)
+    return error
+
+PATHS = {
+    "assistant": assistant_turn,
+    "subtasks": subtasks,
+    "action_plan": action_plan,
+}
+
+def simulate_user(user, timings, errors, lock):
+    """Run every path ITERATIONS_PER_USER times, recording latencies"""
+    for iteration in range(ITERATIONS_PER_USER):
+        for path, call in PATHS.items():
+            start = time.perf_counter()
+            error = call(user, iteration)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if error:
+                    errors.append(error)
+                else:
+                    timings[path].append(elapsed)
+
+def run_level(users):
+    """Run one concurrency level and return (timings per path, errors, wall seconds)"""
+    timings = {path: [] for path in PATHS}
+    errors = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        for user in range(users):
+            executor.submit(simulate_user, user, timings, errors, lock)
+    return timings, errors, time.perf_counter() - start
+
+def main():
+    """Print latency percentiles and throughput per concurrency level"""
+    ai.set_provider(FakeProvider(latency=LATENCY_SECONDS, tokens_per_second=TOKENS_PER_SECOND))
+
+    print(f"fake provider: {LATENCY_SECONDS * 1000:.0f}ms round trip, {TOKENS_PER_SECOND:.0f} tokens/s; "
+          f"limits: {REQUESTS_PER_MINUTE:.0f}/min, {MAX_CONCURRENT_CALLS} concurrent calls\n")
+    print(f"{'users':>5}  {'path':<12}{'p50':>9}{'p95':>9}{'calls':>7}  {'throughput':>12}  errors")
+    for users in CONCURRENT_USERS:
+        ai.set_limiter(AILimiter(requests_per_minute=REQUESTS_PER_MINUTE, burst=MAX_CONCURRENT_CALLS * 2,
+                                 max_concurrent=MAX_CONCURRENT_CALLS))
+        timings, errors, wall_seconds = run_level(users)
+        calls = sum(len(samples) for samples in timings.values())
+        for index, (path, samples) in enumerate(timings.items()):
+            p50 = ai._percentile(samples, 50) or 0
+            p95 = ai._percentile(samples, 95) or 0
+            summary = f"{calls / wall_seconds:>8.1f}/s  {len(errors):>6}" if index == 0 else ""
+            print(f"{users if index == 0 else '':>5}  {path:<12}{p50 * 1000:>7.0f}ms{p95 * 1000:>7.0f}ms"
+                  f"{len(samples):>7}  {summary}")
+        stats = ai.get_limiter_stats()
+        print(f"{'':>5}  queued {stats['queued']} of {stats['calls']} calls, "
+              f"queued wait p95 {(stats['wait_p95'] or 0) * 1000:.0f}ms")
+
+if __name__ == "__main__":
+    main()
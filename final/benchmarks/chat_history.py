@@ -0,0 +1,91 @@
+"""
+Prompt size and latency of assistant turns as a conversation grows.
+
+Plays the same scripted conversation twice against the fake AI provider: once
+resending the full history every turn, as the assistant used to, and once
+through the bounded history manager in utils/ai. The fake charges time for
+every input token, so latency follows prompt size. No network access or API
+key is needed.
+
+Run from the project root: python benchmarks/chat_history.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import ai
+from utils.ai_limits import AILimiter
+from utils.ai_providers import FakeProvider
+
+# Simulated provider costs
+ROUND_TRIP_SECONDS = 0.05
+SECONDS_PER_INPUT_TOKEN = 0.00005
+
+CONVERSATION_LENGTHS = [5, 10, 20, 40, 80]
+
+provider = FakeProvider(latency=ROUND_TRIP_SECONDS, tokens_per_second=0,
+                        seconds_per_input_token=SECONDS_PER_INPUT_TOKEN)
+
+def user_prompt(turn):
+    """A scripted user message"""
+    return f"Turn {turn}: I keep putting off my quarterly report. How should I plan tomorrow morning so I actually start it?"
+
+def stream_turn(prompt, history):
+    """Send one prompt through the streaming path and return (result, seconds)"""
+    result = {}
+    start = time.perf_counter()
+    for _ in ai.stream_ai_assistant_response(prompt, history, result):
+        pass
+    if result["error"]:
+        raise RuntimeError(result["error"])
+    return result, time.perf_counter() - start
+
+def run_unbounded(turns):
+    """Resend the whole history every turn, as before; return (last prompt tokens, mean seconds, summary calls)"""
+    history = []
+    timings = []
+    for turn in range(turns):
+        result, seconds = stream_turn(user_prompt(turn), history)
+        history = result["history"]
+        timings.append(seconds)
+    return provider.input_tokens[-1], sum(timings) / len(timings), 0
+
+def run_managed(turns):
+    """Use the bounded history; return (last prompt tokens, mean seconds including summaries, summary calls)"""
+    history = ai.new_chat_history()
+    timings = []
+    summary_calls = 0
+    last_prompt_tokens = 0
+    for turn in range(turns):
+        prompt = user_prompt(turn)
+        result, seconds = stream_turn(prompt, ai.build_chat_history(history))
+        last_prompt_tokens = provider.input_tokens[-1]
+
+        calls_before = len(provider.input_tokens)
+        start = time.perf_counter()
+        ai.record_chat_turn(history, prompt, result["text"])
+        summary_calls += len(provider.input_tokens) - calls_before
+        timings.append(seconds + time.perf_counter() - start)
+    return last_prompt_tokens, sum(timings) / len(timings), summary_calls
+
+def main():
+    """Print prompt size and latency per conversation length"""
+    ai.set_provider(provider)
+    # Measure prompt size, not the production rate limits
+    ai.set_limiter(AILimiter(requests_per_minute=60000, burst=1000))
+
+    print(f"{'turns':>5}  {'full history':>26}  {'managed history':>38}")
+    print(f"{'':>5}  {'last prompt':>12}{'mean turn':>14}  {'last prompt':>12}{'mean turn':>14}{'summaries':>12}")
+    for turns in CONVERSATION_LENGTHS:
+        full_tokens, full_seconds, _ = run_unbounded(turns)
+        managed_tokens, managed_seconds, summaries = run_managed(turns)
+        print(f"{turns:>5}  {full_tokens:>9} tok{full_seconds * 1000:>12.0f}ms  "
+              f"{managed_tokens:>9} tok{managed_seconds * 1000:>12.0f}ms{summaries:>12}")
+
+    print(f"\nBudget: {ai.HISTORY_KEEP_TURNS} verbatim turns, {ai.HISTORY_TOKEN_BUDGET} history tokens, "
+          f"{ai.SUMMARY_TOKEN_BUDGET} summary tokens")
+
+if __name__ == "__main__":
+    main()
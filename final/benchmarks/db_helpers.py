@@ -0,0 +1,340 @@
+"""
+Latency and round trips of every database helper at small, medium and huge
+tenant sizes, with a baseline to catch regressions.
+
+For each size, a fresh synthetic tenant is seeded (see benchmarks/seed.py).
+Every read and write helper in utils/db.py and models/ is then called
+ITERATIONS times against it. Reported per helper: p50 and p95 latency, and
+statements plus connections per call, taken from utils.db_stats. Writes
+that consume rows (deletes) get fresh rows created before timing starts.
+The tenants are deleted afterwards unless --keep is given.
+
+--save-baseline writes the results as JSON. --compare reads a baseline and
+exits with status 1 if any helper got more than --tolerance slower at p50
+(and by at least 1 ms, to ignore noise) or now makes more round trips.
+Round-trip counts do not depend on the machine, but latency does, so
+compare against a baseline taken on the same machine.
+
+The queue helpers claim whatever work is due, not just the benchmark's, so
+this refuses to run unless BENCHMARK_DATABASE_URL points at a database of
+its own; it is used in place of DATABASE_URL. Even there, only jobs and
+emails the benchmark made are completed or deleted, and its leftover outbox
+emails are removed afterwards.
+
+Run from the project root: python benchmarks/db_helpers.py --sizes small medium
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if __name__ == "__main__":
+    if not os.getenv("BENCHMARK_DATABASE_URL"):
+        sys.exit("Set BENCHMARK_DATABASE_URL to a database used only for benchmarks; "
+                 "this claims and deletes queued AI jobs and emails.")
+    os.environ["DATABASE_URL"] = os.environ["BENCHMARK_DATABASE_URL"]
+
+from benchmarks.seed import TENANT_SIZES, delete_tenants, prepare_database, seed_tenant
+from utils import db, db_stats
+from models.conversation import Conversation
+from models.focus_session import FocusSession
+from models.login_session import LoginSession
+from models.rewards import Reward
+from models.task import Task
+from models.user import User
+from models.vision_board import VisionBoard
+
+ITERATIONS = 20
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "db_helpers_baseline.json")
+# p50 differences smaller than this are noise
+NOISE_SECONDS = 0.001
+
+def case(name, run, prepare=None):
+    """A benchmark case: run(i, prepared_value) is timed; prepare(n) makes n untimed inputs first"""
+    return name, run, prepare
+
+def build_cases(t, created):
+    """Every helper, called the way the pages call it, against tenant t; outbox ids it makes go in created"""
+    uid = t["user_id"]
+    list_id = t["list_ids"][0]
+    tasks = db.get_tasks_for_list(list_id, uid)
+    task_id = tasks[0]["id"]
+    task_name = tasks[0]["name"]
+    neighbours = [task["id"] for task in tasks[1:3]]
+    tile_ids = t["tile_ids"]
+    cid = t["conversation_id"]
+    token = uuid.uuid4().hex * 2
+    ai_cache_key = f"bench-{uuid.uuid4().hex}"
+    state = {"jobs": [], "emails": [], "flow_version": db.get_focus_flow_state(uid)["version"]}
+
+    def new_tasks(n):
+        return [db.add_new_task(list_id, uid, f"Scratch {i}") for i in range(n)]
+
+    def new_tiles(n):
+        return [db.add_vision_board_tile(uid, f"Scratch tile {i}") for i in range(n)]
+
+    def new_conversations(n):
+        return [Conversation.create(uid, "Scratch") for _ in range(n)]
+
+    def new_focus_sessions(n):
+        return [db.save_focus_session(uid, task_id, "pomodoro", 25 * 60, completed=False) for _ in range(n)]
+
+    def link_focus_task(i, _):
+        # Each transition needs the version the previous one returned
+        version = db.transition_focus_flow_state(uid, state["flow_version"], "link", task_id=task_id)
+        if version is not None:
+            state["flow_version"] = version
+
+    def claim_job(i, _):
+        job = db.claim_ai_job(300)
+        if job and job["user_id"] == uid:
+            state["jobs"].append(job["id"])
+
+    def enqueue_email(i, _):
+        created["emails"].append(db.enqueue_email(f"bench-{i}@example.com", "Benchmark", "Body"))
+
+    def claim_emails(i, _):
+        state["emails"].extend(email["id"] for email in db.claim_outbox_emails(10, 300)
+                               if email["id"] in created["emails"])
+
+    return [
+        # Reads
+        case("utils.db.get_all_lists_for_user", lambda i, _: db.get_all_lists_for_user(uid)),
+        case("utils.db.get_list_id_by_name", lambda i, _: db.get_list_id_by_name(uid, "Work")),
+        case("utils.db.get_tasks_for_list", lambda i, _: db.get_tasks_for_list(list_id, uid)),
+        case("utils.db.get_subtasks_for_task", lambda i, _: db.get_subtasks_for_task(task_id)),
+        case("utils.db.get_tasks_without_subtasks", lambda i, _: db.get_tasks_without_subtasks(list_id, uid)),
+        case("utils.db.get_task_statistics", lambda i, _: db.get_task_statistics(uid)),
+        case("utils.db.get_upcoming_tasks", lambda i, _: db.get_upcoming_tasks(uid)),
+        case("utils.db.get_tasks", lambda i, _: db.get_tasks(uid)),
+        case("utils.db.get_task_id_by_name", lambda i, _: db.get_task_id_by_name(uid, task_name)),
+        case("utils.db.get_vision_board_categories", lambda i, _: db.get_vision_board_categories()),
+        case("utils.db.get_user_vision_board_theme", lambda i, _: db.get_user_vision_board_theme(uid)),
+        case("utils.db.get_vision_board_tiles", lambda i, _: db.get_vision_board_tiles(uid)),
+        case("utils.db.load_vision_board_customizations", lambda i, _: db.load_vision_board_customizations(uid)),
+        case("utils.db.get_focus_stats", lambda i, _: db.get_focus_stats(uid)),
+        case("utils.db.get_task_focus_stats", lambda i, _: db.get_task_focus_stats(task_id)),
+        case("utils.db.get_timer_settings", lambda i, _: db.get_timer_settings(uid)),
+        case("utils.db.get_focus_stats_by_list", lambda i, _: db.get_focus_stats_by_list(uid)),
+        case("utils.db.get_unlinked_focus_stats", lambda i, _: db.get_unlinked_focus_stats(uid)),
+        case("utils.db.get_task_focus_stats_for_user", lambda i, _: db.get_task_focus_stats_for_user(uid)),
+        case("utils.db.get_focus_sessions_for_task", lambda i, _: db.get_focus_sessions_for_task(uid, task_id)),
+        case("utils.db.get_recent_focus_sessions", lambda i, _: db.get_recent_focus_sessions(uid)),
+        case("utils.db.get_focus_flow_state", lambda i, _: db.get_focus_flow_state(uid)),
+        case("utils.db.get_daily_task_focus_summary", lambda i, _: db.get_daily_task_focus_summary(uid)),
+        case("utils.db.get_focus_weekday_stats", lambda i, _: db.get_focus_weekday_stats(uid)),
+        case("utils.db.get_ai_cache_entry", lambda i, _: db.get_ai_cache_entry(ai_cache_key, 3600)),
+        case("utils.db.get_active_ai_jobs", lambda i, _: db.get_active_ai_jobs(uid)),
+        case("utils.db.pop_finished_ai_jobs", lambda i, _: db.pop_finished_ai_jobs(uid)),
+        case("models.user.User.get_by_id", lambda i, _: User.get_by_id(uid)),
+        case("models.user.User.get_by_email", lambda i, _: User.get_by_email(t["email"])),
+        case("models.task.Task.get_by_id", lambda i, _: Task.get_by_id(task_id)),
+        case("models.task.Task.get_subtask_count", lambda i, _: Task.get_subtask_count(task_id)),
+        case("models.task.Task.get_subtasks", lambda i, _: Task.get_subtasks(task_id)),
+        case("models.rewards.Reward.get_all_rewards", lambda i, _: Reward.get_all_rewards()),
+        case("models.rewards.Reward.get_user_rewards", lambda i, _: Reward.get_user_rewards(uid)),
+        case("models.rewards.Reward.get_reward_progress", lambda i, _: Reward.get_reward_progress(uid)),
+        case("models.vision_board.VisionBoard.get_tiles", lambda i, _: VisionBoard.get_tiles(uid)),
+        case("models.conversation.Conversation.get_latest", lambda i, _: Conversation.get_latest(uid)),
+        case("models.conversation.Conversation.get_messages", lambda i, _: Conversation.get_messages(cid, uid)),
+        case("models.conversation.Conversation.get_unsummarized_messages",
+             lambda i, _: Conversation.get_unsummarized_messages(cid, uid, 20)),
+
+        # Writes
+        case("utils.db.add_new_list", lambda i, _: db.add_new_list(uid, f"Bench list {i}")),
+        case("utils.db.add_new_task", lambda i, _: db.add_new_task(list_id, uid, f"Bench task {i}")),
+        case("utils.db.update_task", lambda i, _: db.update_task(task_id, name=f"{task_name} ({i})")),
+        case("utils.db.move_task_between", lambda i, _: db.move_task_between(
+            task_id, uid, *(neighbours if i % 2 == 0 else [None, neighbours[0]]))),
+        case("utils.db.add_subtasks_for_task", lambda i, _: db.add_subtasks_for_task(task_id, ["One", "Two", "Three"])),
+        case("utils.db.add_subtasks_for_tasks", lambda i, _: db.add_subtasks_for_tasks(
+            {tid: ["One", "Two"] for tid in t["task_ids"][:5]})),
+        case("utils.db.update_subtask", lambda i, _: db.update_subtask(t["subtask_ids"][0], completed=i % 2 == 0)),
+        case("utils.db.update_vision_board_theme", lambda i, _: db.update_vision_board_theme(uid, "default")),
+        case("utils.db.add_vision_board_tile", lambda i, _: db.add_vision_board_tile(uid, f"Bench tile {i}")),
+        case("utils.db.update_vision_board_tile", lambda i, _: db.update_vision_board_tile(
+            tile_ids[0], uid, title=f"Goal ({i})")),
+        case("utils.db.move_tile_between", lambda i, _: db.move_tile_between(
+            tile_ids[0], uid, *(tile_ids[1:3] if i % 2 == 0 else [None, tile_ids[1]]))),
+        case("utils.db.update_tile_positions", lambda i, _: db.update_tile_positions(
+            {tile_id: position for position, tile_id in enumerate(tile_ids[:20])}, uid)),
+        case("utils.db.save_vision_board_customizations", lambda i, _: db.save_vision_board_customizations(
+            uid, db.load_vision_board_customizations(uid))),
+        case("utils.db.update_focus_stats", lambda i, _: db.update_focus_stats(uid, 25 * 60, 1)),
+        case("utils.db.update_task_focus_stats", lambda i, _: db.update_task_focus_stats(task_id, uid, 25 * 60, 1)),
+        case("utils.db.update_timer_settings", lambda i, _: db.update_timer_settings(uid, 25, 5, 15)),
+        case("utils.db.save_focus_session", lambda i, _: db.save_focus_session(uid, task_id, "pomodoro", 25 * 60)),
+        case("utils.db.transition_focus_flow_state", link_focus_task),
+        case("utils.db.save_ai_cache_entry", lambda i, _: db.save_ai_cache_entry(
+            f"{ai_cache_key}-{i}", "subtasks", "bench", "[]", 3600, 10000)),
+        case("utils.db.enqueue_ai_job", lambda i, _: db.enqueue_ai_job(
+            uid, t["task_ids"][i % len(t["task_ids"])], "subtasks", "{}")),
+        case("utils.db.claim_ai_job", claim_job),
+        case("utils.db.complete_ai_job", lambda i, job_id: db.complete_ai_job(job_id, "[]"),
+             lambda n: (state["jobs"][:n] + [None] * n)[:n]),
+        case("utils.db.enqueue_email", enqueue_email),
+        case("utils.db.claim_outbox_emails", claim_emails),
+        case("utils.db.delete_sent_emails", lambda i, ids: db.delete_sent_emails(ids),
+             lambda n: [state["emails"][i::n] for i in range(n)]),
+        case("models.user.User.update", lambda i, _: User.update(uid, first_name="Seed")),
+        case("models.task.Task.complete_task", lambda i, tid: Task.complete_task(tid, uid), new_tasks),
+        case("models.focus_session.FocusSession.complete_session",
+             lambda i, sid: FocusSession.complete_session(sid, uid), new_focus_sessions),
+        case("models.rewards.Reward.check_and_award_reward",
+             lambda i, _: Reward.check_and_award_reward(uid, "tasks_total", 0)),
+        case("models.vision_board.VisionBoard.add_tile", lambda i, _: VisionBoard.add_tile(uid, f"Model tile {i}")),
+        case("models.conversation.Conversation.create", lambda i, _: Conversation.create(uid, f"Bench {i}")),
+        case("models.conversation.Conversation.append_turn",
+             lambda i, _: Conversation.append_turn(cid, uid, "How do I start?", "Pick the smallest step.")),
+        case("models.conversation.Conversation.save_summary",
+             lambda i, _: Conversation.save_summary(cid, uid, "Summary so far", 10)),
+        case("models.login_session.LoginSession.create",
+             lambda i, _: LoginSession.create(uid, f"{token[:-4]}{i:04d}", 3600)),
+        case("models.login_session.LoginSession.resume",
+             lambda i, _: LoginSession.resume(f"{token[:-4]}{0:04d}", 3600, 60)),
+        case("models.login_session.LoginSession.revoke",
+             lambda i, _: LoginSession.revoke(f"{token[:-4]}{i:04d}")),
+
+        # Deletes, on rows made for them
+        case("utils.db.delete_task", lambda i, tid: db.delete_task(tid), new_tasks),
+        case("utils.db.delete_vision_board_tile", lambda i, tile_id: db.delete_vision_board_tile(tile_id, uid), new_tiles),
+        case("models.conversation.Conversation.delete", lambda i, conv_id: Conversation.delete(conv_id, uid),
+             new_conversations),
+        case("models.login_session.LoginSession.revoke_for_user", lambda i, _: LoginSession.revoke_for_user(uid)),
+        case("utils.db.create_default_lists_for_user", lambda i, _: db.create_default_lists_for_user(uid)),
+        case("utils.db.reset_focus_stats", lambda i, _: db.reset_focus_stats(uid)),
+    ]
+
+def _percentile(ordered, percent):
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+def run_case(name, run, prepare, iterations):
+    """Time one case and count its statements and connections per call"""
+    prepared = prepare(iterations) if prepare else [None] * iterations
+    db_stats.get_query_stats(reset=True)
+    timings = []
+    error = None
+    for i in range(iterations):
+        start = time.perf_counter()
+        try:
+            run(i, prepared[i])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            break
+        timings.append(time.perf_counter() - start)
+    stats = db_stats.get_query_stats(reset=True)
+    calls = max(len(timings), 1)
+    statements = sum(entry["count"] for entry in stats["functions"].values()) / calls
+    connections = sum(entry["count"] for entry in stats["connections"].values()) / calls
+    if not timings:
+        return {"error": error}
+    timings.sort()
+    result = {
+        "p50": _percentile(timings, 50),
+        "p95": _percentile(timings, 95),
+        "statements": round(statements, 2),
+        "connections": round(connections, 2),
+    }
+    if error:
+        result["error"] = error
+    return result
+
+def run_size(size, iterations, rng, keep=False):
+    start = time.perf_counter()
+    tenant = seed_tenant(size, rng)
+    print(f"\n{size}: user {tenant['user_id']}, {len(tenant['task_ids'])} tasks, "
+          f"{len(tenant['subtask_ids'])} subtasks (seeded in {time.perf_counter() - start:.1f}s)")
+    results = {}
+    created = {"emails": []}
+    try:
+        for name, run, prepare in build_cases(tenant, created):
+            results[name] = run_case(name, run, prepare, iterations)
+    finally:
+        # Outbox rows have no user, so they don't go with the tenant
+        db.delete_sent_emails([email_id for email_id in created["emails"] if email_id])
+        if not keep:
+            delete_tenants([tenant["user_id"]])
+    return results
+
+def print_results(size, results, baseline=None):
+    print(f"{'helper':<58} {'p50 ms':>8} {'p95 ms':>8} {'stmts':>6} {'conns':>6}  vs baseline")
+    for name, result in results.items():
+        if "p50" not in result:
+            print(f"{name:<58} {'error: ' + result['error'][:60]}")
+            continue
+        line = (f"{name:<58} {result['p50'] * 1000:>8.2f} {result['p95'] * 1000:>8.2f}"
+                f" {result['statements']:>6g} {result['connections']:>6g}")
+        old = (baseline or {}).get(size, {}).get(name)
+        if old and "p50" in old:
+            line += f"  {(result['p50'] / old['p50'] - 1) * 100:+6.0f}%"
+        if "error" in result:
+            line += f"  (stopped early: {result['error'][:40]})"
+        print(line)
+
+def find_regressions(results_by_size, baseline, tolerance):
+    regressions = []
+    for size, results in results_by_size.items():
+        for name, result in results.items():
+            old = baseline.get(size, {}).get(name)
+            if not old or "p50" not in old:
+                continue
+            if "p50" not in result:
+                regressions.append(f"{size} {name}: now fails ({result['error']})")
+                continue
+            if result["p50"] > old["p50"] * (1 + tolerance) and result["p50"] - old["p50"] > NOISE_SECONDS:
+                regressions.append(f"{size} {name}: p50 {old['p50'] * 1000:.2f} -> {result['p50'] * 1000:.2f} ms")
+            round_trips = result["statements"] + result["connections"]
+            old_round_trips = old["statements"] + old["connections"]
+            if round_trips > old_round_trips:
+                regressions.append(f"{size} {name}: round trips {old_round_trips:g} -> {round_trips:g}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", choices=list(TENANT_SIZES), default=list(TENANT_SIZES))
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the synthetic tenants")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, metavar="PATH")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed p50 slowdown (0.5 = 50%%)")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded tenants")
+    args = parser.parse_args()
+
+    if not db_stats.QUERY_STATS_ENABLED:
+        sys.exit("Round trips are counted by utils.db_stats; unset DB_QUERY_STATS=0 to run this.")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    prepare_database()
+    rng = random.Random(args.seed)
+    results_by_size = {}
+    for size in args.sizes:
+        results_by_size[size] = run_size(size, args.iterations, rng, args.keep)
+        print_results(size, results_by_size[size], baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(results_by_size, f, indent=2, sort_keys=True)
+        print(f"\nsaved baseline to {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = find_regressions(results_by_size, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against {args.compare}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nno regressions against {args.compare}")
+
+if __name__ == "__main__":
+    main()
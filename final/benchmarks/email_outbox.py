@@ -0,0 +1,85 @@
+"""
+Email delivery against a local SMTP stand-in.
+
+Starts an aiosmtpd server on localhost that sleeps HANDSHAKE_SECONDS on every
+EHLO, standing in for a slow mail server. It then sends the same emails two
+ways. The old way opens a new connection per email, the way send_email used
+to. The outbox way sends over one reused SMTPConnection. The delivery
+outcomes (deleting sent rows, retry with backoff, refused recipients) are
+checked by tests/test_email_outbox.py.
+
+Needs aiosmtpd (pip install -r requirements-dev.txt). No database or network
+access is needed.
+
+Run from the project root: python benchmarks/email_outbox.py
+"""
+import asyncio
+import os
+import smtplib
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiosmtpd.controller import Controller
+
+from utils.email_outbox import SMTPConnection, build_message
+
+HOST = "127.0.0.1"
+PORT = 8025
+HANDSHAKE_SECONDS = 0.05
+EMAIL_COUNTS = [1, 10, 50]
+SENDER = "zenflowitapp@example.com"
+
+class SlowHandler:
+    """Accepts mail after a slow EHLO"""
+
+    def __init__(self):
+        self.received = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(HANDSHAKE_SECONDS)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.append(envelope.rcpt_tos[0])
+        return "250 Message accepted for delivery"
+
+def connection():
+    return SMTPConnection(host=HOST, port=PORT, starttls=False, username=SENDER, password=None)
+
+def send_one_per_connection(count):
+    """The old flow: connect, handshake and quit for every email"""
+    for i in range(count):
+        with smtplib.SMTP(HOST, PORT) as server:
+            server.send_message(build_message(f"user{i}@example.com", "Hello", "Body", SENDER))
+
+def send_reused(count):
+    smtp = connection()
+    for i in range(count):
+        smtp.send(build_message(f"user{i}@example.com", "Hello", "Body", SENDER))
+    smtp.close()
+    return smtp.connects
+
+def main():
+    handler = SlowHandler()
+    controller = Controller(handler, hostname=HOST, port=PORT)
+    controller.start()
+    try:
+        print(f"local SMTP server with {HANDSHAKE_SECONDS * 1000:.0f}ms EHLO\n")
+        print(f"{'emails':>6}  {'connection per email':>22}  {'reused connection':>22}")
+        for count in EMAIL_COUNTS:
+            start = time.perf_counter()
+            send_one_per_connection(count)
+            old_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            connects = send_reused(count)
+            new_seconds = time.perf_counter() - start
+            print(f"{count:>6}  {old_seconds:>9.2f}s {count:>4} connects  {new_seconds:>9.2f}s {connects:>4} connects")
+    finally:
+        controller.stop()
+
+if __name__ == "__main__":
+    main()
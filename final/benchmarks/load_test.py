@@ -0,0 +1,423 @@
+"""
+Load test of the Streamlit pages with simulated concurrent users.
+
+Starts one Streamlit worker (streamlit run app.py) with AI_PROVIDER=fake and
+drives it over its websocket the way browsers do. Each simulated user opens
+a session, logs in as its own seeded tenant, then loops through the
+dashboard, tasks, focus and vision board pages: it runs a pomodoro for
+FOCUS_SECONDS before pausing and resetting it, and sends the assistant a
+message.
+
+For each concurrency level the script reports:
+  - p50/p95 latency per action, from the click to the end of its rerun chain
+  - server render time per page, from zenflow_rerun_seconds
+  - reruns and worker CPU seconds per session, and worker CPU use
+  - database connections opened per action and open at the peak
+The worker numbers come from its /metrics endpoint, scraped every
+SCRAPE_INTERVAL. The script then marks the knee: the first level where
+adding users no longer raises throughput by KNEE_GAIN.
+
+Nothing is rendered, so browser time isn't counted. Needs DATABASE_URL.
+Small tenants are seeded with benchmarks/seed.py and deleted afterwards.
+
+Run from the project root: python benchmarks/load_test.py --users 1,2,4,8,16
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.httpclient import AsyncHTTPClient
+from tornado.websocket import websocket_connect
+
+from benchmarks.seed import SEED_PASSWORD, delete_tenants, prepare_database, seed_tenant
+
+# How long each pomodoro runs; the focus page reruns about every 0.1s meanwhile
+FOCUS_SECONDS = 5
+SCRAPE_INTERVAL = 0.25
+STARTUP_SECONDS = 60
+
+# A level must raise throughput by this factor over the previous one to count as scaling
+KNEE_GAIN = 1.1
+
+# Fake assistant and outbound limits for the worker, unless set in the environment
+WORKER_ENV_DEFAULTS = {
+    "AI_FAKE_LATENCY": "0.2",
+    "AI_FAKE_TOKENS_PER_SECOND": "200",
+    "AI_REQUESTS_PER_MINUTE": "6000",
+    "AI_BURST": "100",
+}
+
+NAVIGATION = [
+    ("nav_dashboard", "dashboard"),
+    ("nav_tasks", "tasks"),
+    ("nav_focus", "focus"),
+    ("nav_vision", "vision_board"),
+]
+
+_SAMPLE = re.compile(r"^([a-zA-Z_:][\w:]*)(\{[^}]*\})?\s+(\S+)$")
+_PAGE = re.compile(r'page="([^"]*)"')
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+def click(key):
+    return ("trigger", key, True)
+
+def text(key, value):
+    return ("text", key, value)
+
+def chat(key, value):
+    return ("chat", key, value)
+
+class Session:
+    """One browser tab: a websocket to the worker and the widgets of its last run"""
+
+    def __init__(self, base_url, websocket):
+        self.base_url = base_url
+        self.websocket = websocket
+        self.widgets = {}
+        self.exceptions = []
+        self._run_widgets = {}
+        self._run_exceptions = []
+        # Timing out on a queue is safe; cancelling a websocket read could drop a message
+        self._messages = asyncio.Queue()
+        self._reader = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def open(cls, base_url):
+        websocket = await websocket_connect(base_url.replace("http", "ws", 1) + "/_stcore/stream")
+        return cls(base_url, websocket)
+
+    def close(self):
+        self.websocket.close()
+
+    def has(self, key):
+        widget = self.widgets.get(key)
+        return widget is not None and not getattr(widget, "disabled", False)
+
+    async def _receive(self):
+        try:
+            while True:
+                data = await self.websocket.read_message()
+                if data is None:
+                    break
+                msg = ForwardMsg.FromString(data)
+                if msg.WhichOneof("type") == "ref_hash":
+                    # Large messages the session has seen are sent by reference; browsers fetch them like this
+                    response = await AsyncHTTPClient().fetch(f"{self.base_url}/_stcore/message?hash={msg.ref_hash}")
+                    metadata = msg.metadata
+                    msg = ForwardMsg.FromString(response.body)
+                    msg.metadata.CopyFrom(metadata)
+                self._messages.put_nowait(msg)
+        finally:
+            self._messages.put_nowait(None)
+
+    async def _read(self, timeout):
+        msg = await asyncio.wait_for(self._messages.get(), timeout)
+        if msg is None:
+            raise ConnectionError("worker closed the websocket")
+        return msg
+
+    def _handle(self, msg):
+        """Collect the widgets and exceptions of each run; returns the finish status at a run's end"""
+        kind = msg.WhichOneof("type")
+        if kind == "new_session":
+            self._run_widgets = {}
+            self._run_exceptions = []
+        elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+            element = msg.delta.new_element
+            element_type = element.WhichOneof("type")
+            proto = getattr(element, element_type)
+            if element_type == "exception":
+                self._run_exceptions.append(proto.message)
+            widget_id = getattr(proto, "id", "")
+            if isinstance(widget_id, str) and widget_id.startswith("$$WIDGET_ID-"):
+                # Ids are "$$WIDGET_ID-<hash>-<key>"
+                self._run_widgets[widget_id.split("-", 2)[2]] = proto
+        elif kind == "script_finished":
+            # Clicks go to the widgets of the last finished run, not one still being drawn
+            self.widgets = self._run_widgets
+            self.exceptions = self._run_exceptions
+            return msg.script_finished
+        return None
+
+    async def rerun(self, *widgets, timeout, max_runs=None):
+        """Send widget values like a browser and wait for the rerun chain to end; returns (seconds, runs)"""
+        back = BackMsg()
+        back.rerun_script.widget_states.SetInParent()
+        for kind, key, value in widgets:
+            state = WidgetState(id=self.widgets[key].id)
+            if kind == "trigger":
+                state.trigger_value = value
+            elif kind == "chat":
+                state.string_trigger_value.data = value
+            else:
+                state.string_value = value
+            back.rerun_script.widget_states.widgets.append(state)
+
+        start = time.perf_counter()
+        await self.websocket.write_message(back.SerializeToString(), binary=True)
+        runs = 0
+        while True:
+            status = self._handle(await self._read(timeout - (time.perf_counter() - start)))
+            if status is None:
+                continue
+            runs += 1
+            if runs == max_runs or status != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return time.perf_counter() - start, runs
+
+    async def follow(self, seconds):
+        """Read whatever the worker sends for a while, e.g. timer reruns; returns the number of runs"""
+        end = time.perf_counter() + seconds
+        runs = 0
+        while True:
+            remaining = end - time.perf_counter()
+            if remaining <= 0:
+                return runs
+            try:
+                if self._handle(await self._read(remaining)) is not None:
+                    runs += 1
+            except asyncio.TimeoutError:
+                return runs
+
+class SimulatedUser:
+    """A user working through the app as a seeded tenant"""
+
+    def __init__(self, base_url, tenant, rounds, timeout):
+        self.base_url = base_url
+        self.tenant = tenant
+        self.rounds = rounds
+        self.timeout = timeout
+        self.session = None
+        self.timings = defaultdict(list)
+        self.timer_runs = 0
+        self.errors = []
+
+    async def act(self, name, *widgets, max_runs=None):
+        """Send one user action and record its latency under name"""
+        missing = [key for _, key, _ in widgets if not self.session.has(key)]
+        if missing:
+            self.errors.append(f"{name}: {', '.join(missing)} not on the page")
+            return False
+        try:
+            seconds, _ = await self.session.rerun(*widgets, timeout=self.timeout, max_runs=max_runs)
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            self.errors.append(f"{name}: {type(e).__name__} {e}")
+            return False
+        self.timings[name].append(seconds)
+        self.errors.extend(f"{name}: {message}" for message in self.session.exceptions)
+        return True
+
+    async def run(self):
+        try:
+            self.session = await Session.open(self.base_url)
+            if not await self.act("landing") or not await self.act("auth", click("btn_login")):
+                return
+            await self.act("login", text("login_email", self.tenant["email"]),
+                           text("login_password", SEED_PASSWORD), click("login_submit"))
+            if not self.session.has("nav_dashboard"):
+                self.errors.append("login: not logged in")
+                return
+
+            for round_number in range(self.rounds):
+                for key, page in NAVIGATION:
+                    if page == "focus":
+                        # A running timer keeps the page rerunning, so stop at the first run that shows it
+                        await self.act(page, click(key), max_runs=2)
+                        await self.pomodoro()
+                    else:
+                        await self.act(page, click(key))
+                if await self.act("assistant", click("nav_assistant")):
+                    await self.act("chat", chat("user_input", f"How should I plan round {round_number} of my day?"))
+        except Exception as e:
+            self.errors.append(f"{type(e).__name__}: {e}")
+        finally:
+            if self.session is not None:
+                self.session.close()
+
+    async def pomodoro(self):
+        """Run a general focus session for FOCUS_SECONDS, then pause and reset it"""
+        # A timer left running in the database resumes when the page opens
+        if not self.session.has("pause_btn"):
+            if self.session.has("continue_no_task"):
+                await self.act("focus", click("continue_no_task"))
+            # The click's run ends early; the next one shows the running timer, which then reruns until paused
+            if not await self.act("start timer", click("start_btn"), max_runs=2):
+                return
+        self.timer_runs += await self.session.follow(FOCUS_SECONDS)
+        await self.act("pause timer", click("pause_btn"))
+        await self.act("reset timer", click("reset_btn"))
+
+async def scrape(metrics_url):
+    """Return {"name{labels}": value} from a Prometheus text endpoint"""
+    response = await AsyncHTTPClient().fetch(metrics_url)
+    samples = {}
+    for line in response.body.decode("utf-8").splitlines():
+        match = _SAMPLE.match(line)
+        if match:
+            samples[match.group(1) + (match.group(2) or "")] = float(match.group(3))
+    return samples
+
+def page_totals(samples):
+    """Return {page: [reruns, seconds]} from zenflow_rerun_seconds"""
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for name, value in samples.items():
+        for suffix, index in (("_count", 0), ("_sum", 1)):
+            if name.startswith(f"zenflow_rerun_seconds{suffix}{{"):
+                totals[_PAGE.search(name).group(1)][index] = value
+    return totals
+
+async def run_level(base_url, metrics_url, tenants, rounds, timeout):
+    """Run one concurrency level; returns the users, wall time, the worker's metrics before and after, and peak connections"""
+    users = [SimulatedUser(base_url, tenant, rounds, timeout) for tenant in tenants]
+    before = await scrape(metrics_url)
+    peak_connections = 0
+    done = asyncio.Event()
+
+    async def sample_connections():
+        nonlocal peak_connections
+        while not done.is_set():
+            samples = await scrape(metrics_url)
+            peak_connections = max(peak_connections, samples.get("zenflow_db_connections_open", 0))
+            await asyncio.sleep(SCRAPE_INTERVAL)
+
+    sampler = asyncio.ensure_future(sample_connections())
+    start = time.perf_counter()
+    await asyncio.gather(*(user.run() for user in users))
+    wall_seconds = time.perf_counter() - start
+    done.set()
+    await sampler
+    after = await scrape(metrics_url)
+    return users, wall_seconds, before, after, peak_connections
+
+def report(level, users, wall_seconds, before, after, peak_connections):
+    """Print one level's numbers and return its throughput in actions per second"""
+    timings = defaultdict(list)
+    errors = []
+    for user in users:
+        for name, samples in user.timings.items():
+            timings[name].extend(samples)
+        errors.extend(user.errors)
+    actions = sum(len(samples) for samples in timings.values())
+    throughput = actions / wall_seconds
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    pages_before, pages_after = page_totals(before), page_totals(after)
+    reruns = {page: (count - pages_before[page][0], seconds - pages_before[page][1])
+              for page, (count, seconds) in pages_after.items() if count > pages_before[page][0]}
+    cpu_seconds = delta("process_cpu_seconds_total")
+
+    print(f"\n{level} users: {actions} actions in {wall_seconds:.1f}s = {throughput:.2f} actions/s")
+    print(f"  per session: {sum(count for count, _ in reruns.values()) / level:.0f} reruns "
+          f"({sum(user.timer_runs for user in users) / level:.0f} of them timer ticks), "
+          f"{cpu_seconds / level:.2f}s worker CPU; worker CPU use {cpu_seconds / wall_seconds * 100:.0f}%")
+    print(f"  db connections: {delta('zenflow_db_connections_opened_total') / max(actions, 1):.1f} opened per action, "
+          f"peak {peak_connections:.0f} open")
+    print(f"  {'action':<14}{'p50':>9}{'p95':>9}{'count':>7}")
+    for name, samples in sorted(timings.items()):
+        print(f"  {name:<14}{_percentile(samples, 50) * 1000:>7.0f}ms{_percentile(samples, 95) * 1000:>7.0f}ms"
+              f"{len(samples):>7}")
+    print("  server render per rerun: " + ", ".join(
+        f"{page} {seconds / count * 1000:.0f}ms" for page, (count, seconds) in sorted(reruns.items())))
+    if errors:
+        print(f"  {len(errors)} errors, e.g. {errors[0]}")
+    return throughput
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def wait_for_worker(base_url, worker):
+    """Poll the health endpoint until the worker answers"""
+    deadline = time.monotonic() + STARTUP_SECONDS
+    while time.monotonic() < deadline and worker.poll() is None:
+        try:
+            await AsyncHTTPClient().fetch(f"{base_url}/_stcore/health")
+            return True
+        except Exception:
+            await asyncio.sleep(0.5)
+    return False
+
+async def load_test(levels, tenants, rounds, timeout, base_url, metrics_url):
+    # The first session imports the views and starts /metrics
+    await SimulatedUser(base_url, tenants[0], 0, timeout).run()
+
+    results = []
+    for level in levels:
+        outcome = await run_level(base_url, metrics_url, tenants[:level], rounds, timeout)
+        results.append((level, report(level, *outcome)))
+
+    knee = None
+    for (previous, previous_throughput), (level, throughput) in zip(results, results[1:]):
+        if throughput < previous_throughput * KNEE_GAIN:
+            knee = previous
+            break
+    print("\nthroughput: " + ", ".join(f"{level} users {throughput:.2f}/s" for level, throughput in results))
+    if knee is None:
+        print("no knee: throughput still rose at the highest level; try more users")
+    else:
+        print(f"knee at {knee} users: more concurrent sessions no longer raise throughput")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", default="1,2,4,8,16", help="comma-separated concurrency levels")
+    parser.add_argument("--rounds", type=int, default=2, help="page loops per simulated user")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds one action may take")
+    parser.add_argument("--seed", type=int, help="random seed for the tenants")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded tenants")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.users.split(",")]
+
+    prepare_database()
+    rng = random.Random(args.seed)
+    tenants = [seed_tenant("small", rng) for _ in range(max(levels))]
+
+    port, metrics_port = free_port(), free_port()
+    env = dict(WORKER_ENV_DEFAULTS, **os.environ)
+    env.update(AI_PROVIDER="fake", METRICS_PORT=str(metrics_port))
+    log = tempfile.NamedTemporaryFile(prefix="zenflow-worker-", suffix=".log", delete=False)
+    worker = subprocess.Popen(
+        # No file watcher: it costs an inotify instance per session and nothing changes during a test
+        [sys.executable, "-m", "streamlit", "run", "app.py", "--server.headless", "true",
+         "--server.port", str(port), "--server.fileWatcherType", "none"],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+    print(f"seeded {len(tenants)} small tenants; worker on port {port}, log {log.name}; "
+          f"fake AI {float(env['AI_FAKE_LATENCY']) * 1000:.0f}ms round trip; "
+          f"{FOCUS_SECONDS}s pomodoros, {args.rounds} rounds per user")
+    loop = asyncio.new_event_loop()
+    try:
+        if not loop.run_until_complete(wait_for_worker(base_url, worker)):
+            print(f"the worker didn't start; see {log.name}")
+            return
+        loop.run_until_complete(load_test(levels, tenants, args.rounds, args.timeout,
+                                          base_url, f"http://127.0.0.1:{metrics_port}/metrics"))
+    finally:
+        worker.terminate()
+        worker.wait()
+        log.close()
+        loop.close()
+        if not args.keep:
+            delete_tenants([tenant["user_id"] for tenant in tenants])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Cost on the calling thread of the old print debugging versus utils.log.
+
+The "old" case prints the dozen lines get_db_connection used to print on every
+connection. The other cases log one structured record the way the code does
+now:
+- a DEBUG record while the level is INFO (the default, so it is dropped)
+- a DEBUG record at DEBUG level with sampling
+- an INFO record that is queued for the listener thread
+
+All output goes to os.devnull, which never blocks, so this only compares CPU
+time. The old prints ran on the script thread and could also stall a rerun
+whenever stdout or the log pipeline was slow. Queued records are written by
+the listener thread instead.
+
+Run from the project root: python benchmarks/logging_overhead.py
+"""
+import contextlib
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The listener writes to sys.stderr as it is when logging is configured
+devnull = open(os.devnull, "w")
+sys.stderr = devnull
+
+from utils import log
+
+ITERATIONS = 20000
+
+def old_connection_prints():
+    print("\nDatabase Connection Debug Info:")
+    print("DATABASE_URL:", None)
+    print("Individual connection parameters:")
+    print("DB_HOST: localhost")
+    print("DB_PORT: 5432")
+    print("DB_NAME: zenflow")
+    print("DB_USER: postgres")
+    print("DB_PASSWORD: ********")
+    print("\nAttempting connection using individual parameters...")
+    print("Successfully connected using individual parameters")
+
+def time_calls(call):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        call()
+    return (time.perf_counter() - start) / ITERATIONS
+
+def main():
+    logger = log.get_logger("benchmarks.logging")
+
+    with contextlib.redirect_stdout(devnull):
+        old = time_calls(old_connection_prints)
+
+    def debug_record():
+        logger.debug("Connected to database", extra={"via": "DB_HOST", "host": "localhost"})
+
+    def info_record():
+        logger.info("Connected to database", extra={"via": "DB_HOST", "host": "localhost"})
+
+    logger.setLevel(logging.INFO)
+    disabled = time_calls(debug_record)
+    logger.setLevel(logging.DEBUG)
+    sampled = time_calls(debug_record)
+    queued = time_calls(info_record)
+
+    print(f"per call, {ITERATIONS} calls each (sample rate {log.DEBUG_SAMPLE_RATE}):")
+    print(f"  old connection prints:    {old * 1e6:8.2f} µs")
+    print(f"  debug, level INFO:        {disabled * 1e6:8.2f} µs")
+    print(f"  debug, level DEBUG:       {sampled * 1e6:8.2f} µs (sampled)")
+    print(f"  info, queued:             {queued * 1e6:8.2f} µs")
+    print(f"  records dropped (queue full): {log.dropped_records()}")
+
+if __name__ == "__main__":
+    main()
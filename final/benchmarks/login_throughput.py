@@ -0,0 +1,118 @@
+"""
+Login throughput with password hashing inline versus in the hashing pool.
+
+Simulates concurrent sign-ins (the password check only, no database) at several
+concurrency levels and reports logins/sec and p95 latency for each. While the
+logins run, a ticker thread stands in for other sessions' reruns and records
+how late its 50ms ticks fire. The highest throughput whose p95 stays under
+TARGET_P95_SECONDS is reported for each mode.
+
+Also checks that a hash made at an older cost is upgraded on login.
+
+Set PASSWORD_HASH_ROUNDS / PASSWORD_HASH_WORKERS / PASSWORD_HASH_MAX_PENDING
+to try other settings. No database or network access is needed.
+
+Run from the project root: python benchmarks/login_throughput.py
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import password_hashing
+from utils.password_hashing import PASSWORD_HASH_ROUNDS, verify_and_update_password, _hash, _percentile, _verify_and_update
+
+CONCURRENCY_LEVELS = [1, 4, 16, 32]
+LOGINS_PER_LEVEL = 64
+TARGET_P95_SECONDS = 0.5
+TICK_SECONDS = 0.05
+
+def inline_login(password, password_hash):
+    """The old flow: hash on the calling thread"""
+    return _verify_and_update(password, password_hash, PASSWORD_HASH_ROUNDS)
+
+def ticker(stop, lateness):
+    """Record how late each tick fires while logins are running"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        time.sleep(TICK_SECONDS)
+        lateness.append(time.perf_counter() - start - TICK_SECONDS)
+
+def run_level(login, password_hash, concurrency):
+    latencies = []
+
+    def one_login(_):
+        start = time.perf_counter()
+        matches, _ = login("correct horse", password_hash)
+        if not matches:
+            raise RuntimeError("password did not verify")
+        latencies.append(time.perf_counter() - start)
+
+    stop = threading.Event()
+    lateness = []
+    tick_thread = threading.Thread(target=ticker, args=(stop, lateness), daemon=True)
+    tick_thread.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_login, range(LOGINS_PER_LEVEL)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    tick_thread.join()
+    return {
+        "throughput": LOGINS_PER_LEVEL / elapsed,
+        "p95": _percentile(latencies, 95),
+        "tick_p95": _percentile(lateness, 95) or 0.0,
+    }
+
+def run_mode(name, login, password_hash):
+    print(f"{name}:")
+    print(f"  {'users':>5}  {'logins/s':>9}  {'p95':>8}  {'tick lag p95':>12}")
+    best = None
+    for concurrency in CONCURRENCY_LEVELS:
+        result = run_level(login, password_hash, concurrency)
+        print(f"  {concurrency:>5}  {result['throughput']:>9.1f}  {result['p95'] * 1000:>6.0f}ms"
+              f"  {result['tick_p95'] * 1000:>10.1f}ms")
+        if result["p95"] <= TARGET_P95_SECONDS and (best is None or result["throughput"] > best):
+            best = result["throughput"]
+    return best
+
+def check_rehash():
+    """A hash made at a different cost verifies and comes back upgraded"""
+    old_hash = _hash("correct horse", max(1000, PASSWORD_HASH_ROUNDS // 2))
+    matches, new_hash = verify_and_update_password("correct horse", old_hash)
+    upgraded = matches and new_hash and password_hashing._hash_rounds(new_hash) == PASSWORD_HASH_ROUNDS
+    _, again = verify_and_update_password("correct horse", new_hash) if new_hash else (None, None)
+    return bool(upgraded and again is None)
+
+def main():
+    print(f"rounds {PASSWORD_HASH_ROUNDS}, pool workers {password_hashing.HASH_WORKERS}, "
+          f"max pending {password_hashing.MAX_PENDING_HASHES}, CPUs {os.cpu_count()}\n")
+    password_hash = _hash("correct horse", PASSWORD_HASH_ROUNDS)
+
+    # Start the pool workers before timing so spawn cost isn't counted
+    verify_and_update_password("correct horse", password_hash)
+
+    inline_best = run_mode("inline", inline_login, password_hash)
+    pool_best = run_mode("pool", verify_and_update_password, password_hash)
+
+    stats = password_hashing.get_hash_pool_stats()
+    print(f"\npool stats: peak queue depth {stats['peak_queue_depth']}, rejected {stats['rejected']}, "
+          f"inline fallbacks {stats['inline']}")
+
+    def describe(best):
+        return f"{best:.1f} logins/s" if best else "none under target"
+
+    print(f"best throughput with p95 <= {TARGET_P95_SECONDS * 1000:.0f}ms: "
+          f"inline {describe(inline_best)}, pool {describe(pool_best)}")
+
+    rehash_ok = check_rehash()
+    print(f"rehash on login when cost changes: {'ok' if rehash_ok else 'FAILED'}")
+    sys.exit(0 if rehash_ok else 1)
+
+if __name__ == "__main__":
+    main()
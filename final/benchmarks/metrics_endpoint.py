@@ -0,0 +1,54 @@
+"""
+Cost of the metrics registry and a scrape of the /metrics endpoint.
+
+Times Histogram.observe (paid on every page rerun and AI call), then fills
+the registry with a realistic number of series, starts the endpoint on a
+free port and times full scrapes over HTTP. Prints the first lines of the
+exposition so the format can be checked by eye.
+
+Run from the project root: python benchmarks/metrics_endpoint.py
+"""
+import os
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import metrics
+from utils.db_stats import record_query, record_connect
+
+ITERATIONS = 100000
+SCRAPES = 50
+
+def main():
+    pages = ["landing", "dashboard", "tasks", "focus", "assistant"]
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        metrics.rerun_seconds.observe(0.05, page=pages[i % len(pages)])
+    per_observe = (time.perf_counter() - start) / ITERATIONS
+    print(f"histogram observe: {per_observe * 1e6:.2f} µs")
+
+    # Series counts in the range the app produces
+    for i in range(200):
+        metrics.record_session(f"session-{i}", focus_timer_running=i % 4 == 0)
+    for i in range(60):
+        record_query(f"utils.db.helper_{i}", f"SELECT * FROM tasks WHERE id = {i}", 0.001, 1)
+        record_connect(f"utils.db.helper_{i}", 0.002)
+    metrics.ai_call_seconds.observe(1.2, model="gemini-1.5-flash", kind="generate")
+
+    server = metrics.start_metrics_server(port=0)
+    url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+    start = time.perf_counter()
+    for _ in range(SCRAPES):
+        with urllib.request.urlopen(url) as response:
+            body = response.read().decode("utf-8")
+    per_scrape = (time.perf_counter() - start) / SCRAPES
+    lines = body.splitlines()
+    print(f"scrape: {per_scrape * 1000:.2f} ms for {len(lines)} lines ({len(body) / 1024:.1f} KiB)")
+    for line in lines:
+        if line.startswith(("zenflow_active_sessions", "zenflow_focus_timers_running", "zenflow_rerun_seconds_count")):
+            print(f"  {line}")
+
+if __name__ == "__main__":
+    main()
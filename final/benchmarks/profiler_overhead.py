@@ -0,0 +1,67 @@
+"""
+Overhead of the per-rerun profiler, disabled and in each mode.
+
+A stand-in rerun does some CPU work (building and sorting task rows) and a
+short sleep for database waits. Each case times the same reruns through
+profile_rerun: disabled, sampling, and cProfile. The profiles are written
+to a temporary directory and the heaviest collapsed stacks are printed to
+show what the flamegraph input looks like.
+
+Run from the project root: python benchmarks/profiler_overhead.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import profiling
+
+RERUNS = 40
+
+def build_rows():
+    return [{"id": i, "name": f"Task {i}", "rank": f"{(i * 7919) % 1000:04d}"} for i in range(20000)]
+
+def render_tasks():
+    rows = sorted(build_rows(), key=lambda row: row["rank"])
+    # Stands in for database round trips
+    time.sleep(0.01)
+    return "".join(row["name"] for row in rows)
+
+def time_reruns():
+    start = time.perf_counter()
+    for _ in range(RERUNS):
+        with profiling.profile_rerun("tasks"):
+            render_tasks()
+    return (time.perf_counter() - start) / RERUNS
+
+def main():
+    profiling.PROFILING_ENABLED = False
+    disabled = time_reruns()
+
+    with tempfile.TemporaryDirectory() as directory:
+        profiling.PROFILING_ENABLED = True
+        profiling.PROFILE_DIR = directory
+        profiling.PROFILE_PAGES = {"tasks"}
+        profiling.PROFILE_RERUNS = RERUNS
+
+        results = {}
+        for mode in ("sample", "cprofile"):
+            profiling.PROFILE_MODE = mode
+            results[mode] = time_reruns()
+
+        print(f"per rerun, {RERUNS} reruns each:")
+        print(f"  disabled: {disabled * 1000:7.2f} ms")
+        for mode, seconds in results.items():
+            print(f"  {mode:<8}: {seconds * 1000:7.2f} ms ({(seconds / disabled - 1) * 100:+.0f}%)")
+
+        for name in sorted(os.listdir(directory)):
+            print(f"\nwrote {name}")
+            if name.endswith(".collapsed"):
+                with open(os.path.join(directory, name)) as f:
+                    for line in f.readlines()[:5]:
+                        print(f"  {line.rstrip()}")
+
+if __name__ == "__main__":
+    main()
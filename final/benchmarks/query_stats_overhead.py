@@ -0,0 +1,71 @@
+"""
+Overhead of recording per-query stats.
+
+Times what TimedCursor adds to every statement: naming the calling helper,
+fingerprinting the SQL and updating the stats tables. The statements are
+taken from utils/db.py. If DATABASE_URL is set, it also runs a few real
+helpers and prints the snapshot that get_query_stats() returns.
+
+Run from the project root: python benchmarks/query_stats_overhead.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import db_stats
+from utils.db_stats import caller_name, fingerprint, get_query_stats, record_query
+
+ITERATIONS = 50000
+
+STATEMENTS = [
+    "SELECT id, name FROM lists WHERE user_id = %s ORDER BY id",
+    """
+        SELECT t.id, t.name, t.deadline, t.reminder, t.repeat, t.completed
+        FROM tasks t
+        WHERE t.list_id = %s AND t.user_id = %s
+        ORDER BY t.completed, t.rank
+    """,
+    "INSERT INTO subtasks (task_id, name) VALUES (1, 'a'), (1, 'b'), (1, 'c')",
+    "UPDATE ai_jobs SET status = 'done', result = %s WHERE id = %s",
+]
+
+def get_tasks_for_list():
+    """Stands in for a db helper calling cursor.execute"""
+    for statement in STATEMENTS:
+        record_query(caller_name(1), statement, 0.001, 3)
+
+def main():
+    # Leave slow-query logging out of the timing
+    db_stats.SLOW_QUERY_SECONDS = float("inf")
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        get_tasks_for_list()
+    per_statement = (time.perf_counter() - start) / (ITERATIONS * len(STATEMENTS))
+    print(f"recording overhead: {per_statement * 1e6:.2f} µs per statement "
+          f"(a local round trip to Postgres is typically 100-500 µs)")
+    print(f"fingerprint cache: {fingerprint.cache_info().hits} hits, {fingerprint.cache_info().misses} misses")
+    for statement in STATEMENTS:
+        print(f"  {fingerprint(statement)}")
+    get_query_stats(reset=True)
+
+    if not os.getenv("DATABASE_URL"):
+        print("\nSet DATABASE_URL to also time real helpers against a database.")
+        return
+
+    from utils.db import init_db, get_all_lists_for_user, get_task_statistics
+    init_db()
+    for _ in range(20):
+        get_all_lists_for_user(1)
+        get_task_statistics(1)
+    stats = get_query_stats()
+    print(f"\n{'function':<44} {'calls':>6} {'p50':>8} {'p95':>8} {'connect p50':>12}")
+    for name, entry in sorted(stats["functions"].items(), key=lambda item: -item[1]["total_seconds"]):
+        connect = stats["connections"].get(name, {}).get("p50")
+        print(f"{name:<44} {entry['count']:>6} {entry['p50'] * 1000:>6.2f}ms {entry['p95'] * 1000:>6.2f}ms"
+              f" {connect * 1000 if connect else 0:>10.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Seed a database with synthetic tenants for benchmarks and load tests.
+
+Each tenant is a user with lists, ranked tasks (some completed, some with
+deadlines), subtasks, per-task focus stats, years of focus_session_history,
+a focus flow state, timer settings, vision board tiles and customizations,
+earned rewards and an assistant conversation. TENANT_SIZES defines small,
+medium and huge tenants. Rows are written with execute_values, so even a
+huge tenant takes seconds.
+
+Seeded users have emails starting with "seed-" and password "seed-password".
+Remove them with --delete.
+
+Run from the project root: python benchmarks/seed.py --size medium --tenants 2
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2.extras import execute_values
+from utils.db import init_db, get_db_connection
+from utils.rank import evenly_spaced_ranks
+
+SEED_EMAIL_PREFIX = "seed-"
+SEED_PASSWORD = "seed-password"
+
+TENANT_SIZES = {
+    "small": {"lists": 4, "tasks": 20, "subtasks_per_task": 3, "history_days": 30, "sessions_per_day": 4,
+              "tiles": 10, "rewards": 2, "messages": 20},
+    "medium": {"lists": 8, "tasks": 500, "subtasks_per_task": 5, "history_days": 365, "sessions_per_day": 6,
+               "tiles": 60, "rewards": 5, "messages": 400},
+    "huge": {"lists": 20, "tasks": 5000, "subtasks_per_task": 8, "history_days": 3 * 365, "sessions_per_day": 10,
+             "tiles": 300, "rewards": 8, "messages": 5000},
+}
+
+LIST_NAMES = ["Work", "Health", "Errands", "Miscellaneous", "Home", "Side project", "Learning", "Finance"]
+VERBS = ["Write", "Review", "Plan", "Call", "Fix", "Draft", "Book", "Clean", "Read", "Prepare", "Email", "Update"]
+NOUNS = ["report", "dentist", "budget", "slides", "garden", "invoice", "blog post", "tax forms", "car service",
+         "team retro", "grocery list", "portfolio", "lesson notes", "bug in checkout", "birthday gift"]
+SESSION_TYPES = [("pomodoro", 25 * 60), ("pomodoro", 25 * 60), ("pomodoro", 25 * 60),
+                 ("short_break", 5 * 60), ("long_break", 15 * 60)]
+
+_password_hash = None
+
+def seed_password_hash():
+    """Hash SEED_PASSWORD once; every seeded user shares it"""
+    global _password_hash
+    if _password_hash is None:
+        from utils.password_hashing import hash_password
+        _password_hash = hash_password(SEED_PASSWORD)
+    return _password_hash
+
+def _task_name(rng):
+    return f"{rng.choice(VERBS)} {rng.choice(NOUNS)}"
+
+def seed_tenant(size="small", rng=None, cursor=None):
+    """Create one synthetic tenant and return a dict of its ids
+
+    Args:
+        size (str): A key of TENANT_SIZES
+        rng (random.Random): Source of randomness, for repeatable data
+        cursor: Write in the caller's transaction instead of a new connection
+
+    Returns:
+        dict: user_id, email, list_ids, task_ids, subtask_ids, tile_ids and conversation_id
+    """
+    spec = TENANT_SIZES[size]
+    rng = rng or random.Random()
+    conn = None
+    if cursor is None:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+    try:
+        now = datetime.now().replace(microsecond=0)
+        email = f"{SEED_EMAIL_PREFIX}{size}-{uuid.uuid4().hex[:12]}@example.com"
+        cursor.execute(
+            "INSERT INTO users (first_name, last_name, email, password_hash) VALUES (%s, %s, %s, %s) RETURNING id",
+            ("Seed", size.capitalize(), email, seed_password_hash())
+        )
+        user_id = cursor.fetchone()["id"]
+
+        names = [LIST_NAMES[i] if i < len(LIST_NAMES) else f"List {i + 1}" for i in range(spec["lists"])]
+        list_ids = [row["id"] for row in execute_values(
+            cursor, "INSERT INTO lists (user_id, name) VALUES %s RETURNING id",
+            [(user_id, name) for name in names], fetch=True)]
+
+        # Tasks are spread unevenly over lists, like real users' lists
+        weights = [1 / (i + 1) for i in range(len(list_ids))]
+        tasks_by_list = {list_id: [] for list_id in list_ids}
+        for _ in range(spec["tasks"]):
+            tasks_by_list[rng.choices(list_ids, weights)[0]].append(None)
+        task_rows = []
+        for list_id, slots in tasks_by_list.items():
+            for rank in evenly_spaced_ranks(len(slots)):
+                created = now - timedelta(days=rng.randint(0, spec["history_days"]))
+                completed = rng.random() < 0.6
+                deadline = created + timedelta(days=rng.randint(1, 30)) if rng.random() < 0.5 else None
+                task_rows.append((list_id, user_id, _task_name(rng), deadline, None,
+                                  rng.choice([None, None, None, "daily", "weekly"]), completed,
+                                  created + timedelta(hours=rng.randint(1, 72)) if completed else None,
+                                  rank, created))
+        task_ids = [row["id"] for row in execute_values(
+            cursor,
+            """
+            INSERT INTO tasks (list_id, user_id, name, deadline, reminder, repeat, completed, completed_at, rank, created_at)
+            VALUES %s RETURNING id
+            """,
+            task_rows, fetch=True, page_size=1000)]
+
+        subtask_rows = [(task_id, f"Step {i + 1}", rng.random() < 0.5)
+                        for task_id in task_ids for i in range(spec["subtasks_per_task"])]
+        subtask_ids = [row["id"] for row in execute_values(
+            cursor, "INSERT INTO subtasks (task_id, name, completed) VALUES %s RETURNING id",
+            subtask_rows, fetch=True, page_size=1000)] if subtask_rows else []
+
+        # Focus history: a few sessions most days, a quarter of them tied to a task
+        history_rows = []
+        for day in range(spec["history_days"]):
+            if rng.random() < 0.2:
+                continue
+            date = now - timedelta(days=day)
+            for _ in range(rng.randint(1, spec["sessions_per_day"])):
+                session_type, seconds = rng.choice(SESSION_TYPES)
+                task_id = rng.choice(task_ids) if task_ids and rng.random() < 0.25 else None
+                history_rows.append((user_id, task_id, session_type, seconds, rng.random() < 0.9,
+                                     date.replace(hour=rng.randint(7, 22), minute=rng.randint(0, 59))))
+        execute_values(
+            cursor,
+            """
+            INSERT INTO focus_session_history (user_id, task_id, session_type, duration_seconds, completed, session_date)
+            VALUES %s
+            """,
+            history_rows, page_size=1000)
+
+        cursor.execute(
+            """
+            INSERT INTO task_focus_stats (task_id, user_id, focus_time_seconds, sessions_completed, last_session_date)
+            SELECT task_id, user_id, SUM(duration_seconds), COUNT(*), MAX(session_date)
+            FROM focus_session_history
+            WHERE user_id = %s AND task_id IS NOT NULL AND completed AND session_type = 'pomodoro'
+            GROUP BY task_id, user_id
+            """,
+            (user_id,)
+        )
+        cursor.execute(
+            """
+            INSERT INTO focus_stats (user_id, total_focus_time, pomodoros_completed, last_session_date)
+            SELECT %s, COALESCE(SUM(duration_seconds), 0), COUNT(*), MAX(session_date)
+            FROM focus_session_history
+            WHERE user_id = %s AND completed AND session_type = 'pomodoro'
+            """,
+            (user_id, user_id)
+        )
+        cursor.execute("INSERT INTO timer_settings (user_id) VALUES (%s)", (user_id,))
+        cursor.execute(
+            """
+            INSERT INTO focus_flow_state (user_id, current_task_id, flow_state, current_mode, time_remaining_seconds)
+            VALUES (%s, %s, 'ready', 'pomodoro', %s)
+            """,
+            (user_id, task_ids[0] if task_ids else None, 25 * 60)
+        )
+
+        cursor.execute("SELECT id, name FROM vision_board_categories ORDER BY id")
+        categories = cursor.fetchall()
+        tile_ranks = evenly_spaced_ranks(spec["tiles"])
+        tile_ids = [row["id"] for row in execute_values(
+            cursor,
+            """
+            INSERT INTO vision_board_tiles (user_id, title, description, is_affirmation, category_id, position, rank)
+            VALUES %s RETURNING id
+            """,
+            [(user_id, f"Goal {i + 1}", "Something worth working towards", rng.random() < 0.3,
+              rng.choice(categories)["id"] if categories else None, i, tile_ranks[i])
+             for i in range(spec["tiles"])],
+            fetch=True)] if spec["tiles"] else []
+        if categories:
+            execute_values(
+                cursor,
+                "INSERT INTO vision_board_customizations (user_id, category_key, theme, frame, description) VALUES %s",
+                [(user_id, category["name"].lower().replace(" ", "_"), "default", "classic", None)
+                 for category in categories])
+
+        cursor.execute("SELECT id FROM rewards ORDER BY id LIMIT %s", (spec["rewards"],))
+        reward_ids = [row["id"] for row in cursor.fetchall()]
+        if reward_ids:
+            execute_values(cursor, "INSERT INTO user_rewards (user_id, reward_id) VALUES %s",
+                           [(user_id, reward_id) for reward_id in reward_ids])
+
+        cursor.execute(
+            "INSERT INTO assistant_conversations (user_id, title) VALUES (%s, %s) RETURNING id",
+            (user_id, "Planning my week")
+        )
+        conversation_id = cursor.fetchone()["id"]
+        execute_values(
+            cursor, "INSERT INTO assistant_messages (conversation_id, role, content) VALUES %s",
+            [(conversation_id, "user" if i % 2 == 0 else "assistant",
+              f"Message {i + 1}: " + " ".join(rng.choice(NOUNS) for _ in range(rng.randint(5, 40))))
+             for i in range(spec["messages"])],
+            page_size=1000)
+
+        if conn is not None:
+            conn.commit()
+        return {
+            "user_id": user_id,
+            "email": email,
+            "size": size,
+            "list_ids": list_ids,
+            "task_ids": task_ids,
+            "subtask_ids": subtask_ids,
+            "tile_ids": tile_ids,
+            "conversation_id": conversation_id,
+        }
+    except Exception:
+        if conn is not None:
+            conn.rollback()
+        raise
+    finally:
+        if conn is not None:
+            conn.close()
+
+def delete_tenants(user_ids=None):
+    """Delete the given seeded users, or all of them, and everything that cascades; returns the count"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        if user_ids is None:
+            cursor.execute("DELETE FROM users WHERE email LIKE %s", (SEED_EMAIL_PREFIX + "%",))
+        else:
+            cursor.execute("DELETE FROM users WHERE id = ANY(%s) AND email LIKE %s",
+                           (list(user_ids), SEED_EMAIL_PREFIX + "%"))
+        deleted = cursor.rowcount
+        conn.commit()
+        return deleted
+    finally:
+        conn.close()
+
+def prepare_database():
+    """Create the app's tables and the default rewards, as app startup does"""
+    from models.rewards import Reward
+    init_db()
+    Reward.init_db()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", choices=sorted(TENANT_SIZES), default="small")
+    parser.add_argument("--tenants", type=int, default=1)
+    parser.add_argument("--seed", type=int, help="random seed, for repeatable data")
+    parser.add_argument("--delete", action="store_true", help="delete every seeded tenant instead")
+    args = parser.parse_args()
+
+    prepare_database()
+    if args.delete:
+        print(f"deleted {delete_tenants()} seeded tenants")
+        return
+
+    rng = random.Random(args.seed)
+    for _ in range(args.tenants):
+        start = time.perf_counter()
+        tenant = seed_tenant(args.size, rng)
+        print(f"{tenant['email']}  user {tenant['user_id']}: {len(tenant['task_ids'])} tasks, "
+              f"{len(tenant['subtask_ids'])} subtasks, {len(tenant['tile_ids'])} tiles "
+              f"({time.perf_counter() - start:.1f}s)")
+
+if __name__ == "__main__":
+    main()
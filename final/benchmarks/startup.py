@@ -0,0 +1,110 @@
+"""
+Cold-start profile for the app.
+
+Prints an import-time breakdown for app.py and each view module, and the
+time to first render of the landing page. Every measurement runs in a fresh
+interpreter so nothing is already cached in sys.modules. The landing page run
+needs the same database settings as the app, because app.py initialises the schema.
+
+Run from the project root: python benchmarks/startup.py
+"""
+import os
+import re
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "utils.db",
+    "utils.theme",
+    "views.landing",
+    "views.auth",
+    "views.dashboard",
+    "views.tasks",
+    "views.focus",
+    "views.vision_board",
+    "views.assistant",
+    "views.rewards",
+]
+
+# Heavy dependencies worth calling out in the breakdown
+HEAVY_PACKAGES = ["streamlit", "google.generativeai", "pandas", "passlib", "psycopg2", "streamlit_extras"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+LANDING_RENDER_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=60)
+at.run()
+elapsed = time.perf_counter() - start
+print(f"{elapsed:.4f}")
+print(int("google.generativeai" in sys.modules))
+print(len(at.exception))
+"""
+
+def run_python(args):
+    """Run a fresh interpreter in the project root and return the completed process"""
+    return subprocess.run(
+        [sys.executable] + args,
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    )
+
+def import_breakdown(module):
+    """Return total import time and per-package cumulative time (seconds) for a module"""
+    result = run_python(["-X", "importtime", "-c", f"import {module}"])
+    if result.returncode != 0:
+        return None, {}
+
+    total = 0
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative_us = int(match.group(2))
+        depth = (len(match.group(3)) - 1) // 2
+        name = match.group(4)
+        if depth == 0:
+            total += cumulative_us
+        for package in HEAVY_PACKAGES:
+            # Only count the top-level import of each package so nested modules aren't double counted
+            if name == package:
+                packages[package] = packages.get(package, 0) + cumulative_us
+    return total / 1e6, {name: us / 1e6 for name, us in packages.items()}
+
+def landing_first_render():
+    """Return (seconds, gemini_loaded, exception_count) for the first landing page render"""
+    result = run_python(["-c", LANDING_RENDER_SCRIPT])
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1] if result.stderr else "AppTest run failed")
+        return None
+    elapsed, gemini_loaded, exceptions = result.stdout.strip().splitlines()[-3:]
+    return float(elapsed), gemini_loaded == "1", int(exceptions)
+
+def main():
+    """Print the cold-start report"""
+    print("Import time (fresh interpreter per module)")
+    print(f"{'module':<20}{'total':>9}  heavy dependencies")
+    for module in MODULES:
+        total, packages = import_breakdown(module)
+        if total is None:
+            print(f"{module:<20}{'failed':>9}")
+            continue
+        heavy = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in sorted(packages.items(), key=lambda item: -item[1]))
+        print(f"{module:<20}{total * 1000:>7.0f}ms  {heavy}")
+
+    print("\nLanding page, time to first render")
+    render = landing_first_render()
+    if render:
+        elapsed, gemini_loaded, exceptions = render
+        print(f"first render: {elapsed * 1000:.0f}ms (exceptions: {exceptions})")
+        print(f"google.generativeai imported: {'yes' if gemini_loaded else 'no'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Break down a whole list one task at a time versus in a single batch call.
+
+Uses the fake AI provider with a fixed round trip, bypasses the response cache
+and counts the provider calls each approach makes. No network access, API key
+or database is needed.
+
+Run from the project root: python benchmarks/subtask_batch.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import ai
+from utils.ai_limits import AILimiter
+from utils.ai_providers import FakeProvider
+
+ROUND_TRIP_SECONDS = 0.5
+SECONDS_PER_INPUT_TOKEN = 0.0002
+LIST_SIZES = [5, 20, 50]
+
+TASK_NAMES = ["Write quarterly report", "Plan team offsite", "Clean the garage", "Renew passport",
+              "Prepare tax documents", "Book dentist appointment", "Update resume", "Read chapter 4"]
+
+def make_tasks(count):
+    return [{"id": i + 1, "name": f"{TASK_NAMES[i % len(TASK_NAMES)]} #{i + 1}"} for i in range(count)]
+
+def one_at_a_time(provider, tasks):
+    """The old flow: one generate_subtasks call per task"""
+    calls_before = len(provider.input_tokens)
+    start = time.perf_counter()
+    results = {}
+    for task in tasks:
+        subtasks, error = ai.generate_subtasks(task["name"], use_cache=False)
+        if subtasks and not error:
+            results[task["id"]] = subtasks
+    return results, len(provider.input_tokens) - calls_before, time.perf_counter() - start
+
+def batched(provider, tasks):
+    """The new flow: generate_subtasks_batch"""
+    calls_before = len(provider.input_tokens)
+    start = time.perf_counter()
+    results, error = ai.generate_subtasks_batch(tasks, use_cache=False)
+    if error:
+        raise RuntimeError(error)
+    return results, len(provider.input_tokens) - calls_before, time.perf_counter() - start
+
+def main():
+    provider = FakeProvider(latency=ROUND_TRIP_SECONDS, tokens_per_second=0,
+                            seconds_per_input_token=SECONDS_PER_INPUT_TOKEN)
+    ai.set_provider(provider)
+    ai.set_limiter(AILimiter(requests_per_minute=60000, burst=1000))
+
+    print(f"fake provider: {ROUND_TRIP_SECONDS * 1000:.0f}ms round trip, batch size {ai.SUBTASK_BATCH_SIZE}\n")
+    print(f"{'tasks':>5}  {'one at a time':>24}  {'batched':>24}  {'input tokens':>14}")
+    for count in LIST_SIZES:
+        tasks = make_tasks(count)
+        single_results, single_calls, single_seconds = one_at_a_time(provider, tasks)
+        single_tokens = sum(list(provider.input_tokens)[-single_calls:])
+        batch_results, batch_calls, batch_seconds = batched(provider, tasks)
+        batch_tokens = sum(list(provider.input_tokens)[-batch_calls:])
+        print(f"{count:>5}  {single_calls:>6} calls {single_seconds:>9.2f}s  "
+              f"{batch_calls:>6} calls {batch_seconds:>9.2f}s  {single_tokens:>6} vs {batch_tokens:<6}"
+              f"  ({len(batch_results)}/{len(single_results)} tasks broken down)")
+
+if __name__ == "__main__":
+    main()
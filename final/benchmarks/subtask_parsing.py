@@ -0,0 +1,89 @@
+"""
+Parse success rate and time for subtask replies.
+
+Runs every reply in benchmarks/data/subtask_outputs.json through
+utils.ai.parse_subtasks and through the previous line-by-line parser, and
+counts a parse as successful only when it yields exactly the expected
+subtasks. The corpus covers the shapes model replies come in: schema JSON,
+fenced or prose-wrapped JSON, slightly broken JSON, and numbered or bulleted
+lists with preambles, headings and closing notes. Add new replies to the
+corpus as they are seen; tests/test_subtask_parsing.py checks the same corpus,
+plus batch replies in subtask_batch_outputs.json.
+
+Exits with status 1 if any corpus entry fails to parse. No network access,
+API key or database is needed.
+
+Run from the project root: python benchmarks/subtask_parsing.py
+"""
+import json
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from utils.ai import parse_subtasks
+
+CORPUS_PATH = os.path.join(ROOT_DIR, "benchmarks", "data", "subtask_outputs.json")
+ITERATIONS = 200
+
+def legacy_parse(response_text):
+    """The parser generate_subtasks used before structured output"""
+    subtasks = []
+    for line in response_text.strip().split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        parts = line.split('. ', 1)
+        if len(parts) == 2 and parts[0].isdigit():
+            subtask = parts[1].strip()
+            if subtask:
+                subtasks.append(subtask)
+        else:
+            subtasks.append(line)
+    return subtasks
+
+def time_parser(parse, outputs):
+    """Average seconds per reply"""
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for output in outputs:
+            parse(output)
+    return (time.perf_counter() - start) / (ITERATIONS * len(outputs))
+
+def main():
+    with open(CORPUS_PATH, encoding="utf-8") as corpus_file:
+        corpus = json.load(corpus_file)
+
+    methods = {}
+    failures = []
+    legacy_successes = 0
+    legacy_extra = 0
+    for case in corpus:
+        subtasks, method = parse_subtasks(case["output"])
+        methods[method] = methods.get(method, 0) + 1
+        if subtasks != case["expected"]:
+            failures.append((case["name"], subtasks))
+
+        legacy = legacy_parse(case["output"])
+        if legacy == case["expected"]:
+            legacy_successes += 1
+        # Bogus items the user would have had to delete by hand
+        legacy_extra += len([item for item in legacy if item not in case["expected"]])
+
+    outputs = [case["output"] for case in corpus]
+    total = len(corpus)
+    print(f"corpus: {total} replies")
+    print(f"parse_subtasks: {total - len(failures)}/{total} parsed exactly "
+          f"({100 * (total - len(failures)) / total:.0f}%), {time_parser(parse_subtasks, outputs) * 1e6:.1f} µs per reply")
+    print("  by method: " + ", ".join(f"{method or 'failed'} {count}" for method, count in sorted(methods.items(), key=str)))
+    print(f"legacy parser:  {legacy_successes}/{total} parsed exactly ({100 * legacy_successes / total:.0f}%), "
+          f"{legacy_extra} bogus subtasks, {time_parser(legacy_parse, outputs) * 1e6:.1f} µs per reply")
+
+    for name, subtasks in failures:
+        print(f"  FAIL {name}: {subtasks}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compare the per-rerun theme CSS payload before and after precompiled stylesheets.
+Run from the project root: python benchmarks/theme_payload.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.theme import build_stylesheet, _stylesheet_tag
+from views.focus import focus_page_css, focus_mode_buttons_css, focus_controls_css
+from views.tasks import tasks_page_css
+from views.assistant import assistant_page_css
+
+# Page stylesheets loaded by each page on a typical rerun
+PAGES = {
+    "landing": [],
+    "auth": [],
+    "dashboard": [],
+    "tasks": [(tasks_page_css, ())],
+    "focus": [
+        (focus_page_css, ()),
+        (focus_mode_buttons_css, ("pomodoro",)),
+        (focus_controls_css, ()),
+    ],
+    "assistant": [(assistant_page_css, ())],
+    "vision_board": [],
+    "rewards": [],
+}
+
+# The focus page reruns at 10 Hz while the timer is running
+FOCUS_RERUNS_PER_SECOND = 10
+
+def page_payload(is_dark_theme, stylesheets):
+    """Return (inline bytes, linked bytes) sent for the theme CSS on one rerun"""
+    inline = len(f"<style>{build_stylesheet(is_dark_theme)[0]}</style>")
+    linked = len(_stylesheet_tag(is_dark_theme, None, (), True))
+
+    for page_css, args in stylesheets:
+        css, _ = build_stylesheet(is_dark_theme, page_css, args)
+        inline += len(f"<style>{css}</style>")
+        linked += len(_stylesheet_tag(is_dark_theme, page_css, args, True))
+
+    return inline, linked
+
+def time_build(is_dark_theme, iterations=1000):
+    """Average time to produce the base stylesheet markup once it is cached"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        _stylesheet_tag(is_dark_theme, None, (), True)
+    return (time.perf_counter() - start) / iterations
+
+def main():
+    """Print a payload comparison per page and theme"""
+    print(f"{'page':<14}{'theme':<7}{'inline bytes':>14}{'linked bytes':>14}{'saved':>8}")
+    for theme_name, is_dark_theme in (("light", False), ("dark", True)):
+        for page, stylesheets in PAGES.items():
+            inline, linked = page_payload(is_dark_theme, stylesheets)
+            saved = 100 * (inline - linked) / inline
+            print(f"{page:<14}{theme_name:<7}{inline:>14}{linked:>14}{saved:>7.1f}%")
+
+    inline, linked = page_payload(False, PAGES["focus"])
+    print(f"\nFocus timer at {FOCUS_RERUNS_PER_SECOND} Hz: "
+          f"{inline * FOCUS_RERUNS_PER_SECOND / 1024:.1f} KiB/s inline vs "
+          f"{linked * FOCUS_RERUNS_PER_SECOND / 1024:.1f} KiB/s linked")
+    print(f"Cached stylesheet lookup: {time_build(False) * 1e6:.2f} µs per rerun")
+
+if __name__ == "__main__":
+    main()
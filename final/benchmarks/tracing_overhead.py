@@ -0,0 +1,80 @@
+"""
+Overhead of span tracing, and what a traced rerun looks like.
+
+Times span() and add_span() inside a trace, and both outside a trace, where
+they do nothing. If DATABASE_URL is set, it also traces a few real db
+helpers the way a Tasks rerun calls them. It prints the span tree and
+writes the trace as OTLP/JSON to traces.jsonl in a temporary directory.
+
+Run from the project root: python benchmarks/tracing_overhead.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import tracing
+from utils.tracing import add_span, get_slowest_traces, span, start_trace, to_otlp
+
+ITERATIONS = 20000
+
+def time_calls(call):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        call()
+    return (time.perf_counter() - start) / ITERATIONS
+
+def with_span():
+    with span("db utils.db.get_tasks", statement="SELECT ?"):
+        pass
+
+def recorded_span():
+    now = time.perf_counter()
+    add_span("db utils.db.get_tasks", now, now, statement="SELECT ?")
+
+def print_tree(trace):
+    depths = {trace.root.span_id: 0}
+    for s in sorted(trace.spans, key=lambda s: s.start):
+        depth = depths[s.span_id] = depths.get(s.parent_id, -1) + 1
+        print(f"  {'  ' * depth}{s.name:<{60 - 2 * depth}} {s.duration * 1000:8.2f} ms")
+
+def main():
+    outside_span = time_calls(with_span)
+    outside_add = time_calls(recorded_span)
+    tracing.MAX_SPANS_PER_TRACE = ITERATIONS * 2
+    with start_trace("benchmark"):
+        inside_span = time_calls(with_span)
+        inside_add = time_calls(recorded_span)
+    print("per call:")
+    print(f"  span(), no trace:        {outside_span * 1e6:6.2f} µs")
+    print(f"  add_span(), no trace:    {outside_add * 1e6:6.2f} µs")
+    print(f"  span(), in a trace:      {inside_span * 1e6:6.2f} µs")
+    print(f"  add_span(), in a trace:  {inside_add * 1e6:6.2f} µs")
+    tracing.clear_traces()
+
+    if not os.getenv("DATABASE_URL"):
+        print("\nSet DATABASE_URL to also trace real db helpers.")
+        return
+
+    from utils.db import init_db, get_all_lists_for_user, get_task_statistics
+    init_db()
+    with start_trace("rerun tasks", page="tasks", user_id=1):
+        with span("page tasks"):
+            get_all_lists_for_user(1)
+            get_task_statistics(1)
+    trace = get_slowest_traces(1)[0]
+    print(f"\n{trace.name}: {trace.duration * 1000:.2f} ms, trace {trace.trace_id}")
+    print_tree(trace)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "traces.jsonl")
+        with open(path, "w") as f:
+            f.write(json.dumps(to_otlp(trace)) + "\n")
+        print(f"\nOTLP/JSON: {os.path.getsize(path)} bytes, "
+              f"{len(to_otlp(trace)['resourceSpans'][0]['scopeSpans'][0]['spans'])} spans")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import psycopg2
+from utils.db import get_db_connection
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+class Conversation:
+    """Assistant conversation model: append-only messages plus a rolling summary"""
+
+    @staticmethod
+    def get_latest(user_id):
+        """Get the user's most recently active conversation"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT id, title, summary, summary_through_id, updated_at
+            FROM assistant_conversations
+            WHERE user_id = %s
+            ORDER BY updated_at DESC, id DESC
+            LIMIT 1
+            """,
+            (user_id,)
+        )
+
+        conversation = cursor.fetchone()
+        conn.close()
+
+        return dict(conversation) if conversation else None
+
+    @staticmethod
+    def create(user_id, title=None):
+        """Start a new conversation and return its ID"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(
+                "INSERT INTO assistant_conversations (user_id, title) VALUES (%s, %s) RETURNING id",
+                (user_id, title)
+            )
+            conversation_id = cursor.fetchone()["id"]
+            conn.commit()
+            return conversation_id
+        except psycopg2.Error as e:
+            logger.error("Error creating conversation: %s", e)
+            conn.rollback()
+            return None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def append_turn(conversation_id, user_id, prompt, reply):
+        """Append a prompt and its reply in one transaction and return their message IDs"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(
+                """
+                UPDATE assistant_conversations SET updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND user_id = %s
+                """,
+                (conversation_id, user_id)
+            )
+            if cursor.rowcount == 0:
+                return None
+
+            cursor.execute(
+                """
+                INSERT INTO assistant_messages (conversation_id, role, content)
+                VALUES (%s, 'user', %s), (%s, 'assistant', %s)
+                RETURNING id
+                """,
+                (conversation_id, prompt, conversation_id, reply)
+            )
+            message_ids = sorted(row["id"] for row in cursor.fetchall())
+            conn.commit()
+            return message_ids
+        except psycopg2.Error as e:
+            logger.error("Error saving conversation turn: %s", e)
+            conn.rollback()
+            return None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_messages(conversation_id, user_id, before_id=None, limit=20):
+        """Get a page of messages, oldest first, ending just before before_id
+
+        Returns:
+            tuple: (messages, has_older)
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT m.id, m.role, m.content
+            FROM assistant_messages m
+            JOIN assistant_conversations c ON c.id = m.conversation_id
+            WHERE m.conversation_id = %s AND c.user_id = %s
+              AND (%s IS NULL OR m.id < %s)
+            ORDER BY m.id DESC
+            LIMIT %s
+            """,
+            (conversation_id, user_id, before_id, before_id, limit + 1)
+        )
+
+        rows = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+
+        has_older = len(rows) > limit
+        return list(reversed(rows[:limit])), has_older
+
+    @staticmethod
+    def get_unsummarized_messages(conversation_id, user_id, limit):
+        """Get the most recent messages not yet folded into the summary, oldest first"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT m.id, m.role, m.content
+            FROM assistant_messages m
+            JOIN assistant_conversations c ON c.id = m.conversation_id
+            WHERE m.conversation_id = %s AND c.user_id = %s
+              AND m.id > c.summary_through_id
+            ORDER BY m.id DESC
+            LIMIT %s
+            """,
+            (conversation_id, user_id, limit)
+        )
+
+        rows = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+
+        return list(reversed(rows))
+
+    @staticmethod
+    def save_summary(conversation_id, user_id, summary, kept_messages):
+        """Store the rolling summary, which covers all but the latest kept_messages messages"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(
+                """
+                UPDATE assistant_conversations
+                SET summary = %s,
+                    summary_through_id = COALESCE((
+                        SELECT id FROM assistant_messages
+                        WHERE conversation_id = %s
+                        ORDER BY id DESC
+                        OFFSET %s LIMIT 1
+                    ), 0)
+                WHERE id = %s AND user_id = %s
+                """,
+                (summary, conversation_id, kept_messages, conversation_id, user_id)
+            )
+            conn.commit()
+            return True
+        except psycopg2.Error as e:
+            logger.error("Error saving conversation summary: %s", e)
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
+
+    @staticmethod
+    def delete(conversation_id, user_id):
+        """Delete a conversation and all of its messages"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(
+                "DELETE FROM assistant_conversations WHERE id = %s AND user_id = %s",
+                (conversation_id, user_id)
+            )
+            conn.commit()
+            return True
+        except psycopg2.Error as e:
+            logger.error("Error deleting conversation: %s", e)
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
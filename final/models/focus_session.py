@@ -1,6 +1,9 @@
 import psycopg2
-from database.db_connection import get_db_connection
+from utils.db import get_db_connection
 from models.rewards import Reward
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 class FocusSession:
     @staticmethod
@@ -12,9 +15,8 @@ class FocusSession:
         try:
             # Update session status
             cursor.execute('''
-                UPDATE focus_sessions
-                SET status = 'completed',
-                    completed_at = CURRENT_TIMESTAMP
+                UPDATE focus_session_history
+                SET completed = TRUE
                 WHERE id = %s AND user_id = %s
                 RETURNING id
             ''', (session_id, user_id))
@@ -23,16 +25,16 @@ class FocusSession:
                 # Get total completed sessions count
                 cursor.execute('''
                     SELECT COUNT(*) as count
-                    FROM focus_sessions
-                    WHERE user_id = %s AND status = 'completed'
+                    FROM focus_session_history
+                    WHERE user_id = %s AND completed AND session_type = 'pomodoro'
                 ''', (user_id,))
                 total_completed = cursor.fetchone()['count']
                 
                 # Get total focus time
                 cursor.execute('''
-                    SELECT SUM(duration) as total_time
-                    FROM focus_sessions
-                    WHERE user_id = %s AND status = 'completed'
+                    SELECT SUM(duration_seconds) as total_time
+                    FROM focus_session_history
+                    WHERE user_id = %s AND completed AND session_type = 'pomodoro'
                 ''', (user_id,))
                 total_time = cursor.fetchone()['total_time'] or 0
                 
@@ -55,9 +57,9 @@ class FocusSession:
                 # Check for consecutive sessions
                 cursor.execute('''
                     SELECT COUNT(*) as count
-                    FROM focus_sessions
-                    WHERE user_id = %s AND status = 'completed'
-                    AND completed_at >= CURRENT_TIMESTAMP - INTERVAL '1 day'
+                    FROM focus_session_history
+                    WHERE user_id = %s AND completed AND session_type = 'pomodoro'
+                    AND session_date >= CURRENT_TIMESTAMP - INTERVAL '1 day'
                 ''', (user_id,))
                 consecutive_sessions = cursor.fetchone()['count']
                 success4, rewards4 = Reward.check_and_award_reward(user_id, 'consecutive_focus', consecutive_sessions)
@@ -68,7 +70,7 @@ class FocusSession:
                 return True, newly_earned_rewards
             return False, []
         except psycopg2.Error as e:
-            print(f"Error completing focus session: {e}")
+            logger.error("Error completing focus session: %s", e)
             conn.rollback()
             return False, []
         finally:
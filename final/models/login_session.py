@@ -0,0 +1,125 @@
+import psycopg2
+from utils.db import get_db_connection
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+class LoginSession:
+    """Login session model: one row per signed-in browser, keyed by a hashed token"""
+
+    @staticmethod
+    def create(user_id, token_hash, ttl_seconds):
+        """Store a new session and clear out the user's expired ones"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(
+                "DELETE FROM user_sessions WHERE user_id = %s AND expires_at < CURRENT_TIMESTAMP",
+                (user_id,)
+            )
+            cursor.execute(
+                """
+                INSERT INTO user_sessions (user_id, token_hash, expires_at)
+                VALUES (%s, %s, CURRENT_TIMESTAMP + %s * INTERVAL '1 second')
+                """,
+                (user_id, token_hash, ttl_seconds)
+            )
+            conn.commit()
+            return True
+        except psycopg2.Error as e:
+            logger.error("Error creating login session: %s", e)
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
+
+    @staticmethod
+    def resume(token_hash, ttl_seconds, refresh_after_seconds):
+        """Return the user ID for a live session, sliding its expiry forward
+
+        The expiry is only rewritten once the session hasn't been refreshed for
+        refresh_after_seconds, so most lookups don't write.
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(
+                """
+                SELECT s.id, s.user_id,
+                       s.last_seen_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second' AS needs_refresh
+                FROM user_sessions s
+                WHERE s.token_hash = %s
+                  AND s.expires_at > CURRENT_TIMESTAMP
+                """,
+                (refresh_after_seconds, token_hash)
+            )
+            session = cursor.fetchone()
+            if not session:
+                return None
+
+            if session["needs_refresh"]:
+                cursor.execute(
+                    """
+                    UPDATE user_sessions
+                    SET last_seen_at = CURRENT_TIMESTAMP,
+                        expires_at = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+                    WHERE id = %s
+                    """,
+                    (ttl_seconds, session["id"])
+                )
+                conn.commit()
+            return session["user_id"]
+        except psycopg2.Error as e:
+            logger.error("Error resuming login session: %s", e)
+            conn.rollback()
+            return None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def revoke(token_hash):
+        """End one session"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("DELETE FROM user_sessions WHERE token_hash = %s", (token_hash,))
+            conn.commit()
+            return True
+        except psycopg2.Error as e:
+            logger.error("Error revoking login session: %s", e)
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
+
+    @staticmethod
+    def revoke_for_user(user_id, keep_token_hash=None):
+        """End all of a user's sessions, optionally keeping the current one
+
+        Returns:
+            list: token hashes of the revoked sessions
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(
+                """
+                DELETE FROM user_sessions
+                WHERE user_id = %s AND (%s IS NULL OR token_hash <> %s)
+                RETURNING token_hash
+                """,
+                (user_id, keep_token_hash, keep_token_hash)
+            )
+            token_hashes = [row["token_hash"] for row in cursor.fetchall()]
+            conn.commit()
+            return token_hashes
+        except psycopg2.Error as e:
+            logger.error("Error revoking login sessions: %s", e)
+            conn.rollback()
+            return []
+        finally:
+            conn.close()
@@ -1,6 +1,9 @@
 import psycopg2
 from utils.db import get_db_connection
 import streamlit as st
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 class Reward:
     """Reward model for handling user rewards and achievements"""
@@ -189,7 +192,7 @@ class Reward:
             
             return True, []
         except psycopg2.Error as e:
-            print(f"Error in check_and_award_reward: {e}")
+            logger.error("Error in check_and_award_reward: %s", e)
             conn.rollback()
             conn.close()
             return False, []
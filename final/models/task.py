@@ -1,6 +1,9 @@
 import psycopg2
 from utils.db import get_db_connection
 from models.rewards import Reward
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 class Task:
     """Task model for handling task-related database operations"""
@@ -127,7 +130,7 @@ class Task:
                 return True, newly_earned_rewards
             return False, []
         except psycopg2.Error as e:
-            print(f"Error completing task: {e}")
+            logger.error("Error completing task: %s", e)
             conn.rollback()
             return False, []
         finally:
@@ -6,7 +6,8 @@ from utils.db import (
     add_vision_board_tile,
     update_vision_board_tile,
     delete_vision_board_tile,
-    update_tile_positions
+    update_tile_positions,
+    move_tile_between
 )
 from models.rewards import Reward
 
@@ -69,4 +70,9 @@ class VisionBoard:
     @staticmethod
     def reorder_tiles(positions_dict, user_id):
         """Update positions of multiple tiles at once"""
-        return update_tile_positions(positions_dict, user_id)
\ No newline at end of file
+        return update_tile_positions(positions_dict, user_id)
+    
+    @staticmethod
+    def move_tile(tile_id, user_id, before_tile_id=None, after_tile_id=None):
+        """Move a single tile between two neighbours without renumbering the rest"""
+        return move_tile_between(tile_id, user_id, before_tile_id, after_tile_id)
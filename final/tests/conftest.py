@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import app modules (utils, models) the same way app.py and the benchmarks do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,123 @@
+"""
+Concurrency tests for AILimiter and SingleFlight against the fake AI provider.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.ai_limits import AIBusyError, AILimiter, SingleFlight
+from utils.ai_providers import FakeProvider
+
+MODEL = "gemini-1.5-flash-8b"
+
+class CountingProvider(FakeProvider):
+    """Fake provider that records how many calls it receives and how many overlap"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate(self, model_name, prompt, system_instruction=None, response_schema=None):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return super().generate(model_name, prompt, system_instruction, response_schema)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+def run_concurrently(count, call):
+    """Run call(i) on count threads released together; return each result or raised exception"""
+    barrier = threading.Barrier(count)
+
+    def worker(i):
+        barrier.wait()
+        try:
+            return call(i)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        return list(executor.map(worker, range(count)))
+
+@pytest.fixture
+def provider():
+    return CountingProvider(latency=0.1, tokens_per_second=0)
+
+def test_limiter_caps_concurrent_calls(provider):
+    limiter = AILimiter(requests_per_minute=6000, burst=20, max_concurrent=3, max_wait_seconds=10)
+
+    def call(i):
+        with limiter.permit(MODEL):
+            return provider.generate(MODEL, f"Task {i}")
+
+    results = run_concurrently(12, call)
+
+    assert not [result for result in results if isinstance(result, Exception)]
+    assert provider.calls == 12
+    assert provider.peak_in_flight == 3
+    stats = limiter.stats()
+    assert stats["calls"] == 12
+    assert stats["peak_in_flight"] == 3
+    assert stats["in_flight"] == 0
+    # Nine calls had to wait for a slot
+    assert stats["queued"] >= 9
+
+def test_limiter_rejects_calls_that_would_wait_too_long(provider):
+    # Two tokens up front, then one a second; waiting a second is over the limit
+    limiter = AILimiter(requests_per_minute=60, burst=2, max_concurrent=8, max_wait_seconds=0.5)
+
+    def call(i):
+        with limiter.permit(MODEL):
+            return provider.generate(MODEL, f"Task {i}")
+
+    results = run_concurrently(5, call)
+
+    rejected = [result for result in results if isinstance(result, AIBusyError)]
+    assert len(rejected) == 3
+    assert provider.calls == 2
+    assert limiter.stats()["rejected"] == 3
+
+def test_single_flight_makes_one_call_per_key(provider):
+    flights = SingleFlight()
+
+    results = run_concurrently(8, lambda i: flights.do("same prompt", lambda: provider.generate(MODEL, "File taxes")))
+
+    assert provider.calls == 1
+    assert flights.coalesced == 7
+    assert len(set(results)) == 1
+    assert results[0] == provider.generate(MODEL, "File taxes")
+
+def test_single_flight_keeps_keys_separate(provider):
+    flights = SingleFlight()
+
+    results = run_concurrently(6, lambda i: flights.do(i % 2, lambda: provider.generate(MODEL, f"Task {i % 2}")))
+
+    assert provider.calls == 2
+    assert flights.coalesced == 4
+    assert all(result == provider.generate(MODEL, f"Task {i % 2}") for i, result in enumerate(results))
+
+def test_single_flight_passes_errors_to_waiters():
+    flights = SingleFlight()
+    failing = FakeProvider(latency=0.1, tokens_per_second=0)
+    error = RuntimeError("quota exceeded")
+    calls = []
+
+    def call():
+        calls.append(1)
+        failing.generate(MODEL, "File taxes")
+        raise error
+
+    results = run_concurrently(5, lambda i: flights.do("same prompt", call))
+
+    assert len(calls) == 1
+    assert all(result is error for result in results)
+
+    # The failed flight is forgotten, so the next caller tries again
+    assert flights.do("same prompt", lambda: "ok") == "ok"
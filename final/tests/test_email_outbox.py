@@ -0,0 +1,159 @@
+"""
+Outbox delivery against a local aiosmtpd server.
+
+The database test uses TEST_DATABASE_URL and is skipped without it. Point it at
+a database of its own: it claims every due email in the outbox.
+"""
+import os
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from utils import db, email_outbox
+from utils.email_outbox import SMTPConnection, deliver_emails
+
+HOST = "127.0.0.1"
+SENDER = "zenflowitapp@example.com"
+
+class Handler:
+    """Refuses 'refused' recipients and rejects the first try for 'flaky' ones"""
+
+    def __init__(self):
+        self.received = []
+        self.rejected_once = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("refused"):
+            return "550 No such user here"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        recipient = envelope.rcpt_tos[0]
+        if recipient.startswith("flaky") and recipient not in self.rejected_once:
+            self.rejected_once.add(recipient)
+            return "451 Try again later"
+        self.received.append(recipient)
+        return "250 Message accepted for delivery"
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    handler = Handler()
+    controller = Controller(handler, hostname=HOST, port=free_port())
+    controller.start()
+    try:
+        yield handler, controller.port
+    finally:
+        controller.stop()
+
+@pytest.fixture
+def connection(smtp_server):
+    _, port = smtp_server
+    smtp = SMTPConnection(host=HOST, port=port, starttls=False, username=SENDER, password=None)
+    yield smtp
+    smtp.close()
+
+@pytest.fixture
+def outbox(monkeypatch):
+    """Record the outbox table calls deliver_emails makes instead of writing them"""
+    calls = {"deleted": [], "failed": []}
+    monkeypatch.setattr(email_outbox, "delete_sent_emails", lambda ids: calls["deleted"].extend(ids) or True)
+    monkeypatch.setattr(email_outbox, "fail_outbox_email",
+                        lambda email_id, error, delay=None: calls["failed"].append((email_id, error, delay)) or True)
+    return calls
+
+def email(email_id, recipient, attempts=1):
+    return {"id": email_id, "recipient": recipient, "subject": "Hi", "body": f"Email {email_id}", "attempts": attempts}
+
+def test_sent_emails_are_deleted_over_one_connection(smtp_server, connection, outbox):
+    handler, _ = smtp_server
+
+    sent, failed = deliver_emails(connection, [email(1, "a@example.com"), email(2, "b@example.com")])
+
+    assert (sent, failed) == (2, 0)
+    assert outbox["deleted"] == [1, 2]
+    assert outbox["failed"] == []
+    assert handler.received == ["a@example.com", "b@example.com"]
+    assert connection.connects == 1
+
+def test_temporary_failure_is_retried_with_backoff(smtp_server, connection, outbox):
+    handler, _ = smtp_server
+
+    sent, failed = deliver_emails(connection, [email(1, "a@example.com"), email(2, "flaky@example.com", attempts=2),
+                                               email(3, "b@example.com")])
+
+    assert (sent, failed) == (2, 1)
+    assert outbox["deleted"] == [1, 3]
+    [(email_id, error, delay)] = outbox["failed"]
+    assert email_id == 2
+    assert error.startswith("SMTP error occurred") and "451" in error
+    assert delay == email_outbox.RETRY_BASE_SECONDS * 2
+
+    # The retry goes through on the next attempt
+    outbox["deleted"].clear()
+    assert deliver_emails(connection, [email(2, "flaky@example.com", attempts=3)]) == (1, 0)
+    assert outbox["deleted"] == [2]
+    assert handler.received == ["a@example.com", "b@example.com", "flaky@example.com"]
+
+def test_last_attempt_fails_for_good(connection, outbox):
+    sent, failed = deliver_emails(connection, [email(1, "flaky@example.com", attempts=email_outbox.MAX_ATTEMPTS)])
+
+    assert (sent, failed) == (0, 1)
+    assert outbox["deleted"] == []
+    [(email_id, _, delay)] = outbox["failed"]
+    assert (email_id, delay) == (1, None)
+
+def test_refused_recipient_is_not_retried(connection, outbox):
+    sent, failed = deliver_emails(connection, [email(1, "refused@example.com"), email(2, "a@example.com")])
+
+    assert (sent, failed) == (1, 1)
+    assert outbox["deleted"] == [2]
+    [(email_id, error, delay)] = outbox["failed"]
+    assert (email_id, delay) == (1, None)
+    assert error.startswith("Recipient refused")
+
+@pytest.fixture
+def test_database(monkeypatch):
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    monkeypatch.setenv("DATABASE_URL", url)
+    db.init_db()
+
+def test_outbox_rows_change_status(test_database, connection):
+    ids = [db.enqueue_email(recipient, "Hi", "Body")
+           for recipient in ("a@example.com", "flaky@example.com", "refused@example.com")]
+    try:
+        emails = db.claim_outbox_emails(email_outbox.BATCH_SIZE, email_outbox.STALE_EMAIL_SECONDS)
+        assert [row["id"] for row in emails if row["id"] in ids] == ids
+        assert all(row["attempts"] == 1 for row in emails)
+
+        assert deliver_emails(connection, emails) == (len(emails) - 2, 2)
+
+        conn = db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, status, attempts, error, run_after > CURRENT_TIMESTAMP AS deferred
+                FROM email_outbox WHERE id = ANY(%s)
+            """, (ids,))
+            rows = {row["id"]: row for row in cursor.fetchall()}
+        finally:
+            conn.close()
+
+        sent_id, flaky_id, refused_id = ids
+        assert sent_id not in rows
+        assert rows[flaky_id]["status"] == "pending"
+        assert rows[flaky_id]["attempts"] == 1
+        assert rows[flaky_id]["deferred"]
+        assert "451" in rows[flaky_id]["error"]
+        assert rows[refused_id]["status"] == "failed"
+        assert rows[refused_id]["error"].startswith("Recipient refused")
+    finally:
+        db.delete_sent_emails(ids)
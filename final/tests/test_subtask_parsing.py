@@ -0,0 +1,56 @@
+"""
+Checks parse_subtasks and parse_subtasks_batch against the captured replies in benchmarks/data.
+"""
+import json
+import os
+
+import pytest
+
+from utils import ai
+from utils.ai_providers import BATCH_TASKS_MARKER, FakeProvider
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "data")
+
+def load_corpus(filename):
+    with open(os.path.join(DATA_DIR, filename), encoding="utf-8") as corpus_file:
+        return json.load(corpus_file)
+
+SUBTASK_OUTPUTS = load_corpus("subtask_outputs.json")
+BATCH_OUTPUTS = load_corpus("subtask_batch_outputs.json")
+
+@pytest.mark.parametrize("case", SUBTASK_OUTPUTS, ids=[case["name"] for case in SUBTASK_OUTPUTS])
+def test_parse_subtasks(case):
+    subtasks, method = ai.parse_subtasks(case["output"])
+
+    assert subtasks == case["expected"]
+    assert method in ("json", "repaired", "list")
+
+@pytest.mark.parametrize("case", BATCH_OUTPUTS, ids=[case["name"] for case in BATCH_OUTPUTS])
+def test_parse_subtasks_batch(case):
+    results = ai.parse_subtasks_batch(case["output"], case["task_ids"])
+
+    # JSON object keys are strings; the parser returns the caller's task ids
+    assert {str(task_id): subtasks for task_id, subtasks in results.items()} == case["expected"]
+    assert all(task_id in case["task_ids"] for task_id in results)
+
+def test_batch_prompt_round_trip(monkeypatch):
+    """A batch prompt carries its tasks after BATCH_TASKS_MARKER and every task gets its subtasks back"""
+    provider = FakeProvider(latency=0, tokens_per_second=0)
+    prompts = []
+    generate = provider.generate
+
+    def recording_generate(model_name, prompt, system_instruction=None, response_schema=None):
+        prompts.append(prompt)
+        return generate(model_name, prompt, system_instruction, response_schema)
+
+    monkeypatch.setattr(provider, "generate", recording_generate)
+    monkeypatch.setattr(ai, "_provider", provider)
+    tasks = [{"id": 11, "name": "File taxes"}, {"id": 12, "name": "Plan a party", "description": "Saturday"}]
+
+    results, error = ai.generate_subtasks_batch(tasks, use_cache=False)
+
+    assert error is None
+    assert len(prompts) == 1
+    sent = json.loads(prompts[0].split(BATCH_TASKS_MARKER, 1)[1])
+    assert [task["task_id"] for task in sent] == [11, 12]
+    assert results == {task["id"]: provider._steps_for(task["name"]) for task in tasks}
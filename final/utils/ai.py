@@ -1,20 +1,168 @@
+import hashlib
+import json
+import math
 import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 import streamlit as st
-import google.generativeai as genai
 from dotenv import load_dotenv
+from utils.ai_cache import make_cache_key, get_cached, set_cached
+from utils.ai_providers import provider_from_env, BATCH_TASKS_MARKER
+from utils.ai_limits import AILimiter, SingleFlight
+from utils.log import get_logger
+from utils.metrics import ai_call_seconds, ai_call_errors
+from utils.tracing import add_span
+
+logger = get_logger(__name__)
 
 # Load environment variables
 load_dotenv()
 
-# Configure the Gemini API
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Models used by each feature
+ASSISTANT_MODEL = "gemini-1.5-flash"
+GENERATION_MODEL = "gemini-1.5-flash-8b"
+
+# Tasks decomposed per model call by generate_subtasks_batch
+SUBTASK_BATCH_SIZE = 20
+MAX_SUBTASKS_PER_TASK = 10
+
+# Subtasks longer than this are prose the model wrapped around the list, not steps
+MAX_SUBTASK_LENGTH = 200
+
+# JSON schema for generate_subtasks output
+SUBTASKS_SCHEMA = {"type": "array", "items": {"type": "string"}}
+
+# JSON schema for batch output: one entry per task with its subtasks
+SUBTASKS_BATCH_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "task_id": {"type": "integer"},
+            "subtasks": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": ["task_id", "subtasks"]
+    }
+}
+
+# Bump these when a prompt template changes so cached responses are not reused
+SUBTASKS_TEMPLATE_VERSION = 2
+ACTION_PLAN_TEMPLATE_VERSION = 1
+
+# System prompt to ensure the assistant stays within productivity scope
+ASSISTANT_SYSTEM_PROMPT = """
+You are ZenCoach, a productivity and time management AI assistant within the ZenFlow app.
+
+Guidelines:
+1. Only respond to questions related to productivity, time management, goal setting, habit formation,
+   work-life balance, focus techniques, procrastination, and related productivity topics.
+2. For any questions outside this scope, politely redirect the conversation back to productivity.
+3. Provide practical, actionable advice backed by research when possible.
+4. Keep responses concise but thorough, focusing on usable tips.
+5. Be encouraging and supportive, but honest.
+6. Only reference features that actually exist in the ZenFlow app:
+   - Tasks: Create and manage tasks with deadlines, reminders, and AI-generated subtasks
+   - Focus: Pomodoro timer with customizable work/break durations
+   - Vision Board: Visualize goals with customizable themes and layouts
+   - AI Assistant: Get productivity advice and guidance
+
+Remember: Your purpose is to help users improve their productivity and achieve their goals.
+Do not mention features that don't exist in the app.
+"""
+
+# Assistant history sent with each prompt: the last turns verbatim plus a rolling
+# summary of older ones, kept under a token budget
+HISTORY_KEEP_TURNS = 6
+HISTORY_TOKEN_BUDGET = 2000
+SUMMARY_TOKEN_BUDGET = 300
+# Older turns are folded into the summary in batches to avoid a summary call per message
+SUMMARY_BATCH_TURNS = 2
+# Rough size of a token for English text, good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+# Recent assistant latencies (time to first token and total) for monitoring
+LATENCY_WINDOW = 200
+_assistant_latencies = deque(maxlen=LATENCY_WINDOW)
+
+# Provider used for every model call, created on first use
+_provider = None
+_provider_lock = threading.Lock()
+
+# Outbound calls share per-model rate limits and a global concurrency cap;
+# identical generate calls in flight at the same time share one request
+_limiter = AILimiter(
+    requests_per_minute=float(os.getenv("AI_REQUESTS_PER_MINUTE", "60")),
+    burst=int(os.getenv("AI_BURST", "10")),
+    max_concurrent=int(os.getenv("AI_MAX_CONCURRENT_CALLS", "8")),
+    max_wait_seconds=float(os.getenv("AI_MAX_QUEUE_WAIT_SECONDS", "20"))
+)
+_single_flight = SingleFlight()
+
+def get_provider():
+    """Return the process-wide AI provider selected by AI_PROVIDER"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = provider_from_env()
+    return _provider
+
+def set_provider(provider):
+    """Replace the AI provider, e.g. with a FakeProvider for benchmarks"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+def set_limiter(limiter):
+    """Replace the outbound call limiter, e.g. with different limits for a load test"""
+    global _limiter
+    _limiter = limiter
+
+def get_limiter_stats():
+    """Return limiter counts, queued-wait percentiles (seconds) and coalesced calls"""
+    stats = _limiter.stats()
+    stats["coalesced"] = _single_flight.coalesced
+    return stats
+
+@contextmanager
+def _timed_call(model_name, kind):
+    """Record a provider call's latency, after the limiter has let it through, for /metrics and tracing"""
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        ai_call_errors.inc(model=model_name, kind=kind)
+        raise
+    finally:
+        end = time.perf_counter()
+        ai_call_seconds.observe(end - start, model=model_name, kind=kind)
+        # Recorded after the fact: a streamed call yields in between, so it can't be the current span
+        add_span(f"ai.{kind}", start, end, error=error, model=model_name)
+
+def _generate(provider, model_name, prompt, system_instruction=None, response_schema=None):
+    """Call provider.generate within the limits, sharing identical in-flight calls"""
+    flight_key = hashlib.sha256(
+        json.dumps([provider.name, model_name, system_instruction, prompt, response_schema]).encode("utf-8")
+    ).hexdigest()
+    
+    def call():
+        with _limiter.permit(model_name), _timed_call(model_name, "generate"):
+            return provider.generate(model_name, prompt, system_instruction, response_schema)
+    
+    return _single_flight.do(flight_key, call)
 
 def initialize_gemini():
-    """Initialize the Gemini API with the API key"""
-    if GEMINI_API_KEY:
-        genai.configure(api_key=GEMINI_API_KEY)
-        return True
-    return False
+    """Return True if the configured provider is ready (for Gemini, that an API key is set)"""
+    return get_provider().available()
+
+def _provider_unavailable_message():
+    """Error shown when the provider can't be used"""
+    return "Gemini API key not configured. Please check your .env file."
 
 def get_ai_assistant_response(prompt, chat_history=None):
     """Get a response from the AI assistant using Gemini 1.5 Flash
@@ -24,65 +172,248 @@ def get_ai_assistant_response(prompt, chat_history=None):
         chat_history (list): Optional list of previous chat messages
         
     Returns:
-        tuple: (response_text, error_message)
+        tuple: (response_text, updated_history, error_message)
     """
-    # Check if API key is configured
-    if not GEMINI_API_KEY:
-        return None, None, "Gemini API key not configured. Please check your .env file."
+    provider = get_provider()
+    if not provider.available():
+        return None, None, _provider_unavailable_message()
     
     try:
-        # Initialize the model with gemini-1.5-flash
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        # Define system prompt to ensure the assistant stays within productivity scope
-        system_prompt = """
-        You are ZenCoach, a productivity and time management AI assistant within the ZenFlow app.
-        
-        Guidelines:
-        1. Only respond to questions related to productivity, time management, goal setting, habit formation,
-           work-life balance, focus techniques, procrastination, and related productivity topics.
-        2. For any questions outside this scope, politely redirect the conversation back to productivity.
-        3. Provide practical, actionable advice backed by research when possible.
-        4. Keep responses concise but thorough, focusing on usable tips.
-        5. Be encouraging and supportive, but honest.
-        6. Only reference features that actually exist in the ZenFlow app:
-           - Tasks: Create and manage tasks with deadlines, reminders, and AI-generated subtasks
-           - Focus: Pomodoro timer with customizable work/break durations
-           - Vision Board: Visualize goals with customizable themes and layouts
-           - AI Assistant: Get productivity advice and guidance
-        
-        Remember: Your purpose is to help users improve their productivity and achieve their goals.
-        Do not mention features that don't exist in the app.
-        """
-        
-        # Create a chat session if there's no history
-        if not chat_history:
-            chat = model.start_chat(history=[])
-            # Add the system prompt as the first message
-            chat.send_message(system_prompt)
-        else:
-            # If chat history exists, reconstruct the chat
-            chat = model.start_chat(history=chat_history)
-        
-        # Send the user's prompt and get response
-        response = chat.send_message(prompt)
+        # The system prompt is sent as a system instruction, not as an extra chat turn
+        history = list(chat_history or [])
+        with _limiter.permit(ASSISTANT_MODEL), _timed_call(ASSISTANT_MODEL, "chat"):
+            text = provider.chat(ASSISTANT_MODEL, history, prompt, ASSISTANT_SYSTEM_PROMPT)
         
         # Return the response text and the updated chat history
-        return response.text, chat.history, None
+        history.extend([{"role": "user", "parts": [prompt]}, {"role": "model", "parts": [text]}])
+        return text, history, None
     
     except Exception as e:
+        logger.warning("Error getting AI response: %s", e, extra={"model": ASSISTANT_MODEL})
         return None, None, f"Error getting AI response: {str(e)}"
 
-def generate_subtasks(task_name, task_description=None):
-    """Generate subtasks for a given task using Gemini AI"""
-    # Check if API key is configured
-    if not GEMINI_API_KEY:
-        return None, "Gemini API key not configured. Please check your .env file."
+def stream_ai_assistant_response(prompt, chat_history=None, result=None):
+    """Stream the assistant's reply, yielding text chunks as the provider produces them
+    
+    Args:
+        prompt (str): The user's question or prompt
+        chat_history (list): Optional list of previous chat messages
+        result (dict): Filled in when the stream ends with text, history, error,
+            time_to_first_token and total_latency (seconds)
+        
+    Yields:
+        str: Chunks of the response text
+    """
+    if result is None:
+        result = {}
+    result.update(text="", history=None, error=None, time_to_first_token=None, total_latency=None)
+    
+    provider = get_provider()
+    if not provider.available():
+        result["error"] = _provider_unavailable_message()
+        return
+    
+    start = time.perf_counter()
+    chunks = []
+    try:
+        history = list(chat_history or [])
+        # The concurrency slot is held until the stream ends or is abandoned
+        with _limiter.permit(ASSISTANT_MODEL), _timed_call(ASSISTANT_MODEL, "stream"):
+            for text in provider.stream(ASSISTANT_MODEL, history, prompt, ASSISTANT_SYSTEM_PROMPT):
+                if result["time_to_first_token"] is None:
+                    result["time_to_first_token"] = time.perf_counter() - start
+                chunks.append(text)
+                yield text
+        
+        # The history only includes the reply once the stream is fully consumed
+        history.extend([{"role": "user", "parts": [prompt]}, {"role": "model", "parts": ["".join(chunks)]}])
+        result["history"] = history
+    except Exception as e:
+        logger.warning("Error streaming AI response: %s", e, extra={"model": ASSISTANT_MODEL})
+        result["error"] = f"Error getting AI response: {str(e)}"
+    finally:
+        result["text"] = "".join(chunks)
+        result["total_latency"] = time.perf_counter() - start
+        if not result["error"]:
+            _assistant_latencies.append((result["time_to_first_token"], result["total_latency"]))
+            logger.debug("Streamed assistant reply", extra={"time_to_first_token": result["time_to_first_token"],
+                                                            "total_latency": result["total_latency"], "chars": len(result["text"])})
+
+def _percentile(values, percent):
+    """Return the nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def get_assistant_latency_stats():
+    """Summarize recent streamed assistant replies (seconds)"""
+    samples = list(_assistant_latencies)
+    first_token = [ttft for ttft, _ in samples if ttft is not None]
+    total = [latency for _, latency in samples]
+    return {
+        "count": len(samples),
+        "time_to_first_token_p50": _percentile(first_token, 50),
+        "time_to_first_token_p95": _percentile(first_token, 95),
+        "total_latency_p50": _percentile(total, 50),
+        "total_latency_p95": _percentile(total, 95),
+    }
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in a piece of text"""
+    if not text:
+        return 0
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+def new_chat_history():
+    """Return an empty assistant history: a rolling summary plus recent (prompt, reply) turns"""
+    return {"summary": "", "turns": []}
+
+def restore_chat_history(summary, messages):
+    """Rebuild a managed history from a stored summary and the messages after it
+    
+    Args:
+        summary (str): The stored rolling summary
+        messages (list): Dicts with role ("user" or "assistant") and content, oldest first
+    """
+    history = new_chat_history()
+    history["summary"] = summary or ""
+    prompt = None
+    for message in messages:
+        if message["role"] == "user":
+            prompt = message["content"]
+        elif prompt is not None:
+            history["turns"].append((prompt, message["content"]))
+            prompt = None
+    return history
+
+def history_tokens(history):
+    """Estimate the tokens a history adds to every prompt"""
+    total = estimate_tokens(history["summary"])
+    for prompt, reply in history["turns"]:
+        total += estimate_tokens(prompt) + estimate_tokens(reply)
+    return total
+
+def build_chat_history(history):
+    """Convert a managed history into the message list Gemini's start_chat expects"""
+    messages = []
+    if history["summary"]:
+        messages.append({"role": "user", "parts": [f"Summary of our conversation so far:\n{history['summary']}"]})
+        messages.append({"role": "model", "parts": ["Thanks, I'll keep that in mind."]})
+    for prompt, reply in history["turns"]:
+        messages.append({"role": "user", "parts": [prompt]})
+        messages.append({"role": "model", "parts": [reply]})
+    return messages
+
+def record_chat_turn(history, prompt, reply, summarize=None):
+    """Add a finished turn and fold older turns into the summary when over budget
+    
+    Args:
+        history (dict): History from new_chat_history, updated in place
+        prompt (str): The user's message
+        reply (str): The assistant's reply
+        summarize (callable): Optional (summary, turns) -> (text, error) used instead of summarize_turns
+        
+    Returns:
+        dict: The updated history
+    """
+    history["turns"].append((prompt, reply))
+    
+    # Turns beyond the verbatim window are folded once a full batch has built up
+    fold_count = 0
+    if len(history["turns"]) >= HISTORY_KEEP_TURNS + SUMMARY_BATCH_TURNS:
+        fold_count = len(history["turns"]) - HISTORY_KEEP_TURNS
+    
+    # Long messages can exceed the budget before the window fills; the latest turn always stays
+    remaining = history_tokens(history)
+    for old_prompt, old_reply in history["turns"][:-1]:
+        if remaining <= HISTORY_TOKEN_BUDGET:
+            break
+        remaining -= estimate_tokens(old_prompt) + estimate_tokens(old_reply)
+        fold_count += 1
+    fold_count = min(max(fold_count, 0), len(history["turns"]) - 1)
+    
+    if fold_count:
+        folded = history["turns"][:fold_count]
+        summary, error = (summarize or summarize_turns)(history["summary"], folded)
+        if error or not summary:
+            summary = _fallback_summary(history["summary"], folded)
+        history["summary"] = _truncate_to_tokens(summary, SUMMARY_TOKEN_BUDGET)
+        history["turns"] = history["turns"][fold_count:]
+    
+    return history
+
+def summarize_turns(summary, turns):
+    """Fold turns into the running conversation summary using Gemini
+    
+    Returns:
+        tuple: (summary_text, error_message)
+    """
+    provider = get_provider()
+    if not provider.available():
+        return None, _provider_unavailable_message()
     
     try:
-        # Initialize the model
-        model = genai.GenerativeModel('gemini-1.5-flash-8b')
+        transcript = "\n".join(f"User: {prompt}\nAssistant: {reply}" for prompt, reply in turns)
+        prompt = f"""
+        Current summary of a conversation between a user and a productivity coach:
+        {summary or "(none)"}
         
+        New messages:
+        {transcript}
+        
+        Rewrite the summary to include the new messages. Keep the user's goals, constraints,
+        decisions and any advice they said they would follow. Use at most {SUMMARY_TOKEN_BUDGET * 3 // 4} words
+        and reply with the summary only.
+        """
+        return _generate(provider, GENERATION_MODEL, prompt).strip(), None
+    except Exception as e:
+        logger.warning("Error summarizing chat history: %s", e, extra={"model": GENERATION_MODEL})
+        return None, f"Error summarizing chat history: {str(e)}"
+
+def _fallback_summary(summary, turns):
+    """Summarize without the model by keeping the first sentence of each folded message"""
+    lines = [summary] if summary else []
+    for prompt, reply in turns:
+        lines.append(f"User asked: {_first_sentence(prompt)}")
+        lines.append(f"Coach answered: {_first_sentence(reply)}")
+    return "\n".join(lines)
+
+def _first_sentence(text):
+    """Return the first sentence of a message, on one line"""
+    text = " ".join(text.split())
+    for end in (". ", "? ", "! "):
+        index = text.find(end)
+        if index != -1:
+            return text[:index + 1]
+    return text
+
+def _truncate_to_tokens(text, tokens):
+    """Trim text to roughly a number of tokens, keeping the most recent part"""
+    max_chars = tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return "..." + text[-(max_chars - 3):]
+
+def _cache_model_name(provider):
+    """Model name used in cache keys, so different providers never share entries"""
+    return f"{provider.name}:{GENERATION_MODEL}"
+
+def generate_subtasks(task_name, task_description=None, use_cache=True):
+    """Generate subtasks for a given task using Gemini AI (use_cache=False bypasses the cache)"""
+    provider = get_provider()
+    if not provider.available():
+        return None, _provider_unavailable_message()
+    
+    cache_model = _cache_model_name(provider)
+    cache_key = make_cache_key("subtasks", cache_model, SUBTASKS_TEMPLATE_VERSION, task_name, task_description)
+    if use_cache:
+        cached = get_cached(cache_key)
+        if cached:
+            return cached, None
+    
+    try:
         # Create prompt
         description_text = f" Description: {task_description}" if task_description else ""
         prompt = f"""
@@ -92,52 +423,219 @@ def generate_subtasks(task_name, task_description=None):
 
         Only include as many subtasks as are reasonably necessary to complete the task effectively — avoid over-explaining trivial actions.
         For simple tasks, return only a few high-level steps.
-        For complex tasks, expand with more detailed steps (up to 10).
-        Format the output as a numbered list of subtasks only, with no extra explanation.
-        Example:
-        1. First subtask
-        2. Second subtask
-        3. Third subtask
+        For complex tasks, expand with more detailed steps (up to {MAX_SUBTASKS_PER_TASK}).
+        Respond with a JSON array of strings, one per subtask, in order. Do not number them.
         """
         
-        # Generate response
-        response = model.generate_content(prompt)
-        
-        # Process response text to extract subtasks
-        response_text = response.text.strip()
-        
-        # Parse the numbered list
-        subtasks = []
-        for line in response_text.split('\n'):
-            line = line.strip()
-            # Skip empty lines
-            if not line:
-                continue
-            
-            # Try to match numbered format (e.g., "1. Subtask")
-            parts = line.split('. ', 1)
-            if len(parts) == 2 and parts[0].isdigit():
-                subtask = parts[1].strip()
-                if subtask:
-                    subtasks.append(subtask)
-            else:
-                # Include lines that don't match the numbered format
-                subtasks.append(line)
+        # Ask for JSON matching the schema; parse_subtasks copes with replies that aren't
+        response_text = _generate(provider, GENERATION_MODEL, prompt, response_schema=SUBTASKS_SCHEMA)
+        subtasks, method = parse_subtasks(response_text)
+        if method != "json":
+            logger.info("Subtask reply needed fallback parsing", extra={"method": method})
+        
+        if subtasks and use_cache:
+            set_cached(cache_key, "subtasks", cache_model, subtasks)
         
         return subtasks, None
     except Exception as e:
+        logger.warning("Error generating subtasks: %s", e, extra={"model": GENERATION_MODEL})
         return None, f"Error generating subtasks: {str(e)}"
 
-def generate_action_plan(task_name, task_description=None, subtasks=None):
-    """Generate a detailed action plan for a task using Gemini AI"""
-    # Check if API key is configured
-    if not GEMINI_API_KEY:
-        return None, "Gemini API key not configured. Please check your .env file."
+def generate_subtasks_batch(tasks, use_cache=True):
+    """Generate subtasks for many tasks with one model call per SUBTASK_BATCH_SIZE tasks
     
-    try:
-        # Initialize the model
-        model = genai.GenerativeModel('gemini-1.5-flash-8b')
+    Args:
+        tasks (list): Dicts with id, name and optionally description
+        use_cache (bool): Read and fill the same cache entries as generate_subtasks
+        
+    Returns:
+        tuple: ({task_id: [subtask, ...]}, error_message). Tasks the model skipped are left out.
+    """
+    provider = get_provider()
+    if not provider.available():
+        return None, _provider_unavailable_message()
+    
+    cache_model = _cache_model_name(provider)
+    results = {}
+    pending = []
+    for task in tasks:
+        cache_key = make_cache_key("subtasks", cache_model, SUBTASKS_TEMPLATE_VERSION,
+                                   task["name"], task.get("description"))
+        cached = get_cached(cache_key) if use_cache else None
+        if cached:
+            results[task["id"]] = cached
+        else:
+            pending.append((task, cache_key))
+    
+    errors = []
+    for start in range(0, len(pending), SUBTASK_BATCH_SIZE):
+        batch = pending[start:start + SUBTASK_BATCH_SIZE]
+        task_list = [{"task_id": task["id"], "task": task["name"], "description": task.get("description") or ""}
+                     for task, _ in batch]
+        prompt = f"""
+        Break down each of the tasks below into a logical sequence of clear, specific, and actionable
+        subtasks that can be completed one by one.
+        
+        Only include as many subtasks as are reasonably necessary for each task — avoid over-explaining trivial actions.
+        For simple tasks, return only a few high-level steps.
+        For complex tasks, expand with more detailed steps (up to {MAX_SUBTASKS_PER_TASK}).
+        Respond with a JSON array containing one object per task, in the same order, each with the
+        task's "task_id" and its "subtasks" as an array of strings. Do not number the subtasks.
+        
+        {BATCH_TASKS_MARKER}
+        {json.dumps(task_list)}
+        """
+        
+        try:
+            response_text = _generate(provider, GENERATION_MODEL, prompt, response_schema=SUBTASKS_BATCH_SCHEMA)
+        except Exception as e:
+            logger.warning("Error generating subtasks batch: %s", e, extra={"model": GENERATION_MODEL, "tasks": len(batch)})
+            errors.append(f"Error generating subtasks: {str(e)}")
+            continue
         
+        parsed = parse_subtasks_batch(response_text, [task["id"] for task, _ in batch])
+        for task, cache_key in batch:
+            subtasks = parsed.get(task["id"])
+            if subtasks:
+                results[task["id"]] = subtasks
+                if use_cache:
+                    set_cached(cache_key, "subtasks", cache_model, subtasks)
+    
+    # Partial results are still useful; only report an error if nothing came back
+    if errors and not results:
+        return None, errors[0]
+    return results, None
+
+# List markers the fallback parser strips: "1.", "1)", "Step 1:", "-", "*", "•"
+_LIST_ITEM = re.compile(r"^\s*(?:(?:step\s*)?\d+\s*[.):]|[-*•])\s+(.*)$", re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([\]}])")
+
+def parse_subtasks(response_text):
+    """Parse a subtask reply into a clean list
+    
+    Tries strict JSON first, then repairs common JSON mistakes (code fences,
+    surrounding prose, trailing commas, single quotes), then falls back to
+    reading a numbered or bulleted list.
+    
+    Returns:
+        tuple: (subtasks, method) where method is "json", "repaired", "list" or None
+    """
+    data, method = _load_json(response_text)
+    if isinstance(data, dict):
+        data = next((value for value in data.values() if isinstance(value, list)), None)
+    if isinstance(data, list):
+        subtasks = _clean_subtasks(data)
+        if subtasks:
+            return subtasks, method
+    
+    subtasks = _clean_subtasks(_list_items(response_text))
+    return subtasks, "list" if subtasks else None
+
+def _load_json(text):
+    """Return (data, "json" | "repaired") for JSON in a reply, or (None, None)"""
+    text = (text or "").strip()
+    try:
+        return json.loads(text), "json"
+    except ValueError:
+        pass
+    
+    # Drop code fences, and any prose around the outermost array or object
+    text = re.sub(r"^```[a-zA-Z]*\s*|\s*```$", "", text)
+    starts = [index for index in (text.find("["), text.find("{")) if index != -1]
+    if not starts:
+        return None, None
+    start = min(starts)
+    end = text.rfind("]" if text[start] == "[" else "}")
+    if end <= start:
+        return None, None
+    candidate = _TRAILING_COMMA.sub(r"\1", text[start:end + 1])
+    
+    for attempt in (candidate, candidate.replace("'", '"')):
+        try:
+            return json.loads(attempt), "repaired"
+        except ValueError:
+            continue
+    return None, None
+
+def _list_items(text):
+    """Read the items of a numbered or bulleted list, skipping preamble, headings and notes"""
+    lines = [line.strip() for line in (text or "").splitlines() if line.strip()]
+    items = [match.group(1) for match in map(_LIST_ITEM.match, lines) if match]
+    if items:
+        return items
+    # No list markers at all: treat each short line that isn't a heading or intro as a step
+    return [line for line in lines if not line.startswith("#") and not line.endswith(":")]
+
+def _clean_subtasks(items):
+    """Normalize subtask strings and drop blanks, duplicates, prose and markdown noise"""
+    subtasks = []
+    seen = set()
+    for item in items:
+        if not isinstance(item, str):
+            continue
+        text = " ".join(item.split())
+        # Strip markdown emphasis and a leftover list marker from the model
+        text = re.sub(r"(\*\*|__|`)", "", text)
+        match = _LIST_ITEM.match(text)
+        if match:
+            text = match.group(1)
+        text = text.strip()
+        if not text or len(text) > MAX_SUBTASK_LENGTH or text.lower() in seen:
+            continue
+        seen.add(text.lower())
+        subtasks.append(text)
+    return subtasks[:MAX_SUBTASKS_PER_TASK]
+
+def parse_subtasks_batch(response_text, task_ids):
+    """Parse a batch reply into {task_id: [subtask, ...]}, ignoring anything malformed
+    
+    Accepts the schema's array of {task_id, subtasks} objects, an object wrapping
+    that array, or an object mapping task ids to lists, with or without a
+    markdown code fence around it.
+    """
+    data, _ = _load_json(response_text)
+    
+    if isinstance(data, dict):
+        wrapped = next((value for value in data.values() if isinstance(value, list)), None)
+        if wrapped is not None and all(isinstance(item, dict) for item in wrapped):
+            data = wrapped
+        else:
+            data = [{"task_id": key, "subtasks": value} for key, value in data.items()]
+    if not isinstance(data, list):
+        return {}
+    
+    wanted = {str(task_id): task_id for task_id in task_ids}
+    results = {}
+    for position, item in enumerate(data):
+        if not isinstance(item, dict):
+            continue
+        task_id = wanted.get(str(item.get("task_id")))
+        # Trust the order if the model dropped or mangled the id
+        if task_id is None and "task_id" not in item and position < len(task_ids):
+            task_id = task_ids[position]
+        subtasks = item.get("subtasks")
+        if task_id is None or task_id in results or not isinstance(subtasks, list):
+            continue
+        cleaned = _clean_subtasks(subtasks)
+        if cleaned:
+            results[task_id] = cleaned
+    return results
+
+def generate_action_plan(task_name, task_description=None, subtasks=None, use_cache=True):
+    """Generate a detailed action plan for a task using Gemini AI (use_cache=False bypasses the cache)"""
+    provider = get_provider()
+    if not provider.available():
+        return None, _provider_unavailable_message()
+    
+    cache_model = _cache_model_name(provider)
+    cache_key = make_cache_key("action_plan", cache_model, ACTION_PLAN_TEMPLATE_VERSION,
+                               task_name, task_description, subtasks or [])
+    if use_cache:
+        cached = get_cached(cache_key)
+        if cached:
+            return cached, None
+    
+    try:
         # Create prompt with subtasks if available
         subtasks_text = ""
         if subtasks and len(subtasks) > 0:
@@ -161,8 +659,12 @@ def generate_action_plan(task_name, task_description=None, subtasks=None):
         """
         
         # Generate response
-        response = model.generate_content(prompt)
+        action_plan = _generate(provider, GENERATION_MODEL, prompt).strip()
+        
+        if action_plan and use_cache:
+            set_cached(cache_key, "action_plan", cache_model, action_plan)
         
-        return response.text.strip(), None
+        return action_plan, None
     except Exception as e:
+        logger.warning("Error generating action plan: %s", e, extra={"model": GENERATION_MODEL})
         return None, f"Error generating action plan: {str(e)}"
@@ -0,0 +1,93 @@
+"""
+Two-level cache for AI generated subtasks and action plans.
+
+An in-process LRU sits in front of the ai_response_cache table, so repeated
+requests for common tasks ("Do laundry") skip the model call entirely.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from utils.db import get_ai_cache_entry, save_ai_cache_entry
+
+# Entries older than this are regenerated
+CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# Size bounds for the database table and the in-process front
+MAX_DB_ENTRIES = 5000
+MAX_MEMORY_ENTRIES = 256
+
+_memory_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0}
+
+def normalize_prompt_text(text):
+    """Lowercase and collapse whitespace so trivially different inputs share an entry"""
+    if not text:
+        return ""
+    text = re.sub(r"\s+", " ", str(text).strip().lower())
+    return text.rstrip(".!?")
+
+def make_cache_key(kind, model, template_version, *parts):
+    """Build a cache key from the normalized prompt inputs, model and template version"""
+    normalized = [normalize_prompt_text(part) if not isinstance(part, (list, tuple))
+                  else [normalize_prompt_text(item) for item in part]
+                  for part in parts]
+    payload = json.dumps([kind, model, template_version, normalized])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def get_cached(cache_key):
+    """Return a cached value, checking memory first and then the database"""
+    now = time.time()
+    with _lock:
+        entry = _memory_cache.get(cache_key)
+        if entry is not None and now - entry[0] < CACHE_TTL_SECONDS:
+            _memory_cache.move_to_end(cache_key)
+            _stats["memory_hits"] += 1
+            return _copy(entry[1])
+
+    stored = get_ai_cache_entry(cache_key, CACHE_TTL_SECONDS)
+    if stored is None:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+
+    value = json.loads(stored)
+    _remember(cache_key, value, now)
+    with _lock:
+        _stats["db_hits"] += 1
+    return _copy(value)
+
+def set_cached(cache_key, kind, model, value):
+    """Store a value in both cache levels"""
+    _remember(cache_key, value, time.time())
+    save_ai_cache_entry(cache_key, kind, model, json.dumps(value), CACHE_TTL_SECONDS, MAX_DB_ENTRIES)
+
+def _copy(value):
+    """Hand out copies so callers can't modify a cached subtask list"""
+    return list(value) if isinstance(value, list) else value
+
+def _remember(cache_key, value, stored_at):
+    """Add a value to the in-process LRU, evicting the least recently used entry"""
+    with _lock:
+        _memory_cache[cache_key] = (stored_at, _copy(value))
+        _memory_cache.move_to_end(cache_key)
+        while len(_memory_cache) > MAX_MEMORY_ENTRIES:
+            _memory_cache.popitem(last=False)
+
+def get_cache_stats():
+    """Return hit and miss counts and the overall hit rate"""
+    with _lock:
+        stats = dict(_stats)
+        stats["memory_entries"] = len(_memory_cache)
+    lookups = stats["memory_hits"] + stats["db_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["memory_hits"] + stats["db_hits"]) / lookups if lookups else 0.0
+    return stats
+
+def clear_memory_cache():
+    """Drop the in-process entries (the database table is left alone)"""
+    with _lock:
+        _memory_cache.clear()
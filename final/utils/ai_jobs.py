@@ -0,0 +1,139 @@
+"""
+Background queue for AI generation.
+
+The Tasks page enqueues a job and returns immediately. Worker threads claim
+jobs from the ai_jobs table, call the model, save the result on the task and
+mark the job done, so the page picks up the result on a later rerun.
+"""
+import json
+import os
+import threading
+
+from utils.ai import generate_subtasks, generate_subtasks_batch, generate_action_plan, initialize_gemini
+from utils.db import (
+    enqueue_ai_job,
+    claim_ai_job,
+    complete_ai_job,
+    fail_ai_job,
+    add_subtasks_for_task,
+    add_subtasks_for_tasks,
+    update_task
+)
+from utils.tracing import start_trace
+
+# Number of jobs this process runs at once (one worker thread each)
+MAX_CONCURRENT_JOBS = int(os.getenv("AI_JOB_WORKERS", "2"))
+
+# Retry with exponential backoff before giving up on a job
+MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 2
+
+# How often idle workers check the table, and when a running job counts as abandoned
+POLL_INTERVAL_SECONDS = 1.0
+STALE_JOB_SECONDS = 300
+
+_workers = []
+_workers_lock = threading.Lock()
+_wakeup = threading.Event()
+
+def generation_available():
+    """Return True if jobs can be processed with the configured AI provider"""
+    return initialize_gemini()
+
+def _run_subtasks(task_id, payload):
+    """Generate subtasks and replace the task's existing ones"""
+    subtasks, error = generate_subtasks(payload["task_name"], payload.get("task_description"))
+    if error:
+        return None, error
+    if not subtasks:
+        return None, "No subtasks were generated"
+    if not add_subtasks_for_task(task_id, subtasks):
+        return None, "Failed to save generated subtasks"
+    return {"count": len(subtasks)}, None
+
+def _run_subtasks_batch(task_id, payload):
+    """Generate subtasks for a whole list of tasks and save them in one transaction"""
+    results, error = generate_subtasks_batch(payload["tasks"])
+    if error:
+        return None, error
+    if not results:
+        return None, "No subtasks were generated"
+    if not add_subtasks_for_tasks(results):
+        return None, "Failed to save generated subtasks"
+    return {"tasks": len(results), "skipped": len(payload["tasks"]) - len(results)}, None
+
+def _run_action_plan(task_id, payload):
+    """Generate an action plan and store it on the task"""
+    action_plan, error = generate_action_plan(payload["task_name"], payload.get("task_description"), payload.get("subtasks"))
+    if error:
+        return None, error
+    if not action_plan:
+        return None, "No action plan was generated"
+    if not update_task(task_id, action_plan=action_plan):
+        return None, "Failed to save generated action plan"
+    return {"length": len(action_plan)}, None
+
+JOB_HANDLERS = {
+    "subtasks": _run_subtasks,
+    "subtasks_batch": _run_subtasks_batch,
+    "action_plan": _run_action_plan,
+}
+
+def enqueue_job(user_id, task_id, kind, list_id=None, **payload):
+    """Queue a generation job and make sure workers are running
+
+    Workers normally start with the app; starting them here again is a no-op.
+    Batch jobs have no task and pass list_id so only one runs per list.
+
+    Returns:
+        The job id, or None if the same job is already queued for this task
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown AI job kind: {kind}")
+    start_workers()
+    job_id = enqueue_ai_job(user_id, task_id, kind, json.dumps(payload), list_id)
+    _wakeup.set()
+    return job_id
+
+def run_job(job):
+    """Run one claimed job and record the outcome, requeueing it on failure"""
+    handler = JOB_HANDLERS.get(job["kind"])
+    if handler is None:
+        fail_ai_job(job["id"], f"Unknown AI job kind: {job['kind']}")
+        return False
+
+    try:
+        result, error = handler(job["task_id"], json.loads(job["payload"]))
+    except Exception as e:
+        result, error = None, f"Error running AI job: {str(e)}"
+
+    if error is None:
+        complete_ai_job(job["id"], json.dumps(result))
+        return True
+
+    if job["attempts"] < MAX_ATTEMPTS:
+        fail_ai_job(job["id"], error, RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1))
+    else:
+        fail_ai_job(job["id"], error)
+    return False
+
+def _worker_loop():
+    """Claim and run jobs until the process exits"""
+    while True:
+        job = claim_ai_job(STALE_JOB_SECONDS)
+        if job is None:
+            _wakeup.wait(POLL_INTERVAL_SECONDS)
+            _wakeup.clear()
+            continue
+        with start_trace(f"ai_job {job['kind']}", job_id=job["id"], task_id=job["task_id"], attempt=job["attempts"]):
+            run_job(job)
+
+def start_workers():
+    """Start the worker threads once per process"""
+    if len(_workers) >= MAX_CONCURRENT_JOBS:
+        return
+    with _workers_lock:
+        while len(_workers) < MAX_CONCURRENT_JOBS:
+            worker = threading.Thread(target=_worker_loop, name=f"ai-job-worker-{len(_workers) + 1}", daemon=True)
+            worker.start()
+            _workers.append(worker)
@@ -0,0 +1,149 @@
+"""
+Process-wide limits for outbound AI calls.
+
+AILimiter combines a token bucket per key (utils/ai uses the model name) with
+a global cap on concurrent calls, so bursts from many sessions queue briefly
+instead of tripping provider quotas. SingleFlight lets identical in-flight
+requests share one provider call.
+"""
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Queued waits kept for the percentiles in stats()
+WAIT_SAMPLE_WINDOW = 1000
+
+class AIBusyError(Exception):
+    """Raised when a call would have to wait longer than the limiter allows"""
+
+class TokenBucket:
+    """Token bucket that hands out reservations, so waiters are served in arrival order"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait):
+        """Take a token and return how long to wait before using it, or None if that exceeds max_wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait > max_wait:
+                return None
+            # The balance can go negative; later callers wait behind earlier reservations
+            self._tokens -= 1
+            return wait
+
+class AILimiter:
+    """Token bucket per key plus a global concurrency cap, with queued-wait metrics"""
+
+    def __init__(self, requests_per_minute=60, burst=10, max_concurrent=8, max_wait_seconds=20):
+        self.rate = requests_per_minute / 60
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.max_wait_seconds = max_wait_seconds
+        self._buckets = {}
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_SAMPLE_WINDOW)
+        self._stats = {"calls": 0, "rejected": 0, "queued": 0, "in_flight": 0, "peak_in_flight": 0}
+
+    def _bucket(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    @contextmanager
+    def permit(self, key):
+        """Wait for a rate limit token and a concurrency slot, holding the slot for the block"""
+        start = time.monotonic()
+        wait = self._bucket(key).reserve(self.max_wait_seconds)
+        if wait is None:
+            self._reject()
+        if wait:
+            time.sleep(wait)
+
+        remaining = self.max_wait_seconds - (time.monotonic() - start)
+        if not self._semaphore.acquire(timeout=max(0.0, remaining)):
+            self._reject()
+
+        queued = time.monotonic() - start
+        with self._lock:
+            self._waits.append(queued)
+            self._stats["calls"] += 1
+            if queued > 0.001:
+                self._stats["queued"] += 1
+            self._stats["in_flight"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._stats["in_flight"])
+        try:
+            yield queued
+        finally:
+            with self._lock:
+                self._stats["in_flight"] -= 1
+            self._semaphore.release()
+
+    def _reject(self):
+        with self._lock:
+            self._stats["rejected"] += 1
+        raise AIBusyError("The AI service is busy right now. Please try again in a moment.")
+
+    def stats(self):
+        """Return call counts and queued-wait percentiles (seconds)"""
+        with self._lock:
+            stats = dict(self._stats)
+            waits = sorted(self._waits)
+        for name, percent in (("wait_p50", 50), ("wait_p95", 95)):
+            stats[name] = waits[max(0, math.ceil(percent / 100 * len(waits)) - 1)] if waits else None
+        stats["wait_max"] = waits[-1] if waits else None
+        return stats
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Share the result of a call between callers that ask for the same key at the same time"""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, call):
+        """Run call() unless an identical one is in flight, in which case wait for its result"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = call()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
@@ -0,0 +1,183 @@
+"""
+AI providers behind utils/ai.
+
+Every provider offers the same three calls: generate (one prompt), chat (a
+prompt after a message history) and stream (chat, yielding text as it arrives).
+Histories use Gemini's plain format, a list of {"role": "user" | "model",
+"parts": [text]} dicts. Errors are raised; utils/ai turns them into messages.
+
+Set AI_PROVIDER=fake to use the deterministic offline backend, e.g. for load
+tests and benchmarks. AI_FAKE_LATENCY, AI_FAKE_TOKENS_PER_SECOND and
+AI_FAKE_SECONDS_PER_INPUT_TOKEN tune how slow it is.
+"""
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+import google.generativeai as genai
+
+# Rough size of a token for English text, used by the fake's timing
+CHARS_PER_TOKEN = 4
+
+# Batch prompts end with this line followed by the tasks as JSON
+BATCH_TASKS_MARKER = "Tasks (JSON):"
+
+class GeminiProvider:
+    """Google Gemini through google-generativeai"""
+    name = "gemini"
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key
+        # Models are created once per process and shared by every session
+        self._models = {}
+        self._lock = threading.Lock()
+        self._configured = False
+
+    def available(self):
+        """Configure the SDK on first use; return False without an API key"""
+        if not self.api_key:
+            return False
+        if not self._configured:
+            genai.configure(api_key=self.api_key)
+            self._configured = True
+        return True
+
+    def get_model(self, model_name, system_instruction=None):
+        """Return the shared GenerativeModel for a model name and system instruction"""
+        key = (model_name, system_instruction)
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    self.available()
+                    model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+                    self._models[key] = model
+        return model
+
+    def generate(self, model_name, prompt, system_instruction=None, response_schema=None):
+        """Return the model's reply to a single prompt, as JSON matching response_schema if given"""
+        generation_config = None
+        if response_schema is not None:
+            generation_config = {"response_mime_type": "application/json", "response_schema": response_schema}
+        response = self.get_model(model_name, system_instruction).generate_content(
+            prompt, generation_config=generation_config
+        )
+        return response.text
+
+    def chat(self, model_name, history, prompt, system_instruction=None):
+        """Return the model's reply to a prompt following a message history"""
+        chat = self.get_model(model_name, system_instruction).start_chat(history=history or [])
+        return chat.send_message(prompt).text
+
+    def stream(self, model_name, history, prompt, system_instruction=None):
+        """Yield the model's reply in chunks as it is generated"""
+        chat = self.get_model(model_name, system_instruction).start_chat(history=history or [])
+        for chunk in chat.send_message(prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+class FakeProvider:
+    """Deterministic offline provider with configurable latency and token rate
+
+    The same prompt always gets the same reply. Each call waits latency seconds
+    plus seconds_per_input_token for everything sent, then produces the reply at
+    tokens_per_second.
+    """
+    name = "fake"
+
+    def __init__(self, latency=0.3, tokens_per_second=80, seconds_per_input_token=0.0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.seconds_per_input_token = seconds_per_input_token
+        # Input size of recent calls, for benchmarks
+        self.input_tokens = deque(maxlen=1000)
+
+    def available(self):
+        return True
+
+    def generate(self, model_name, prompt, system_instruction=None, response_schema=None):
+        if response_schema is not None:
+            self._wait(prompt, [], system_instruction)
+            return self.structured_reply_for(prompt, response_schema)
+        return "".join(self.stream(model_name, [], prompt, system_instruction))
+
+    def chat(self, model_name, history, prompt, system_instruction=None):
+        return "".join(self.stream(model_name, history, prompt, system_instruction))
+
+    def _wait(self, prompt, history, system_instruction):
+        """Record the input size and sleep for the round trip"""
+        sent = (system_instruction or "") + prompt
+        sent += "".join(part for message in history or [] for part in message["parts"])
+        input_tokens = math.ceil(len(sent) / CHARS_PER_TOKEN)
+        self.input_tokens.append(input_tokens)
+        time.sleep(self.latency + input_tokens * self.seconds_per_input_token)
+
+    def stream(self, model_name, history, prompt, system_instruction=None):
+        self._wait(prompt, history, system_instruction)
+
+        # Emit roughly one token per word
+        words = self.reply_for(prompt).split(" ")
+        for index in range(0, len(words), 4):
+            chunk = " ".join(words[index:index + 4])
+            if index + 4 < len(words):
+                chunk += " "
+            if self.tokens_per_second:
+                time.sleep(min(4, len(words) - index) / self.tokens_per_second)
+            yield chunk
+
+    def _steps_for(self, text):
+        """Canned subtasks for a task, 3 to 6 of them depending on its text"""
+        steps = ["Gather what you need", "Outline the work", "Do the first part",
+                 "Finish the remaining parts", "Review the result", "Wrap up and share"]
+        return steps[:3 + self._seed(text) % 4]
+
+    def _seed(self, text):
+        return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+
+    def structured_reply_for(self, prompt, response_schema):
+        """Build a JSON reply for a prompt that asked for structured output"""
+        item_schema = response_schema.get("items", {})
+        if BATCH_TASKS_MARKER in prompt and "task_id" in item_schema.get("properties", {}):
+            # Batch prompts end with the tasks as JSON
+            tasks = json.loads(prompt.split(BATCH_TASKS_MARKER, 1)[1])
+            return json.dumps([{"task_id": task["task_id"], "subtasks": self._steps_for(task["task"])}
+                               for task in tasks])
+        return json.dumps(self._steps_for(prompt))
+
+    def reply_for(self, prompt):
+        """Build the canned reply for a prompt, shaped like what the real prompts ask for"""
+        seed = self._seed(prompt)
+        topic = prompt.strip().splitlines()[0][:60]
+
+        if "subtasks" in prompt and "numbered list" in prompt:
+            return "\n".join(f"{i}. {step}" for i, step in enumerate(self._steps_for(prompt), 1))
+
+        if "action plan" in prompt:
+            return (f"## Overview\nWork through {topic} in short focused sessions.\n\n"
+                    "## Resources Needed\n- A quiet place\n- A timer\n\n"
+                    "## Step-by-Step Approach\n1. Plan\n2. Execute\n3. Review\n\n"
+                    "## Potential Challenges\n- Distractions: silence notifications\n\n"
+                    f"## Timeline\nAbout {1 + seed % 4} hours")
+
+        if "summary" in prompt.lower():
+            return "The user is working on staying focused and planning their work in short sessions."
+
+        tips = ["Try a 25 minute Pomodoro", "Write down the very next step",
+                "Block distractions before you start", "Review your priorities each morning"]
+        return (f"Good question. {tips[seed % len(tips)]}, and keep the task small enough to start today. "
+                "Track what worked so you can repeat it tomorrow.")
+
+def provider_from_env():
+    """Create the provider selected by the AI_PROVIDER environment variable"""
+    if os.getenv("AI_PROVIDER", "gemini") == "fake":
+        return FakeProvider(
+            latency=float(os.getenv("AI_FAKE_LATENCY", "0.3")),
+            tokens_per_second=float(os.getenv("AI_FAKE_TOKENS_PER_SECOND", "80")),
+            seconds_per_input_token=float(os.getenv("AI_FAKE_SECONDS_PER_INPUT_TOKEN", "0"))
+        )
+    return GeminiProvider(os.getenv("GEMINI_API_KEY"))
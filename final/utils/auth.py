@@ -1,15 +1,29 @@
 import psycopg2
-from passlib.hash import pbkdf2_sha256
 from utils.db import get_db_connection, create_default_lists_for_user
+# Hashing runs in a process pool; hash_password and verify_password keep their old signatures
+from utils.password_hashing import (
+    PasswordHashBusy, hash_password, verify_password, verify_and_update_password
+)
 from datetime import datetime
+from utils.log import get_logger
 
-def hash_password(password):
-    """Hash password using PBKDF2 with SHA-256"""
-    return pbkdf2_sha256.hash(password)
+logger = get_logger(__name__)
 
-def verify_password(plain_password, hashed_password):
-    """Verify password against hash"""
-    return pbkdf2_sha256.verify(plain_password, hashed_password)
+def update_password_hash(user_id, password_hash):
+    """Store an upgraded hash for a user"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("UPDATE users SET password_hash = %s WHERE id = %s", (password_hash, user_id))
+        conn.commit()
+        return True
+    except psycopg2.Error as e:
+        logger.error("Error updating password hash: %s", e)
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
 
 def register_user(first_name, last_name, email, password):
     """Register a new user and create default lists"""
@@ -41,6 +55,10 @@ def register_user(first_name, last_name, email, password):
         create_default_lists_for_user(user_id)
         
         return user_id, None
+    except PasswordHashBusy as e:
+        conn.rollback()
+        conn.close()
+        return None, str(e)
     except psycopg2.Error as e:
         conn.rollback()
         conn.close()
@@ -64,10 +82,16 @@ def login_user(email, password):
         if not user:
             return None, "User not found. Please sign up."
         
-        if verify_password(password, user["password_hash"]):
-            return user["id"], None
-        else:
+        matches, new_hash = verify_and_update_password(password, user["password_hash"])
+        if not matches:
             return None, "Incorrect password. Please try again."
+
+        # The hashing cost changed since this password was set; store the upgraded hash
+        if new_hash:
+            update_password_hash(user["id"], new_hash)
+        return user["id"], None
+    except PasswordHashBusy as e:
+        return None, str(e)
     except psycopg2.Error as e:
         conn.close()
         return None, f"Database error: {str(e)}"
@@ -122,6 +146,9 @@ def reactivate_account(email, password):
             conn.close()
             return False, "Incorrect password."
             
+    except PasswordHashBusy as e:
+        conn.close()
+        return False, str(e)
     except psycopg2.Error as e:
         if conn:
             conn.rollback()
@@ -156,7 +183,7 @@ def get_user_by_email(email):
             return None
             
     except Exception as e:
-        print(f"Error in get_user_by_email: {str(e)}")
+        logger.error("Error in get_user_by_email: %s", e)
         return None
     finally:
         if conn:
@@ -0,0 +1,68 @@
+"""
+Uploaded images kept as static files instead of in session state.
+
+An image held as a data URL costs its full size in every session that has it
+loaded, and is sent to the browser again on every rerun that shows it.
+to_reference() writes the decoded bytes once to static/blobs, named by a hash
+of the content, and returns the app/static URL instead; the browser caches it.
+The database keeps the data URL, so any worker can write the file again from
+it. Like the theme stylesheets, this assumes workers share the static folder
+or serve a browser's requests from the same worker.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+
+from utils.log import get_logger
+from utils.theme import STATIC_DIR, _static_serving_enabled
+
+logger = get_logger(__name__)
+
+BLOB_DIR = STATIC_DIR / "blobs"
+BLOB_URL = "app/static/blobs"
+
+_DATA_URL = re.compile(r"data:(image/[\w.+-]+);base64,")
+
+# Types Streamlit serves with an image content type; anything else stays inline
+_EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/jpg": "jpg",
+    "image/gif": "gif",
+    "image/webp": "webp",
+}
+
+def is_reference(value):
+    """Check whether a value is a URL returned by to_reference()"""
+    return isinstance(value, str) and value.startswith(BLOB_URL + "/")
+
+def to_reference(value):
+    """Swap an image data URL for the URL of a static file with its bytes; other values are returned unchanged"""
+    if not isinstance(value, str) or not value.startswith("data:"):
+        return value
+    match = _DATA_URL.match(value)
+    extension = _EXTENSIONS.get(match.group(1).lower()) if match else None
+    if extension is None or not _static_serving_enabled():
+        return value
+
+    payload = value[match.end():]
+    # Hash the encoded text; only the first upload of an image pays for decoding it
+    digest = hashlib.sha256(payload.encode("ascii", "replace")).hexdigest()[:32]
+    filename = f"{digest}.{extension}"
+    path = BLOB_DIR / filename
+    try:
+        if not path.exists():
+            data = base64.b64decode(payload, validate=True)
+            BLOB_DIR.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file first so a half-written image is never served
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        return f"{BLOB_URL}/{filename}"
+    except (binascii.Error, ValueError) as e:
+        logger.warning("Not a valid base64 image, keeping it inline: %s", e)
+    except OSError as e:
+        logger.warning("Could not write image %s, keeping it inline: %s", filename, e)
+    return value
@@ -1,56 +1,59 @@
 import psycopg2
 import os
+import time
 from dotenv import load_dotenv
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 import datetime
+from utils.rank import rank_between, evenly_spaced_ranks, needs_rebalance
+from utils.log import get_logger
+from utils.db_stats import TimedCursor, record_connect, track_connection, caller_name, QUERY_STATS_ENABLED
+from utils.tracing import add_span
+
+logger = get_logger(__name__)
 
 # Load environment variables
-print("Loading environment variables...")
 load_dotenv()
 
 def get_db_connection():
     """Create and return a PostgreSQL connection"""
+    db_url = os.getenv("DATABASE_URL")
+    db_host = os.getenv("DB_HOST", "localhost")
+    db_port = os.getenv("DB_PORT", "5432")
+    db_name = os.getenv("DB_NAME", "zenflow")
+    db_user = os.getenv("DB_USER", "postgres")
+    db_password = os.getenv("DB_PASSWORD")
+
+    # TimedCursor is a RealDictCursor that also records per-query timings
+    cursor_factory = TimedCursor if QUERY_STATS_ENABLED else RealDictCursor
+    start = time.perf_counter()
     try:
-        # Debug: Print all environment variables related to database
-        print("\nDatabase Connection Debug Info:")
-        db_url = os.getenv("DATABASE_URL")
-        print("DATABASE_URL:", db_url)
-        
-        db_host = os.getenv("DB_HOST", "localhost")
-        db_port = os.getenv("DB_PORT", "5432")
-        db_name = os.getenv("DB_NAME", "zenflow")
-        db_user = os.getenv("DB_USER", "postgres")
-        db_password = os.getenv("DB_PASSWORD")
-        
-        print("Individual connection parameters:")
-        print(f"DB_HOST: {db_host}")
-        print(f"DB_PORT: {db_port}")
-        print(f"DB_NAME: {db_name}")
-        print(f"DB_USER: {db_user}")
-        print(f"DB_PASSWORD: {'*' * len(db_password) if db_password else 'Not set'}")
-        
         if db_url:
-            print("\nAttempting connection using DATABASE_URL...")
-            conn = psycopg2.connect(db_url, cursor_factory=RealDictCursor)
-            print("Successfully connected using DATABASE_URL")
+            conn = psycopg2.connect(db_url, cursor_factory=cursor_factory)
         else:
-            print("\nAttempting connection using individual parameters...")
             conn = psycopg2.connect(
                 host=db_host,
                 port=db_port,
                 dbname=db_name,
                 user=db_user,
                 password=db_password,
-                cursor_factory=RealDictCursor
+                cursor_factory=cursor_factory
             )
-            print("Successfully connected using individual parameters")
-        
+        if QUERY_STATS_ENABLED:
+            end = time.perf_counter()
+            function = caller_name()
+            record_connect(function, end - start)
+            add_span(f"db.connect {function}", start, end)
+        track_connection(conn)
+        # DATABASE_URL and the password carry credentials, so neither is logged
+        logger.debug("Connected to database", extra={"via": "DATABASE_URL" if db_url else "DB_HOST",
+                                                     "host": None if db_url else db_host})
         return conn
     except psycopg2.Error as e:
-        print("\nDatabase connection error:")
-        print(f"Error Type: {type(e).__name__}")
-        print(f"Error Message: {str(e)}")
-        print(f"Error Details: {e.diag.message_detail if hasattr(e, 'diag') else 'No additional details'}")
+        logger.error("Database connection failed: %s", e, extra={
+            "error_type": type(e).__name__,
+            "detail": e.diag.message_detail if getattr(e, "diag", None) else None,
+            "host": None if db_url else db_host,
+        })
         raise
 
 def init_db():
@@ -93,6 +96,7 @@ def init_db():
             completed BOOLEAN DEFAULT FALSE,
             completed_at TIMESTAMP,
             action_plan TEXT,
+            rank TEXT COLLATE "C",
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
     ''')
@@ -111,6 +115,9 @@ def init_db():
         );
     ''')
 
+    # Subtasks are always looked up, checked for and replaced by their task
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_subtasks_task_id ON subtasks (task_id);")
+
     # Focus Stats table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS focus_stats (
@@ -164,11 +171,23 @@ def init_db():
             current_mode VARCHAR(20) NOT NULL, -- 'pomodoro', 'short_break', 'long_break'
             time_remaining_seconds INTEGER,
             current_session_start TIMESTAMP,
+            duration_seconds INTEGER,
+            ends_at TIMESTAMP, -- set while a session runs or is paused
+            paused_at TIMESTAMP, -- set while paused
+            paused_seconds INTEGER NOT NULL DEFAULT 0,
+            version INTEGER NOT NULL DEFAULT 0, -- bumped by every change, for optimistic concurrency
             last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             UNIQUE(user_id)
         );
     ''')
 
+    # Timer columns for databases created before focus_flow_state held the running timer
+    cursor.execute("ALTER TABLE focus_flow_state ADD COLUMN IF NOT EXISTS duration_seconds INTEGER;")
+    cursor.execute("ALTER TABLE focus_flow_state ADD COLUMN IF NOT EXISTS ends_at TIMESTAMP;")
+    cursor.execute("ALTER TABLE focus_flow_state ADD COLUMN IF NOT EXISTS paused_at TIMESTAMP;")
+    cursor.execute("ALTER TABLE focus_flow_state ADD COLUMN IF NOT EXISTS paused_seconds INTEGER NOT NULL DEFAULT 0;")
+    cursor.execute("ALTER TABLE focus_flow_state ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0;")
+
     # Timer Settings table to store user timer preferences
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS timer_settings (
@@ -203,10 +222,28 @@ def init_db():
             is_affirmation BOOLEAN DEFAULT FALSE,
             category_id INTEGER REFERENCES vision_board_categories(id) ON DELETE SET NULL,
             position INTEGER,
+            rank TEXT COLLATE "C",
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
     ''')
 
+    # Rank columns for databases created before fractional ordering
+    cursor.execute('ALTER TABLE tasks ADD COLUMN IF NOT EXISTS rank TEXT COLLATE "C";')
+    cursor.execute('ALTER TABLE vision_board_tiles ADD COLUMN IF NOT EXISTS rank TEXT COLLATE "C";')
+
+    # Ordered indexes so tasks and tiles are read back in rank order
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_list_rank ON tasks (list_id, completed, rank);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vision_board_tiles_user_rank ON vision_board_tiles (user_id, rank);")
+
+    # Give existing rows a rank, keeping their previous order
+    cursor.execute("SELECT DISTINCT list_id FROM tasks WHERE rank IS NULL")
+    for row in cursor.fetchall():
+        _rebalance_ranks(cursor, "tasks", row["list_id"])
+
+    cursor.execute("SELECT DISTINCT user_id FROM vision_board_tiles WHERE rank IS NULL")
+    for row in cursor.fetchall():
+        _rebalance_ranks(cursor, "vision_board_tiles", row["user_id"])
+
     # Default Lists
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS default_lists (
@@ -241,9 +278,204 @@ def init_db():
         );
     ''')
 
+    # Shared cache of AI generated subtasks and action plans
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ai_response_cache (
+            cache_key TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            model TEXT NOT NULL,
+            response TEXT NOT NULL,
+            hit_count INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ai_response_cache_last_used ON ai_response_cache (last_used_at);")
+
+    # Queue of AI generation jobs processed by background workers
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ai_jobs (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            task_id INTEGER REFERENCES tasks(id) ON DELETE CASCADE,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            run_after TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+    # Batch jobs cover a whole list rather than one task
+    cursor.execute("ALTER TABLE ai_jobs ADD COLUMN IF NOT EXISTS list_id INTEGER REFERENCES lists(id) ON DELETE CASCADE;")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ai_jobs_pending ON ai_jobs (run_after) WHERE status = 'pending';")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ai_jobs_user_status ON ai_jobs (user_id, status);")
+    # Assistant conversations; summary covers every message up to summary_through_id
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS assistant_conversations (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            title TEXT,
+            summary TEXT NOT NULL DEFAULT '',
+            summary_through_id BIGINT NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_assistant_conversations_user ON assistant_conversations (user_id, updated_at DESC);")
+
+    # Conversation messages are only ever appended
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS assistant_messages (
+            id BIGSERIAL PRIMARY KEY,
+            conversation_id INTEGER NOT NULL REFERENCES assistant_conversations(id) ON DELETE CASCADE,
+            role VARCHAR(9) NOT NULL CHECK (role IN ('user', 'assistant')),
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_assistant_messages_conversation ON assistant_messages (conversation_id, id);")
+
+    # Login sessions; only a SHA-256 of the cookie token is stored
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            token_hash CHAR(64) NOT NULL UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL
+        );
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_sessions_user ON user_sessions (user_id);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_sessions_expires ON user_sessions (expires_at);")
+
+    # Outgoing mail, queued in the caller's transaction and delivered by a background sender
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id SERIAL PRIMARY KEY,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            error TEXT,
+            run_after TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_pending ON email_outbox (run_after) WHERE status = 'pending';")
+
+    # At most one queued or running job of each kind per task
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_ai_jobs_active_task_kind
+        ON ai_jobs (task_id, kind) WHERE status IN ('pending', 'running');
+    ''')
+    # and per list for batch jobs, whose task_id is NULL and so never conflicts above
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_ai_jobs_active_list_kind
+        ON ai_jobs (user_id, list_id, kind) WHERE status IN ('pending', 'running') AND list_id IS NOT NULL;
+    ''')
+
     conn.commit()
     conn.close()
 
+# Column that scopes each ranked table, and the order used to (re)assign ranks.
+# Rows without a rank yet keep the order they had before ranks were introduced.
+RANKED_TABLES = {
+    "tasks": ("list_id", "rank IS NULL, rank, deadline IS NULL, deadline, created_at, id"),
+    "vision_board_tiles": ("user_id", "rank IS NULL, rank, position, id"),
+}
+
+def _next_rank(cursor, table, scope):
+    """Return a rank that places a new row at the end of its list"""
+    scope_column, _ = RANKED_TABLES[table]
+    cursor.execute(
+        f"SELECT MAX(rank) AS max_rank FROM {table} WHERE {scope_column} = %s",
+        (scope,)
+    )
+    result = cursor.fetchone()
+    return rank_between(result["max_rank"] if result else None, None)
+
+def _rebalance_ranks(cursor, table, scope, order_by=None):
+    """Rewrite every rank in a list with short, evenly spaced keys"""
+    scope_column, default_order = RANKED_TABLES[table]
+    cursor.execute(
+        f"SELECT id FROM {table} WHERE {scope_column} = %s ORDER BY {order_by or default_order}",
+        (scope,)
+    )
+    rows = cursor.fetchall()
+    ranks = evenly_spaced_ranks(len(rows))
+    cursor.executemany(
+        f"UPDATE {table} SET rank = %s WHERE id = %s",
+        [(rank, row["id"]) for rank, row in zip(ranks, rows)]
+    )
+
+def _move_between(table, item_id, user_id, before_id=None, after_id=None):
+    """Move a row between two neighbours by updating only its own rank"""
+    scope_column, _ = RANKED_TABLES[table]
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            f"SELECT {scope_column} AS scope FROM {table} WHERE id = %s AND user_id = %s",
+            (item_id, user_id)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return False
+        scope = row["scope"]
+        
+        def neighbour_ranks():
+            neighbour_ids = [i for i in (before_id, after_id) if i is not None]
+            if not neighbour_ids:
+                return None, None
+            cursor.execute(
+                f"SELECT id, rank FROM {table} WHERE id = ANY(%s) AND {scope_column} = %s AND user_id = %s",
+                (neighbour_ids, scope, user_id)
+            )
+            ranks = {r["id"]: r["rank"] for r in cursor.fetchall()}
+            return ranks.get(before_id), ranks.get(after_id)
+        
+        before_rank, after_rank = neighbour_ranks()
+        try:
+            new_rank = rank_between(before_rank, after_rank)
+        except ValueError:
+            # Neighbours share a rank (e.g. two rows added at once), so spread the list out first
+            _rebalance_ranks(cursor, table, scope)
+            before_rank, after_rank = neighbour_ranks()
+            try:
+                new_rank = rank_between(before_rank, after_rank)
+            except ValueError as e:
+                # Neighbours out of rank order, e.g. taken from a list not sorted by rank alone
+                conn.rollback()
+                logger.error("Error moving row in %s: %s", table, e)
+                return False
+        
+        cursor.execute(
+            f"UPDATE {table} SET rank = %s WHERE id = %s AND user_id = %s",
+            (new_rank, item_id, user_id)
+        )
+        
+        # Repeated moves into the same gap make keys grow, so occasionally reset them
+        if needs_rebalance(new_rank):
+            _rebalance_ranks(cursor, table, scope)
+        
+        conn.commit()
+        return True
+    except psycopg2.Error as e:
+        conn.rollback()
+        logger.error("Error moving row in %s: %s", table, e)
+        return False
+    finally:
+        conn.close()
+
 def create_default_lists_for_user(user_id):
     """Create default lists for a new user"""
     conn = get_db_connection()
@@ -324,7 +556,7 @@ def get_tasks_for_list(list_id, user_id):
     SELECT id, name, deadline, reminder, repeat, completed, completed_at, action_plan
     FROM tasks 
     WHERE list_id = %s AND user_id = %s
-    ORDER BY completed, deadline IS NULL, deadline, created_at
+    ORDER BY completed, rank, id
     ''', (list_id, user_id))
     
     tasks = cursor.fetchall()
@@ -338,10 +570,13 @@ def add_new_task(list_id, user_id, name, deadline=None, reminder=None, repeat=No
     cursor = conn.cursor()
     
     try:
+        # New tasks go to the end of the list
+        rank = _next_rank(cursor, "tasks", list_id)
+        
         cursor.execute('''
-        INSERT INTO tasks (list_id, user_id, name, deadline, reminder, repeat) 
-        VALUES (%s, %s, %s, %s, %s, %s) RETURNING id
-        ''', (list_id, user_id, name, deadline, reminder, repeat))
+        INSERT INTO tasks (list_id, user_id, name, deadline, reminder, repeat, rank) 
+        VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id
+        ''', (list_id, user_id, name, deadline, reminder, repeat, rank))
         
         task_id = cursor.fetchone()['id']
         conn.commit()
@@ -408,6 +643,20 @@ def update_task(task_id, name=None, deadline=None, reminder=None, repeat=None, c
         conn.close()
         return False
 
+def move_task_between(task_id, user_id, before_task_id=None, after_task_id=None):
+    """Move a task so it sits between two neighbouring tasks in its list
+
+    Args:
+        task_id (int): The task being moved
+        user_id (int): Owner of the task
+        before_task_id (int): Task that should come directly before it, or None for the top
+        after_task_id (int): Task that should come directly after it, or None for the bottom
+
+    Returns:
+        bool: True if the task was moved
+    """
+    return _move_between("tasks", task_id, user_id, before_task_id, after_task_id)
+
 def delete_task(task_id):
     """Delete a task and its subtasks"""
     conn = get_db_connection()
@@ -441,21 +690,47 @@ def get_subtasks_for_task(task_id):
     
     return subtasks
 
+def get_tasks_without_subtasks(list_id, user_id):
+    """Get the open tasks in a list that have no subtasks yet"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+    SELECT t.id, t.name FROM tasks t
+    WHERE t.list_id = %s AND t.user_id = %s AND NOT t.completed
+      AND NOT EXISTS (SELECT 1 FROM subtasks s WHERE s.task_id = t.id)
+    ORDER BY t.rank, t.id
+    ''', (list_id, user_id))
+    
+    tasks = cursor.fetchall()
+    conn.close()
+    
+    return tasks
+
 def add_subtasks_for_task(task_id, subtasks):
     """Add multiple subtasks for a task, replacing any existing ones"""
+    return add_subtasks_for_tasks({task_id: subtasks})
+
+def add_subtasks_for_tasks(subtasks_by_task):
+    """Replace the subtasks of several tasks in one transaction
+    
+    Args:
+        subtasks_by_task (dict): Maps task ids to lists of subtask names
+    """
+    if not subtasks_by_task:
+        return True
+    
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
         # First delete any existing subtasks
-        cursor.execute("DELETE FROM subtasks WHERE task_id = %s", (task_id,))
+        cursor.execute("DELETE FROM subtasks WHERE task_id = ANY(%s)", (list(subtasks_by_task),))
         
-        # Then add the new subtasks
-        for subtask in subtasks:
-            cursor.execute('''
-            INSERT INTO subtasks (task_id, name) 
-            VALUES (%s, %s)
-            ''', (task_id, subtask))
+        # Then add all the new subtasks with a single multi-row insert
+        rows = [(task_id, subtask) for task_id, subtasks in subtasks_by_task.items() for subtask in subtasks]
+        if rows:
+            execute_values(cursor, "INSERT INTO subtasks (task_id, name) VALUES %s", rows)
         
         conn.commit()
         conn.close()
@@ -623,7 +898,7 @@ def get_vision_board_tiles(user_id, category_id=None):
     
     query = """
     SELECT t.id, t.title, t.description, t.image_path, t.image_url, 
-           t.is_affirmation, t.category_id, t.position, c.name as category_name
+           t.is_affirmation, t.category_id, t.position, t.rank, c.name as category_name
     FROM vision_board_tiles t
     LEFT JOIN vision_board_categories c ON t.category_id = c.id
     WHERE t.user_id = %s
@@ -635,7 +910,7 @@ def get_vision_board_tiles(user_id, category_id=None):
         query += " AND t.category_id = %s"
         params.append(category_id)
     
-    query += " ORDER BY t.position"
+    query += " ORDER BY t.rank, t.id"
     
     cursor.execute(query, params)
     
@@ -651,20 +926,21 @@ def add_vision_board_tile(user_id, title, description=None, image_path=None,
     cursor = conn.cursor()
     
     try:
-        # Get the highest position value to place the new tile at the end
+        # Get the highest position and rank to place the new tile at the end
         cursor.execute(
-            "SELECT COALESCE(MAX(position), 0) as max_pos FROM vision_board_tiles WHERE user_id = %s",
+            "SELECT COALESCE(MAX(position), 0) as max_pos, MAX(rank) as max_rank FROM vision_board_tiles WHERE user_id = %s",
             (user_id,)
         )
         result = cursor.fetchone()
         next_position = result["max_pos"] + 1 if result else 1
+        next_rank = rank_between(result["max_rank"] if result else None, None)
         
         cursor.execute('''
         INSERT INTO vision_board_tiles 
-        (user_id, title, description, image_path, image_url, is_affirmation, category_id, position) 
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s) RETURNING id
+        (user_id, title, description, image_path, image_url, is_affirmation, category_id, position, rank) 
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id
         ''', (user_id, title, description, image_path, image_url, 
-              is_affirmation, category_id, next_position))
+              is_affirmation, category_id, next_position, next_rank))
         
         tile_id = cursor.fetchone()['id']
         conn.commit()
@@ -740,24 +1016,8 @@ def delete_vision_board_tile(tile_id, user_id):
             (tile_id, user_id)
         )
         conn.commit()
+        # Ranks leave no gaps to close, so the remaining tiles are untouched
         result = cursor.rowcount > 0
-        
-        # Reorder positions to close gaps
-        if result:
-            cursor.execute(
-                "SELECT id FROM vision_board_tiles WHERE user_id = %s ORDER BY position", 
-                (user_id,)
-            )
-            tiles = cursor.fetchall()
-            
-            for i, tile in enumerate(tiles, 1):
-                cursor.execute(
-                    "UPDATE vision_board_tiles SET position = %s WHERE id = %s",
-                    (i, tile["id"])
-                )
-            
-            conn.commit()
-        
         conn.close()
         return result
     except psycopg2.Error:
@@ -765,8 +1025,22 @@ def delete_vision_board_tile(tile_id, user_id):
         conn.close()
         return False
 
+def move_tile_between(tile_id, user_id, before_tile_id=None, after_tile_id=None):
+    """Move a vision board tile between two neighbouring tiles
+
+    Args:
+        tile_id (int): The tile being moved
+        user_id (int): Owner of the tile
+        before_tile_id (int): Tile that should come directly before it, or None for the start
+        after_tile_id (int): Tile that should come directly after it, or None for the end
+
+    Returns:
+        bool: True if the tile was moved
+    """
+    return _move_between("vision_board_tiles", tile_id, user_id, before_tile_id, after_tile_id)
+
 def update_tile_positions(positions_dict, user_id):
-    """Update tile positions in the vision board"""
+    """Update tile positions in the vision board (full reorder; use move_tile_between for single moves)"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -782,6 +1056,9 @@ def update_tile_positions(positions_dict, user_id):
                 (position, tile_id, user_id)
             )
         
+        # Re-rank every tile in the new position order
+        _rebalance_ranks(cursor, "vision_board_tiles", user_id, order_by="position, id")
+        
         conn.commit()
         conn.close()
         
@@ -789,7 +1066,7 @@ def update_tile_positions(positions_dict, user_id):
     except psycopg2.Error as e:
         conn.rollback()
         conn.close()
-        print(f"Error updating tile positions: {e}")
+        logger.error("Error updating tile positions: %s", e)
         return False
 
 def get_focus_stats(user_id):
@@ -851,7 +1128,7 @@ def update_focus_stats(user_id, total_focus_time, pomodoros_completed):
     except psycopg2.Error as e:
         conn.rollback()
         conn.close()
-        print(f"Error updating focus stats: {e}")
+        logger.error("Error updating focus stats: %s", e)
         return False
 
 def reset_focus_stats(user_id):
@@ -883,7 +1160,7 @@ def reset_focus_stats(user_id):
     except psycopg2.Error as e:
         conn.rollback()
         conn.close()
-        print(f"Error resetting focus stats: {e}")
+        logger.error("Error resetting focus stats: %s", e)
         return False
 
 def get_tasks(user_id):
@@ -904,7 +1181,7 @@ def get_tasks(user_id):
         return tasks
     except psycopg2.Error as e:
         conn.close()
-        print(f"Error getting tasks: {e}")
+        logger.error("Error getting tasks: %s", e)
         return []
 
 def get_task_focus_stats(task_id):
@@ -912,8 +1189,6 @@ def get_task_focus_stats(task_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    print(f"DEBUG DB: Getting focus stats for task_id={task_id}")
-    
     # Try to get existing stats
     cursor.execute("""
         SELECT task_id, focus_time_seconds, sessions_completed, last_session_date 
@@ -925,10 +1200,11 @@ def get_task_focus_stats(task_id):
     conn.close()
     
     if stats:
-        print(f"DEBUG DB: Found stats for task_id={task_id}: time={stats['focus_time_seconds']}s, sessions={stats['sessions_completed']}")
+        logger.debug("Found task focus stats", extra={"task_id": task_id, "focus_time_seconds": stats["focus_time_seconds"],
+                                                       "sessions_completed": stats["sessions_completed"]})
         return stats
     else:
-        print(f"DEBUG DB: No stats found for task_id={task_id}")
+        logger.debug("No task focus stats yet", extra={"task_id": task_id})
         # Return default values if no stats exist
         return {
             "task_id": task_id,
@@ -942,8 +1218,6 @@ def update_task_focus_stats(task_id, user_id, focus_time_seconds, sessions_compl
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    print(f"DEBUG DB: Updating task focus stats: task_id={task_id}, user_id={user_id}, seconds={focus_time_seconds}, sessions={sessions_completed}")
-    
     try:
         # First get the list ID for this task for more comprehensive analytics
         cursor.execute("SELECT list_id FROM tasks WHERE id = %s", (task_id,))
@@ -955,7 +1229,6 @@ def update_task_focus_stats(task_id, user_id, focus_time_seconds, sessions_compl
         exists = cursor.fetchone()
         
         if exists:
-            print(f"DEBUG DB: Updating existing record for task_id={task_id}")
             # Update existing record
             cursor.execute("""
                 UPDATE task_focus_stats 
@@ -966,7 +1239,6 @@ def update_task_focus_stats(task_id, user_id, focus_time_seconds, sessions_compl
                 WHERE task_id = %s
             """, (focus_time_seconds, sessions_completed, task_id))
         else:
-            print(f"DEBUG DB: Creating new record for task_id={task_id}")
             # Insert new record
             cursor.execute("""
                 INSERT INTO task_focus_stats 
@@ -976,12 +1248,13 @@ def update_task_focus_stats(task_id, user_id, focus_time_seconds, sessions_compl
         
         conn.commit()
         conn.close()
-        print(f"DEBUG DB: Successfully updated task focus stats for task_id={task_id}")
+        logger.debug("Updated task focus stats", extra={"task_id": task_id, "user_id": user_id, "created": not exists,
+                                                         "focus_time_seconds": focus_time_seconds, "sessions_completed": sessions_completed})
         return True
     except psycopg2.Error as e:
         conn.rollback()
         conn.close()
-        print(f"DEBUG DB ERROR: Error updating task focus stats: {e}")
+        logger.error("Error updating task focus stats: %s", e, extra={"task_id": task_id})
         return False
 
 def get_task_id_by_name(user_id, task_name):
@@ -989,8 +1262,6 @@ def get_task_id_by_name(user_id, task_name):
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    print(f"DEBUG DB: Looking up task ID for name/title: '{task_name}', user_id: {user_id}")
-    
     # First try by name field
     cursor.execute("""
         SELECT id FROM tasks 
@@ -1003,7 +1274,6 @@ def get_task_id_by_name(user_id, task_name):
     
     if not result:
         # If not found by name, try by title (which is the name column in the get_tasks function)
-        print(f"DEBUG DB: Not found by name, trying direct title match")
         cursor.execute("""
             SELECT id FROM tasks 
             WHERE user_id = %s AND name = %s 
@@ -1015,7 +1285,6 @@ def get_task_id_by_name(user_id, task_name):
     
     if not result:
         # If still not found, try with LIKE for partial or fuzzy matches
-        print(f"DEBUG DB: No exact matches, trying fuzzy search")
         cursor.execute("""
             SELECT id FROM tasks 
             WHERE user_id = %s AND name LIKE %s 
@@ -1028,19 +1297,10 @@ def get_task_id_by_name(user_id, task_name):
     conn.close()
     
     if result:
-        print(f"DEBUG DB: Found task ID: {result['id']}")
         return result["id"]
     else:
-        print(f"DEBUG DB: No task found with name/title: '{task_name}'")
-        # For debugging, let's also list all tasks for this user
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, name FROM tasks WHERE user_id = %s", (user_id,))
-        all_tasks = cursor.fetchall()
-        print(f"DEBUG DB: All tasks for user {user_id}:")
-        for t in all_tasks:
-            print(f"  - ID: {t['id']}, Name: '{t['name']}'")
-        conn.close()
+        # Only the miss is logged; listing all of the user's tasks here cost a query on every miss
+        logger.debug("No task found by name", extra={"user_id": user_id, "task_name": task_name})
         return None
 
 def get_timer_settings(user_id):
@@ -1102,7 +1362,7 @@ def update_timer_settings(user_id, pomodoro_duration, short_break_duration, long
     except psycopg2.Error as e:
         conn.rollback()
         conn.close()
-        print(f"Error updating timer settings: {e}")
+        logger.error("Error updating timer settings: %s", e)
         return False
 
 def get_focus_stats_by_list(user_id):
@@ -1218,7 +1478,7 @@ def save_focus_session(user_id, task_id, session_type, duration_seconds, complet
     except psycopg2.Error as e:
         conn.rollback()
         conn.close()
-        print(f"Error saving focus session: {e}")
+        logger.error("Error saving focus session: %s", e)
         return None
 
 def get_focus_sessions_for_task(user_id, task_id, limit=10):
@@ -1261,32 +1521,34 @@ def get_recent_focus_sessions(user_id, limit=20):
     return sessions
 
 def get_focus_flow_state(user_id):
-    """Get current focus flow state for a user"""
+    """Get the user's focus timer, with the seconds left worked out by the database clock
+
+    focus_flow_state is the only record of a running timer, so any worker can
+    render or advance it. remaining_seconds counts down to ends_at while the
+    timer runs, stops at paused_at while paused, and is time_remaining_seconds
+    otherwise. idle_seconds is the time since the last transition. Pass
+    version to transition_focus_flow_state() to change it.
+    """
     conn = get_db_connection()
     cursor = conn.cursor()
     
     cursor.execute("""
-        SELECT current_task_id, flow_state, current_mode, 
-               time_remaining_seconds, current_session_start, last_updated
-        FROM focus_flow_state
-        WHERE user_id = %s
+        SELECT f.current_task_id, t.name AS task_name, f.flow_state, f.current_mode,
+               f.time_remaining_seconds, f.current_session_start, f.duration_seconds,
+               f.ends_at, f.paused_at, f.paused_seconds, f.version, f.last_updated,
+               CASE WHEN f.ends_at IS NULL THEN f.time_remaining_seconds
+                    ELSE GREATEST(0, CEIL(EXTRACT(EPOCH FROM f.ends_at - COALESCE(f.paused_at, LOCALTIMESTAMP))))::INTEGER
+               END AS remaining_seconds,
+               EXTRACT(EPOCH FROM LOCALTIMESTAMP - f.last_updated)::INTEGER AS idle_seconds
+        FROM focus_flow_state f
+        LEFT JOIN tasks t ON t.id = f.current_task_id
+        WHERE f.user_id = %s
     """, (user_id,))
     
     state = cursor.fetchone()
     conn.close()
     
     if state:
-        # If there's a linked task, get its name
-        if state['current_task_id']:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM tasks WHERE id = %s", (state['current_task_id'],))
-            task = cursor.fetchone()
-            conn.close()
-            
-            if task:
-                state['task_name'] = task['name']
-        
         return state
     else:
         # Return default values if no state exists
@@ -1297,49 +1559,88 @@ def get_focus_flow_state(user_id):
             "current_mode": "pomodoro",
             "time_remaining_seconds": None,
             "current_session_start": None,
-            "last_updated": None
+            "duration_seconds": None,
+            "ends_at": None,
+            "paused_at": None,
+            "paused_seconds": 0,
+            "version": 0,
+            "last_updated": None,
+            "remaining_seconds": None,
+            "idle_seconds": None
         }
 
-def update_focus_flow_state(user_id, flow_state, current_mode, time_remaining=None, 
-                          task_id=None, session_start=None):
-    """Update focus flow state for a user"""
+# SET clauses for each focus timer transition; parameters are passed by name.
+# Times come from the database clock, so workers' clocks don't have to agree.
+FOCUS_TRANSITIONS = {
+    # Stop any session and show a full one of the given mode
+    "ready": """
+        flow_state = 'ready', current_mode = %(mode)s, current_task_id = %(task_id)s,
+        duration_seconds = %(duration)s, time_remaining_seconds = %(duration)s,
+        current_session_start = NULL, ends_at = NULL, paused_at = NULL, paused_seconds = 0
+    """,
+    # Run a session of the given mode for remaining of its duration seconds
+    "start": """
+        flow_state = %(flow_state)s, current_mode = %(mode)s, current_task_id = %(task_id)s,
+        duration_seconds = %(duration)s, time_remaining_seconds = %(remaining)s,
+        current_session_start = LOCALTIMESTAMP, ends_at = LOCALTIMESTAMP + make_interval(secs => %(remaining)s),
+        paused_at = NULL, paused_seconds = 0
+    """,
+    "pause": """
+        paused_at = LOCALTIMESTAMP,
+        time_remaining_seconds = GREATEST(0, CEIL(EXTRACT(EPOCH FROM ends_at - LOCALTIMESTAMP)))
+    """,
+    # Push the end back by however long the timer was paused
+    "resume": """
+        paused_seconds = paused_seconds + ROUND(EXTRACT(EPOCH FROM LOCALTIMESTAMP - paused_at))::INTEGER,
+        ends_at = ends_at + (LOCALTIMESTAMP - paused_at), paused_at = NULL
+    """,
+    # Change a running or paused session's length, keeping the time already spent
+    "resize": """
+        ends_at = ends_at + make_interval(secs => %(duration)s - duration_seconds),
+        duration_seconds = %(duration)s
+    """,
+    "complete": """
+        flow_state = 'completed', time_remaining_seconds = 0, ends_at = NULL, paused_at = NULL
+    """,
+    "link": "current_task_id = %(task_id)s",
+}
+
+def transition_focus_flow_state(user_id, version, action, **params):
+    """Apply one of FOCUS_TRANSITIONS to the user's focus timer if it is still at version
+
+    Returns the new version, or None if the timer changed since it was read
+    (in another tab or on another worker) or the update failed. Only one of
+    several sessions racing to complete a timer gets a version back, so only
+    that one logs it.
+    """
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        # Check if record exists
-        cursor.execute("SELECT id FROM focus_flow_state WHERE user_id = %s", (user_id,))
-        exists = cursor.fetchone()
-        
-        if exists:
-            # Update existing record
-            cursor.execute("""
-                UPDATE focus_flow_state 
-                SET flow_state = %s, 
-                    current_mode = %s, 
-                    time_remaining_seconds = %s,
-                    current_task_id = %s,
-                    current_session_start = %s,
-                    last_updated = CURRENT_TIMESTAMP
-                WHERE user_id = %s
-            """, (flow_state, current_mode, time_remaining, task_id, session_start, user_id))
-        else:
-            # Insert new record
-            cursor.execute("""
-                INSERT INTO focus_flow_state 
-                (user_id, flow_state, current_mode, time_remaining_seconds, 
-                 current_task_id, current_session_start) 
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (user_id, flow_state, current_mode, time_remaining, task_id, session_start))
+        # A user's first transition creates their row at version 0
+        cursor.execute("""
+            INSERT INTO focus_flow_state (user_id, flow_state, current_mode)
+            VALUES (%s, 'ready', 'pomodoro')
+            ON CONFLICT (user_id) DO NOTHING
+        """, (user_id,))
+        cursor.execute(f"""
+            UPDATE focus_flow_state
+            SET {FOCUS_TRANSITIONS[action]},
+                version = version + 1,
+                last_updated = CURRENT_TIMESTAMP
+            WHERE user_id = %(user_id)s AND version = %(version)s
+            RETURNING version
+        """, dict(params, user_id=user_id, version=version))
         
+        row = cursor.fetchone()
         conn.commit()
-        conn.close()
-        return True
+        return row["version"] if row else None
     except psycopg2.Error as e:
         conn.rollback()
+        logger.error("Error updating focus flow state: %s", e)
+        return None
+    finally:
         conn.close()
-        print(f"Error updating focus flow state: {e}")
-        return False
 
 def get_daily_task_focus_summary(user_id, date=None):
     """Get summary of focus sessions for each task for a specific day"""
@@ -1457,31 +1758,44 @@ def get_focus_weekday_stats(user_id, weeks=4):
     return results
 
 def save_vision_board_customizations(user_id, customizations):
-    """Save vision board customizations for a user"""
+    """Save vision board customizations for a user
+
+    A bg_image that is a static file reference (see utils.blobs) was loaded
+    from or already saved to this row, so the stored image is kept as it is.
+    """
+    from utils.blobs import is_reference
     conn = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # First delete existing customizations
+        # First delete customizations of categories no longer on the board
         cursor.execute(
-            "DELETE FROM vision_board_customizations WHERE user_id = %s",
-            (user_id,)
+            "DELETE FROM vision_board_customizations WHERE user_id = %s AND NOT (category_key = ANY(%s))",
+            (user_id, list(customizations))
         )
         
-        # Insert new customizations
+        # Upsert the rest, so unchanged images aren't written again on every edit
         for cat_key, settings in customizations.items():
+            bg_image = settings.get('bg_image')
+            keep_image = is_reference(bg_image)
             cursor.execute("""
                 INSERT INTO vision_board_customizations 
                 (user_id, category_key, theme, frame, description, bg_image)
                 VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (user_id, category_key) DO UPDATE SET
+                    theme = EXCLUDED.theme,
+                    frame = EXCLUDED.frame,
+                    description = EXCLUDED.description,
+                    bg_image = CASE WHEN %s THEN vision_board_customizations.bg_image ELSE EXCLUDED.bg_image END
             """, (
                 user_id, 
                 cat_key,
                 settings.get('theme'),
                 settings.get('frame'),
                 settings.get('description'),
-                settings.get('bg_image')
+                None if keep_image else bg_image,
+                keep_image
             ))
         
         conn.commit()
@@ -1489,7 +1803,7 @@ def save_vision_board_customizations(user_id, customizations):
     except Exception as e:
         if conn:
             conn.rollback()
-        print(f"Error saving vision board customizations: {str(e)}")
+        logger.error("Error saving vision board customizations: %s", e)
         return False
     finally:
         if conn:
@@ -1518,7 +1832,359 @@ def load_vision_board_customizations(user_id):
         
         return customizations
     except Exception as e:
-        print(f"Error loading vision board customizations: {str(e)}")
+        logger.error("Error loading vision board customizations: %s", e)
         return {}
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+def get_ai_cache_entry(cache_key, ttl_seconds):
+    """Return a cached AI response if it is younger than ttl_seconds, marking it as used"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE ai_response_cache
+            SET hit_count = hit_count + 1, last_used_at = CURRENT_TIMESTAMP
+            WHERE cache_key = %s
+              AND created_at > CURRENT_TIMESTAMP - %s * INTERVAL '1 second'
+            RETURNING response
+        """, (cache_key, ttl_seconds))
+        
+        result = cursor.fetchone()
+        conn.commit()
+        return result["response"] if result else None
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error reading AI response cache: %s", e)
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def save_ai_cache_entry(cache_key, kind, model, response, ttl_seconds, max_entries):
+    """Store an AI response, then drop expired entries and the least recently used beyond max_entries"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO ai_response_cache (cache_key, kind, model, response)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (cache_key) DO UPDATE
+            SET response = EXCLUDED.response,
+                created_at = CURRENT_TIMESTAMP,
+                last_used_at = CURRENT_TIMESTAMP
+        """, (cache_key, kind, model, response))
+        
+        # Eviction only runs on a miss, which already paid for a model call
+        cursor.execute(
+            "DELETE FROM ai_response_cache WHERE created_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second'",
+            (ttl_seconds,)
+        )
+        cursor.execute("""
+            DELETE FROM ai_response_cache
+            WHERE cache_key IN (
+                SELECT cache_key FROM ai_response_cache
+                ORDER BY last_used_at DESC
+                OFFSET %s
+            )
+        """, (max_entries,))
+        
+        conn.commit()
+        return True
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error saving AI response cache: %s", e)
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+def enqueue_ai_job(user_id, task_id, kind, payload, list_id=None):
+    """Queue an AI job, returning its id or None if the same job is already queued or running
+
+    Task jobs are unique per (task_id, kind); batch jobs pass list_id and are unique per list.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO ai_jobs (user_id, task_id, list_id, kind, payload)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT DO NOTHING
+            RETURNING id
+        """, (user_id, task_id, list_id, kind, payload))
+        
+        result = cursor.fetchone()
+        conn.commit()
+        return result["id"] if result else None
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error queueing AI job: %s", e)
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def claim_ai_job(stale_after_seconds):
+    """Claim the oldest runnable job for this worker
+    
+    Jobs left running longer than stale_after_seconds (e.g. by a worker that
+    died) are picked up again. SKIP LOCKED lets several workers claim at once.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE ai_jobs
+            SET status = 'running', attempts = attempts + 1, started_at = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM ai_jobs
+                WHERE (status = 'pending' AND run_after <= CURRENT_TIMESTAMP)
+                   OR (status = 'running' AND started_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second')
+                ORDER BY run_after, id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, user_id, task_id, kind, payload, attempts
+        """, (stale_after_seconds,))
+        
+        job = cursor.fetchone()
+        conn.commit()
+        return job
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error claiming AI job: %s", e)
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def complete_ai_job(job_id, result):
+    """Mark a job as done and store its result summary"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE ai_jobs
+            SET status = 'done', result = %s, error = NULL, finished_at = CURRENT_TIMESTAMP
+            WHERE id = %s
+        """, (result, job_id))
+        
+        conn.commit()
+        return True
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error completing AI job: %s", e)
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+def fail_ai_job(job_id, error, retry_delay_seconds=None):
+    """Record a failed attempt, requeueing the job after retry_delay_seconds or failing it for good"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        if retry_delay_seconds is None:
+            cursor.execute("""
+                UPDATE ai_jobs
+                SET status = 'failed', error = %s, finished_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (error, job_id))
+        else:
+            cursor.execute("""
+                UPDATE ai_jobs
+                SET status = 'pending', error = %s,
+                    run_after = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+                WHERE id = %s
+            """, (error, retry_delay_seconds, job_id))
+        
+        conn.commit()
+        return True
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error failing AI job: %s", e)
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+def get_active_ai_jobs(user_id):
+    """Return the user's queued and running jobs"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id, task_id, list_id, kind, status, attempts, error
+            FROM ai_jobs
+            WHERE user_id = %s AND status IN ('pending', 'running')
+            ORDER BY id
+        """, (user_id,))
+        
+        return cursor.fetchall()
+    except Exception as e:
+        logger.error("Error loading AI jobs: %s", e)
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def pop_finished_ai_jobs(user_id):
+    """Remove and return the user's finished jobs so their outcome is reported once"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            DELETE FROM ai_jobs
+            WHERE user_id = %s AND status IN ('done', 'failed')
+            RETURNING id, task_id, kind, status, result, error
+        """, (user_id,))
+        
+        jobs = cursor.fetchall()
+        conn.commit()
+        return sorted(jobs, key=lambda job: job["id"])
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error loading finished AI jobs: %s", e)
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def insert_outbox_email(cursor, recipient, subject, body):
+    """Add an email to the outbox using the caller's cursor; it is sent once the caller commits"""
+    cursor.execute("""
+        INSERT INTO email_outbox (recipient, subject, body)
+        VALUES (%s, %s, %s)
+        RETURNING id
+    """, (recipient, subject, body))
+    return cursor.fetchone()["id"]
+
+def enqueue_email(recipient, subject, body):
+    """Add an email to the outbox in its own transaction, returning its id"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        email_id = insert_outbox_email(cursor, recipient, subject, body)
+        conn.commit()
+        return email_id
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error queueing email: %s", e)
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def claim_outbox_emails(limit, stale_after_seconds):
+    """Claim up to limit emails that are due, oldest first
+
+    Emails left sending longer than stale_after_seconds (e.g. by a sender that
+    died) are picked up again.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE email_outbox
+            SET status = 'sending', attempts = attempts + 1, started_at = CURRENT_TIMESTAMP
+            WHERE id IN (
+                SELECT id FROM email_outbox
+                WHERE (status = 'pending' AND run_after <= CURRENT_TIMESTAMP)
+                   OR (status = 'sending' AND started_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second')
+                ORDER BY run_after, id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, recipient, subject, body, attempts
+        """, (stale_after_seconds, limit))
+        
+        emails = sorted(cursor.fetchall(), key=lambda email: email["id"])
+        conn.commit()
+        return emails
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error claiming outbox emails: %s", e)
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def delete_sent_emails(email_ids):
+    """Remove delivered emails from the outbox (bodies may hold temporary passwords)"""
+    if not email_ids:
+        return True
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM email_outbox WHERE id = ANY(%s)", (list(email_ids),))
+        conn.commit()
+        return True
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error deleting sent emails: %s", e)
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+def fail_outbox_email(email_id, error, retry_delay_seconds=None):
+    """Record a failed delivery, requeueing the email after retry_delay_seconds or failing it for good"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        if retry_delay_seconds is None:
+            cursor.execute("""
+                UPDATE email_outbox SET status = 'failed', error = %s
+                WHERE id = %s
+            """, (error, email_id))
+        else:
+            cursor.execute("""
+                UPDATE email_outbox
+                SET status = 'pending', error = %s,
+                    run_after = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+                WHERE id = %s
+            """, (error, retry_delay_seconds, email_id))
+        
+        conn.commit()
+        return True
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error failing outbox email: %s", e)
+        return False
+    finally:
+        if conn:
+            conn.close()
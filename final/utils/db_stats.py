@@ -0,0 +1,198 @@
+"""
+Per-query timing for the database helpers.
+
+get_db_connection hands out TimedCursor cursors. Each execute is timed and
+recorded under two keys: the helper that issued it (e.g. utils.db.get_tasks)
+and a fingerprint of the statement, with literals and placeholders replaced
+by "?". Connection setup time is recorded per helper too. Statements slower
+than DB_SLOW_QUERY_MS are logged.
+
+get_query_stats() returns a snapshot with counts, rows, total time and
+p50/p95/max latency per key. get_connection_stats() counts connections
+opened and still open.
+
+Recording costs a few microseconds per statement (see
+benchmarks/query_stats_overhead.py). Set DB_QUERY_STATS=0 to turn it off.
+"""
+import math
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from functools import lru_cache
+
+from psycopg2.extras import RealDictCursor
+from utils.log import get_logger
+from utils.tracing import add_span, current_span
+
+logger = get_logger(__name__)
+
+QUERY_STATS_ENABLED = os.getenv("DB_QUERY_STATS", "1") != "0"
+SLOW_QUERY_SECONDS = float(os.getenv("DB_SLOW_QUERY_MS", "200")) / 1000
+
+# Latency samples kept per key for percentiles
+SAMPLE_WINDOW = 512
+
+_lock = threading.Lock()
+_functions = {}
+_statements = {}
+_connections = {}
+
+# Connections handed out by get_db_connection; entries vanish once collected
+_live_connections = weakref.WeakSet()
+_opened_connections = 0
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Normalize a statement so calls that differ only in values share a key"""
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", "replace")
+    sql = _COMMENT.sub(" ", sql)
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    # IN lists and multi-row VALUES collapse to one entry whatever their length
+    sql = _LIST.sub("(...)", sql)
+    sql = _ROWS.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+class _Stats:
+    __slots__ = ("count", "total", "rows", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def add(self, seconds, rows):
+        self.count += 1
+        self.total += seconds
+        self.rows += rows
+        self.samples.append(seconds)
+
+def _stats_for(table, key):
+    stats = table.get(key)
+    if stats is None:
+        stats = table[key] = _Stats()
+    return stats
+
+_caller_names = {}
+
+def caller_name(depth=2):
+    """Name the function that called into the cursor, skipping psycopg2 and this module"""
+    frame = sys._getframe(depth)
+    while frame is not None:
+        code = frame.f_code
+        name = _caller_names.get(code)
+        if name is None:
+            module = frame.f_globals.get("__name__", "?")
+            if module.startswith("psycopg2") or module == __name__:
+                name = ""
+            else:
+                name = f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+            _caller_names[code] = name
+        if name:
+            return name
+        frame = frame.f_back
+    return "?"
+
+def record_query(function, sql, seconds, rows):
+    statement = fingerprint(sql)
+    with _lock:
+        _stats_for(_functions, function).add(seconds, rows)
+        _stats_for(_statements, statement).add(seconds, rows)
+    if seconds >= SLOW_QUERY_SECONDS:
+        logger.warning("Slow query", extra={"function": function, "statement": statement,
+                                            "ms": round(seconds * 1000, 1), "rows": rows})
+
+def record_connect(function, seconds):
+    with _lock:
+        _stats_for(_connections, function).add(seconds, 0)
+
+def track_connection(conn):
+    global _opened_connections
+    with _lock:
+        _live_connections.add(conn)
+        _opened_connections += 1
+
+def get_connection_stats():
+    """Return how many connections have been opened and how many are still open"""
+    with _lock:
+        live = list(_live_connections)
+        opened = _opened_connections
+    return {"opened": opened, "open": sum(1 for conn in live if not conn.closed)}
+
+class TimedCursor(RealDictCursor):
+    """RealDictCursor that records how long each statement takes"""
+
+    def execute(self, query, vars=None):
+        if not QUERY_STATS_ENABLED:
+            return super().execute(query, vars)
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self._record(query, start)
+
+    def executemany(self, query, vars_list):
+        if not QUERY_STATS_ENABLED:
+            return super().executemany(query, vars_list)
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self._record(query, start)
+
+    def _record(self, query, start):
+        end = time.perf_counter()
+        function = caller_name()
+        rows = max(self.rowcount, 0)
+        record_query(function, query, end - start, rows)
+        # Inside a traced rerun, each statement is also a span named after its helper
+        if current_span() is not None:
+            add_span(f"db {function}", start, end, statement=fingerprint(query), rows=rows)
+
+def _percentile(ordered, percent):
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+def _summarize(table):
+    summary = {}
+    for key, stats in table.items():
+        ordered = sorted(stats.samples)
+        summary[key] = {
+            "count": stats.count,
+            "total_seconds": stats.total,
+            "rows": stats.rows,
+            "p50": _percentile(ordered, 50),
+            "p95": _percentile(ordered, 95),
+            "max": ordered[-1] if ordered else None,
+        }
+    return summary
+
+def get_query_stats(reset=False):
+    """Snapshot of query stats by function, by statement fingerprint, and connection setup by function"""
+    with _lock:
+        snapshot = {
+            "functions": _summarize(_functions),
+            "statements": _summarize(_statements),
+            "connections": _summarize(_connections),
+        }
+        if reset:
+            _functions.clear()
+            _statements.clear()
+            _connections.clear()
+    return snapshot
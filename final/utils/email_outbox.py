@@ -0,0 +1,205 @@
+"""
+Background delivery for queued email.
+
+Pages add emails to the email_outbox table, usually in the same transaction as
+the change they report, and return right away. A sender thread claims due
+emails in batches and sends them over one reused SMTP connection. Failed sends
+are retried with exponential backoff. Delivered rows are deleted, since bodies
+can hold temporary passwords.
+
+SMTP settings are read once at import. Set SMTP_HOST, SMTP_PORT and
+SMTP_STARTTLS=0 to deliver to a local stand-in such as aiosmtpd.
+"""
+import os
+import pathlib
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from dotenv import load_dotenv
+from utils.db import (
+    enqueue_email,
+    insert_outbox_email,
+    claim_outbox_emails,
+    delete_sent_emails,
+    fail_outbox_email
+)
+from utils.log import get_logger
+from utils.tracing import span, start_trace
+
+logger = get_logger(__name__)
+
+ROOT_DIR = pathlib.Path(__file__).parent.parent
+load_dotenv(os.path.join(ROOT_DIR, '.env'))
+
+SENDER_EMAIL = os.getenv("EMAIL_ID")
+EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") != "0"
+SMTP_DEBUG_LEVEL = int(os.getenv("SMTP_DEBUG", "0"))
+SMTP_TIMEOUT_SECONDS = 20
+# Close the connection after this long without sending instead of holding it open
+SMTP_IDLE_SECONDS = 60
+
+# Emails claimed per round, and retry with exponential backoff before giving up
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+
+# How often the idle sender checks the table, and when a claimed email counts as abandoned
+POLL_INTERVAL_SECONDS = 2.0
+STALE_EMAIL_SECONDS = 300
+
+_sender = None
+_sender_lock = threading.Lock()
+_wakeup = threading.Event()
+
+class SMTPConnection:
+    """An SMTP connection that is opened on first send and reused until idle"""
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, starttls=SMTP_STARTTLS,
+                 username=SENDER_EMAIL, password=EMAIL_PASSWORD,
+                 timeout=SMTP_TIMEOUT_SECONDS, idle_seconds=SMTP_IDLE_SECONDS):
+        self.host = host
+        self.port = port
+        self.starttls = starttls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.idle_seconds = idle_seconds
+        self.connects = 0
+        self._server = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        with span("smtp.connect", host=self.host, port=self.port):
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                server.set_debuglevel(SMTP_DEBUG_LEVEL)
+                if self.starttls:
+                    server.starttls()
+                if self.username and self.password:
+                    server.login(self.username, self.password)
+            except Exception:
+                server.close()
+                raise
+        self._server = server
+        self.connects += 1
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            self._server.close()
+        self._server = None
+
+    def close_if_idle(self):
+        if self._server is not None and time.monotonic() - self._last_used > self.idle_seconds:
+            self.close()
+
+    def send(self, message):
+        """Send one message, reconnecting once if the server dropped the connection"""
+        self.close_if_idle()
+        with span("smtp.send"):
+            if self._server is None:
+                self._connect()
+            try:
+                self._server.send_message(message)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self._server.close()
+                self._server = None
+                self._connect()
+                self._server.send_message(message)
+        self._last_used = time.monotonic()
+
+def build_message(recipient, subject, body, sender=SENDER_EMAIL):
+    message = MIMEMultipart()
+    message["From"] = sender or ""
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.attach(MIMEText(body, "plain"))
+    return message
+
+def deliver_emails(connection, emails):
+    """Send claimed emails, delete the delivered ones and requeue or fail the rest
+
+    Returns:
+        tuple: (sent, failed)
+    """
+    sent_ids = []
+    failed = 0
+    for email in emails:
+        try:
+            connection.send(build_message(email["recipient"], email["subject"], email["body"], connection.username))
+            sent_ids.append(email["id"])
+            continue
+        except smtplib.SMTPRecipientsRefused as e:
+            # The server rejected the address itself; retrying won't help
+            fail_outbox_email(email["id"], f"Recipient refused: {str(e)}")
+            failed += 1
+            continue
+        except smtplib.SMTPAuthenticationError as e:
+            error = f"Email authentication failed; check EMAIL_ID and EMAIL_PASSWORD in .env: {str(e)}"
+        except (smtplib.SMTPException, OSError) as e:
+            error = f"SMTP error occurred: {str(e)}"
+
+        # Start the next email on a fresh connection
+        connection.close()
+        failed += 1
+        if email["attempts"] < MAX_ATTEMPTS:
+            fail_outbox_email(email["id"], error, RETRY_BASE_SECONDS * 2 ** (email["attempts"] - 1))
+        else:
+            fail_outbox_email(email["id"], error)
+
+    delete_sent_emails(sent_ids)
+    return len(sent_ids), failed
+
+def _sender_loop():
+    """Claim and deliver batches until the process exits"""
+    connection = SMTPConnection()
+    while True:
+        emails = claim_outbox_emails(BATCH_SIZE, STALE_EMAIL_SECONDS)
+        if not emails:
+            connection.close_if_idle()
+            _wakeup.wait(POLL_INTERVAL_SECONDS)
+            _wakeup.clear()
+            continue
+        try:
+            with start_trace("email.deliver", emails=len(emails)):
+                deliver_emails(connection, emails)
+        except Exception as e:
+            # Unsent emails in the batch are picked up again once they go stale
+            logger.error("Error delivering emails: %s", e)
+            connection.close()
+
+def start_sender():
+    """Start the sender thread once per process"""
+    global _sender
+    if _sender is not None:
+        return
+    with _sender_lock:
+        if _sender is None:
+            _sender = threading.Thread(target=_sender_loop, name="email-sender", daemon=True)
+            _sender.start()
+
+def queue_email(recipient, subject, body, cursor=None):
+    """Queue an email for the sender
+
+    With a cursor, the email is written in the caller's transaction and only goes
+    out once the caller commits. Without one it is committed on its own.
+
+    Returns:
+        The outbox id, or None if it couldn't be queued
+    """
+    start_sender()
+    if cursor is not None:
+        email_id = insert_outbox_email(cursor, recipient, subject, body)
+    else:
+        email_id = enqueue_email(recipient, subject, body)
+    _wakeup.set()
+    return email_id
@@ -0,0 +1,124 @@
+"""
+Application logging.
+
+Every module logs through get_logger(__name__). Records are put on a bounded
+in-memory queue, and a listener thread formats and writes them, so a log call
+never blocks a rerun on stderr. If the queue fills, records are dropped and
+counted instead.
+
+Settings (read once):
+    LOG_LEVEL         DEBUG, INFO (default), WARNING or ERROR
+    LOG_FORMAT        json (default), one object per line, or text
+    LOG_DEBUG_SAMPLE  fraction of DEBUG records kept, default 0.1
+
+Pass structured fields with extra=, e.g.
+    logger.debug("Updated task focus stats", extra={"task_id": task_id})
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE", "0.1"))
+QUEUE_SIZE = 10000
+
+ROOT_LOGGER = "zenflow"
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_configured = False
+_configure_lock = threading.Lock()
+_listener = None
+_dropped = 0
+
+class JSONFormatter(logging.Formatter):
+    """Format a record as one JSON object, including any extra= fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class DebugSampler(logging.Filter):
+    """Keep only a fraction of DEBUG records; other levels always pass"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue records without blocking, counting the ones dropped when the queue is full"""
+
+    def enqueue(self, record):
+        global _dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _dropped += 1
+
+    def prepare(self, record):
+        # Resolve the message here but leave formatting (and exc_info) to the listener
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def configure_logging():
+    """Set up the queue handler and its listener once per process"""
+    global _configured, _listener
+    if _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+        stream = logging.StreamHandler(sys.stderr)
+        if LOG_FORMAT == "text":
+            stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        else:
+            stream.setFormatter(JSONFormatter())
+
+        log_queue = queue.Queue(QUEUE_SIZE)
+        handler = DroppingQueueHandler(log_queue)
+        handler.addFilter(DebugSampler(DEBUG_SAMPLE_RATE))
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+        root.addHandler(handler)
+        # Streamlit configures the root logger too; keep our records out of its handlers
+        root.propagate = False
+
+        _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        _configured = True
+
+def get_logger(name):
+    """Return a logger under the application's root logger"""
+    configure_logging()
+    if name.startswith(ROOT_LOGGER):
+        return logging.getLogger(name)
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+def dropped_records():
+    """Number of records dropped because the queue was full"""
+    return _dropped
@@ -0,0 +1,296 @@
+"""
+In-process metrics with a Prometheus text endpoint.
+
+Counters and histograms are updated where things happen: page reruns in
+app.py, AI calls in utils.ai. Collectors are read at scrape time, for numbers
+other modules already keep: active sessions, running focus timers, database
+connections and query timings, AI limiter and cache stats, the password
+hashing queue, session state sizes and the process's CPU time.
+
+Set METRICS_PORT to serve /metrics from a side thread. With several worker
+processes, give each its own port.
+"""
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# A session counts as active if it reran within this window
+SESSION_ACTIVE_SECONDS = 300
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _number(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (made cumulative when rendered), then sum and count
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def collector(self, function):
+        """Register a function returning (name, type, help, [(labels dict, value)]) tuples at scrape time"""
+        with self._lock:
+            self._collectors.append(function)
+        return function
+
+    def render(self):
+        """Return every metric in Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collect in collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                logger.warning("Metrics collector %s failed: %s", collect.__name__, e)
+                continue
+            for name, metric_type, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    suffix = labels.pop("__suffix", "") if labels else ""
+                    names = list(labels or {})
+                    lines.append(f"{name}{suffix}{_labels(names, [labels[n] for n in names])} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+rerun_seconds = registry.histogram(
+    "zenflow_rerun_seconds", "Time to render a page, per rerun", ["page"])
+ai_call_seconds = registry.histogram(
+    "zenflow_ai_call_seconds", "AI provider call latency, after any limiter wait", ["model", "kind"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60))
+ai_call_errors = registry.counter(
+    "zenflow_ai_call_errors_total", "AI provider calls that raised", ["model", "kind"])
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def record_session(session_id, focus_timer_running=False):
+    """Note that a session reran, and whether its focus timer is running"""
+    with _sessions_lock:
+        _sessions[session_id] = (time.monotonic(), bool(focus_timer_running))
+
+@registry.collector
+def _collect_sessions():
+    cutoff = time.monotonic() - SESSION_ACTIVE_SECONDS
+    with _sessions_lock:
+        for session_id in [sid for sid, (seen, _) in _sessions.items() if seen < cutoff]:
+            del _sessions[session_id]
+        active = len(_sessions)
+        timers = sum(1 for _, running in _sessions.values() if running)
+    return [
+        ("zenflow_active_sessions", "gauge", f"Sessions that reran in the last {SESSION_ACTIVE_SECONDS}s", [({}, active)]),
+        ("zenflow_focus_timers_running", "gauge", "Active sessions with a focus timer running", [({}, timers)]),
+    ]
+
+def _summary_samples(stats, label):
+    """Prometheus summary samples from a get_query_stats() section"""
+    samples = []
+    for key, entry in stats.items():
+        for quantile, field in (("0.5", "p50"), ("0.95", "p95")):
+            samples.append(({label: key, "quantile": quantile}, entry[field]))
+        samples.append(({"__suffix": "_sum", label: key}, entry["total_seconds"]))
+        samples.append(({"__suffix": "_count", label: key}, entry["count"]))
+    return samples
+
+@registry.collector
+def _collect_db():
+    from utils.db_stats import get_query_stats, get_connection_stats
+    stats = get_query_stats()
+    connections = get_connection_stats()
+    return [
+        ("zenflow_db_connections_open", "gauge", "Database connections currently open", [({}, connections["open"])]),
+        ("zenflow_db_connections_opened_total", "counter", "Database connections opened", [({}, connections["opened"])]),
+        ("zenflow_db_query_seconds", "summary", "Statement latency per db helper (recent window)",
+         _summary_samples(stats["functions"], "function")),
+        ("zenflow_db_connect_seconds", "summary", "Connection setup latency per db helper (recent window)",
+         _summary_samples(stats["connections"], "function")),
+    ]
+
+@registry.collector
+def _collect_ai():
+    from utils.ai import get_limiter_stats
+    from utils.ai_cache import get_cache_stats
+    limiter = get_limiter_stats()
+    cache = get_cache_stats()
+    return [
+        ("zenflow_ai_requests_total", "counter", "AI calls by limiter outcome",
+         [({"outcome": "admitted"}, limiter["calls"]), ({"outcome": "rejected"}, limiter["rejected"]),
+          ({"outcome": "coalesced"}, limiter["coalesced"])]),
+        ("zenflow_ai_in_flight", "gauge", "AI calls in progress", [({}, limiter["in_flight"])]),
+        ("zenflow_ai_limiter_wait_seconds", "summary", "Time AI calls waited for the limiter (recent window)",
+         [({"quantile": "0.5"}, limiter["wait_p50"]), ({"quantile": "0.95"}, limiter["wait_p95"])]),
+        ("zenflow_ai_cache_lookups_total", "counter", "AI response cache lookups by result",
+         [({"result": "memory_hit"}, cache["memory_hits"]), ({"result": "db_hit"}, cache["db_hits"]),
+          ({"result": "miss"}, cache["misses"])]),
+        ("zenflow_ai_cache_hit_ratio", "gauge", "AI response cache hit rate", [({}, cache["hit_rate"])]),
+    ]
+
+@registry.collector
+def _collect_password_hashing():
+    from utils.password_hashing import get_hash_pool_stats
+    stats = get_hash_pool_stats()
+    return [
+        ("zenflow_password_hash_queue_depth", "gauge", "Password hashes queued or running", [({}, stats["queue_depth"])]),
+        ("zenflow_password_hash_rejected_total", "counter", "Password hashes turned away with the queue full",
+         [({}, stats["rejected"])]),
+    ]
+
+@registry.collector
+def _collect_session_state():
+    from utils.session_state import get_session_footprints
+    footprints = get_session_footprints()
+    by_key = {}
+    for rows in footprints.values():
+        for row in rows:
+            # Listed names and patterns keep the label set small; widget values and strays share one
+            name = row["name"] or "unlisted"
+            by_key[name] = by_key.get(name, 0) + row["bytes"]
+    largest = max((sum(row["bytes"] for row in rows) for rows in footprints.values()), default=0)
+    return [
+        ("zenflow_session_state_bytes", "gauge", "Session state size summed over recent sessions, per key",
+         [({"key": name}, size) for name, size in sorted(by_key.items())]),
+        ("zenflow_session_state_largest_bytes", "gauge", "Session state size of the largest recent session",
+         [({}, largest)]),
+    ]
+
+@registry.collector
+def _collect_process():
+    # The standard Prometheus name, so dashboards can use rate() as for any exporter
+    return [
+        ("process_cpu_seconds_total", "counter", "User and system CPU time of this process, all threads",
+         [({}, time.process_time())]),
+    ]
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would otherwise fill the log
+        pass
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port=None, host=METRICS_HOST):
+    """Serve /metrics on a daemon thread once per process; does nothing unless a port is configured"""
+    global _server
+    if port is None:
+        port = METRICS_PORT
+    if port in (None, "") or _server is not None:
+        return _server
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError as e:
+                logger.error("Could not start metrics endpoint on %s:%s: %s", host, port, e)
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            logger.info("Serving metrics", extra={"host": host, "port": _server.server_address[1]})
+    return _server
@@ -0,0 +1,149 @@
+"""
+Password hashing off the Streamlit script thread.
+
+PBKDF2 is deliberately slow, so hashing runs in a small process pool instead
+of the thread serving the session. Submissions are bounded: when too many are
+waiting, callers get PasswordHashBusy instead of piling up behind a login storm.
+
+This module only imports passlib and utils.log so spawned pool workers start quickly.
+"""
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from passlib.hash import pbkdf2_sha256
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Cost of new hashes; existing hashes with a different cost are upgraded on login
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", str(pbkdf2_sha256.default_rounds)))
+
+# Worker processes, and how many hashes may be queued or running before callers are turned away
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+MAX_PENDING_HASHES = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+# How long a caller waits for a free queue slot before giving up
+QUEUE_TIMEOUT_SECONDS = 5
+
+LATENCY_WINDOW = 1000
+
+class PasswordHashBusy(Exception):
+    """Raised when the hashing queue is full"""
+
+def _hash(password, rounds):
+    return pbkdf2_sha256.using(rounds=rounds).hash(password)
+
+def _hash_rounds(password_hash):
+    """Return the PBKDF2 rounds stored in a hash, or None if it can't be read"""
+    try:
+        return int(password_hash.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def _verify_and_update(password, password_hash, rounds):
+    """Verify a password and return (matches, new_hash); new_hash is set when the cost changed"""
+    if not pbkdf2_sha256.verify(password, password_hash):
+        return False, None
+    if _hash_rounds(password_hash) != rounds:
+        return True, _hash(password, rounds)
+    return True, None
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(MAX_PENDING_HASHES)
+_stats_lock = threading.Lock()
+_stats = {"submitted": 0, "completed": 0, "rejected": 0, "rehashed": 0,
+          "queue_depth": 0, "peak_queue_depth": 0, "inline": 0}
+_latencies = deque(maxlen=LATENCY_WINDOW)
+
+def _get_pool():
+    """Start the pool on first use; returns None if processes can't be started here"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                try:
+                    # Spawn, not fork: the Streamlit server process is multi-threaded
+                    _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS,
+                                                mp_context=multiprocessing.get_context("spawn"))
+                except (OSError, NotImplementedError) as e:
+                    logger.warning("Password hashing pool unavailable, hashing inline: %s", e)
+                    _pool = False
+    return _pool or None
+
+def _disable_pool():
+    global _pool
+    with _pool_lock:
+        if _pool:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = False
+
+def _run(function, *args):
+    """Run a hashing function in the pool, waiting for a queue slot first"""
+    start = time.perf_counter()
+    if not _slots.acquire(timeout=QUEUE_TIMEOUT_SECONDS):
+        with _stats_lock:
+            _stats["rejected"] += 1
+        raise PasswordHashBusy("Too many sign-in attempts right now. Please try again in a moment.")
+
+    with _stats_lock:
+        _stats["submitted"] += 1
+        _stats["queue_depth"] += 1
+        _stats["peak_queue_depth"] = max(_stats["peak_queue_depth"], _stats["queue_depth"])
+    try:
+        pool = _get_pool()
+        if pool is not None:
+            try:
+                return pool.submit(function, *args).result()
+            except BrokenProcessPool as e:
+                # Workers couldn't start or died; stop using the pool rather than fail every login
+                logger.warning("Password hashing pool broke, hashing inline from now on: %s", e)
+                _disable_pool()
+        with _stats_lock:
+            _stats["inline"] += 1
+        return function(*args)
+    finally:
+        _slots.release()
+        with _stats_lock:
+            _stats["queue_depth"] -= 1
+            _stats["completed"] += 1
+            _latencies.append(time.perf_counter() - start)
+
+def hash_password(password):
+    """Hash a password at the configured cost"""
+    return _run(_hash, password, PASSWORD_HASH_ROUNDS)
+
+def verify_password(password, password_hash):
+    """Verify a password against a stored hash"""
+    matches, _ = _run(_verify_and_update, password, password_hash, _hash_rounds(password_hash))
+    return matches
+
+def verify_and_update_password(password, password_hash):
+    """Verify a password and return (matches, new_hash) if the hash should be upgraded"""
+    matches, new_hash = _run(_verify_and_update, password, password_hash, PASSWORD_HASH_ROUNDS)
+    if new_hash:
+        with _stats_lock:
+            _stats["rehashed"] += 1
+    return matches, new_hash
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+def get_hash_pool_stats():
+    """Return queue depth, counts and latency percentiles (seconds, including queueing)"""
+    with _stats_lock:
+        stats = dict(_stats)
+        latencies = list(_latencies)
+    stats["workers"] = HASH_WORKERS
+    stats["max_pending"] = MAX_PENDING_HASHES
+    stats["latency_p50"] = _percentile(latencies, 50)
+    stats["latency_p95"] = _percentile(latencies, 95)
+    return stats
@@ -0,0 +1,171 @@
+"""
+Opt-in profiling of whole reruns.
+
+Nothing is profiled unless PROFILE_DIR is set. Then a rerun is profiled when
+its page is listed in PROFILE_PAGES ("*" for every page), its user id is in
+PROFILE_USERS, or the URL has ?profile=1. Profiles are aggregated per page
+and written to PROFILE_DIR every PROFILE_RERUNS reruns:
+
+- PROFILE_MODE=sample (default): a thread samples the rerun's stack every
+  PROFILE_INTERVAL_MS and writes <page>-<time>.collapsed, one
+  "frame;frame;frame count" line per stack, which flamegraph.pl,
+  speedscope and inferno read directly.
+- PROFILE_MODE=cprofile: deterministic cProfile, written as a .prof file
+  for pstats or snakeviz. Only one rerun at a time can be under cProfile;
+  concurrent reruns are skipped.
+
+When disabled, the cost per rerun is a single check of a module flag.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample")
+PROFILE_PAGES = {page.strip() for page in os.getenv("PROFILE_PAGES", "").split(",") if page.strip()}
+PROFILE_USERS = {user.strip() for user in os.getenv("PROFILE_USERS", "").split(",") if user.strip()}
+PROFILE_RERUNS = int(os.getenv("PROFILE_RERUNS", "20"))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+
+PROFILING_ENABLED = bool(PROFILE_DIR)
+
+_lock = threading.Lock()
+# page -> [reruns, Counter of collapsed stacks or pstats.Stats]
+_aggregates = {}
+# cProfile can only run one profiler at a time
+_cprofile_lock = threading.Lock()
+
+def should_profile(page, user_id=None, query_flag=None):
+    """Return True if this rerun was asked to be profiled"""
+    if not PROFILING_ENABLED:
+        return False
+    return (query_flag == "1" or "*" in PROFILE_PAGES or page in PROFILE_PAGES
+            or (user_id is not None and str(user_id) in PROFILE_USERS))
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{getattr(code, 'co_qualname', code.co_name)}"
+
+def _collapse(frame):
+    """Stack from the app script down to the frame, in flamegraph's collapsed format"""
+    names = []
+    outermost_script_frame = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "?")
+        if module == __name__:
+            # Caught the profiler stopping itself, not the rerun
+            return None
+        names.append(_frame_name(frame))
+        # Streamlit runs app.py as __main__; the frames above it are its script runner
+        if module == "__main__":
+            outermost_script_frame = len(names)
+        frame = frame.f_back
+    return ";".join(reversed(names[:outermost_script_frame]))
+
+class StackSampler:
+    """Sample one thread's stack at a fixed interval into collapsed-stack counts"""
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = _collapse(frame) if frame is not None else None
+            if stack:
+                self.stacks[stack] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+def _write(page, reruns, profile):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    if PROFILE_MODE == "cprofile":
+        path = os.path.join(PROFILE_DIR, f"{page}-{stamp}.prof")
+        profile.dump_stats(path)
+    else:
+        path = os.path.join(PROFILE_DIR, f"{page}-{stamp}.collapsed")
+        with open(path, "w") as f:
+            for stack, count in profile.most_common():
+                f.write(f"{stack} {count}\n")
+    logger.info("Wrote profile", extra={"page": page, "reruns": reruns, "path": path})
+    return path
+
+def _add(page, result):
+    """Fold one rerun's profile into the page's aggregate, writing it out every PROFILE_RERUNS reruns"""
+    with _lock:
+        entry = _aggregates.get(page)
+        if entry is None:
+            entry = _aggregates[page] = [0, Counter() if PROFILE_MODE != "cprofile" else None]
+        entry[0] += 1
+        if PROFILE_MODE == "cprofile":
+            if entry[1] is None:
+                entry[1] = pstats.Stats(result)
+            else:
+                entry[1].add(result)
+        else:
+            entry[1].update(result)
+        if entry[0] < PROFILE_RERUNS:
+            return None
+        del _aggregates[page]
+    try:
+        return _write(page, entry[0], entry[1])
+    except OSError as e:
+        logger.error("Could not write profile: %s", e, extra={"page": page})
+        return None
+
+@contextmanager
+def profile_rerun(page, user_id=None, query_flag=None):
+    """Profile the enclosed block if should_profile() says so"""
+    if not should_profile(page, user_id, query_flag):
+        yield
+        return
+
+    if PROFILE_MODE == "cprofile":
+        if not _cprofile_lock.acquire(blocking=False):
+            yield
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+        finally:
+            _cprofile_lock.release()
+            _add(page, profiler)
+        return
+
+    sampler = StackSampler(threading.get_ident())
+    sampler.start()
+    try:
+        yield
+    finally:
+        _add(page, sampler.stop())
+
+def flush_profiles():
+    """Write out partial aggregates, e.g. before a benchmark or shutdown"""
+    with _lock:
+        pending = list(_aggregates.items())
+        _aggregates.clear()
+    return [_write(page, reruns, profile) for page, (reruns, profile) in pending if profile]
@@ -0,0 +1,81 @@
+"""
+Lexicographic (fractional) rank keys used to order vision board tiles and tasks.
+
+A rank is a short base-62 string. Ranks compare with plain byte ordering, so the
+columns that store them use COLLATE "C". Moving an item only needs a new key
+between its two neighbours, which means a reorder touches exactly one row.
+"""
+
+# Base-62 alphabet in ASCII order so string comparison matches numeric order
+RANK_DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+RANK_BASE = len(RANK_DIGITS)
+
+# Keys longer than this trigger a rebalance of the whole list
+MAX_RANK_LENGTH = 32
+
+def _digit(key, index):
+    """Return the numeric value of the digit at index"""
+    return RANK_DIGITS.index(key[index])
+
+def rank_between(before=None, after=None):
+    """Return a rank that sorts strictly between before and after
+
+    Args:
+        before (str): Rank of the preceding item, or None for the start of the list
+        after (str): Rank of the following item, or None for the end of the list
+
+    Returns:
+        str: A new rank key
+    """
+    before = before or ""
+    if after is not None and before >= after:
+        raise ValueError(f"Cannot place a rank between '{before}' and '{after}'")
+
+    result = []
+    i = 0
+    while True:
+        low = _digit(before, i) if i < len(before) else 0
+        high = _digit(after, i) if after is not None else RANK_BASE
+
+        if low == high:
+            # Still inside the common prefix
+            result.append(RANK_DIGITS[low])
+            i += 1
+            continue
+
+        middle = (low + high) // 2
+        if middle > low:
+            result.append(RANK_DIGITS[middle])
+            return "".join(result)
+
+        # Adjacent digits: keep the lower one and keep searching without an upper bound
+        result.append(RANK_DIGITS[low])
+        after = None
+        i += 1
+
+def evenly_spaced_ranks(count):
+    """Return count short ranks spread evenly across the key space (used for rebalancing)"""
+    if count <= 0:
+        return []
+
+    # Use the smallest fixed width that leaves room between every pair of keys
+    width = 1
+    while RANK_BASE ** width <= count * 2:
+        width += 1
+    step = RANK_BASE ** width // (count + 1)
+
+    ranks = []
+    for i in range(1, count + 1):
+        value = i * step
+        digits = []
+        for _ in range(width):
+            value, remainder = divmod(value, RANK_BASE)
+            digits.append(RANK_DIGITS[remainder])
+        # Trailing zeros are dropped so there is always room to insert before a key
+        ranks.append("".join(reversed(digits)).rstrip("0"))
+
+    return ranks
+
+def needs_rebalance(rank):
+    """Check whether a rank has grown long enough to rebalance its list"""
+    return rank is not None and len(rank) > MAX_RANK_LENGTH
@@ -0,0 +1,241 @@
+"""
+What each session keeps in st.session_state, and how big it may get.
+
+SESSION_KEYS lists the keys the app sets, with the page they belong to and a
+size budget in bytes. Keys made per item, like delete_confirm_<task id>, are
+listed as fnmatch patterns. Page is None for keys that live as long as the
+session: login, cross-page hand-offs and the focus timer, which keeps running
+while the user is elsewhere.
+
+On navigation, compact_session_state() drops the state of every other page;
+each page loads what it needs from the database again when it is next
+opened. It also drops user_<id>_ keys of a user who has logged out.
+
+Streamlit keeps values for keyed widgets in session state too, and clears them
+itself once the widget isn't shown. They aren't listed and share
+UNLISTED_BUDGET.
+
+Footprints are measured after a rerun that navigated and every
+SAMPLE_SECONDS, kept per session for /metrics, and shown per key in the
+sidebar with SESSION_STATE_PANEL=1. A key over its budget is logged once per session.
+"""
+import os
+import sys
+import threading
+import time
+from fnmatch import fnmatchcase
+from functools import lru_cache
+
+import streamlit as st
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+SESSION_STATE_PANEL = os.getenv("SESSION_STATE_PANEL") == "1"
+
+# How often a session's footprint is measured when it doesn't navigate
+SAMPLE_SECONDS = 60
+# Footprints of sessions that haven't reran in this long are forgotten
+FORGET_SECONDS = 300
+
+KB = 1024
+
+# key or pattern: (page, budget in bytes)
+SESSION_KEYS = {
+    # Login, navigation and messages
+    "user_id": (None, 1 * KB),
+    "authenticated": (None, 1 * KB),
+    "current_page": (None, 1 * KB),
+    "last_page": (None, 1 * KB),
+    "auth_mode": (None, 1 * KB),
+    "theme": (None, 1 * KB),
+    "error": (None, 4 * KB),
+    "success": (None, 4 * KB),
+    "session_checked": (None, 1 * KB),
+    "session_token_hash": (None, 1 * KB),
+    "session_cookie_update": (None, 1 * KB),
+    "redirect_to_rewards": (None, 1 * KB),
+    "new_rewards": (None, 8 * KB),
+
+    # Handed from one page to another
+    "active_list": (None, 1 * KB),
+    "just_completed_task": (None, 4 * KB),
+    "just_completed_task_id": (None, 1 * KB),
+    "start_pomodoro": (None, 1 * KB),
+    "focus_task_id": (None, 1 * KB),
+    "focus_task_name": (None, 1 * KB),
+    # Categories on the board aren't stored, so they can't be reloaded
+    "selected_categories": (None, 8 * KB),
+
+    # Focus timer, mirrored from focus_flow_state every few seconds, and stats
+    "timer_running": (None, 1 * KB),
+    "timer_paused": (None, 1 * KB),
+    "timer_mode": (None, 1 * KB),
+    "time_remaining": (None, 1 * KB),
+    "timer_duration": (None, 1 * KB),
+    "focus_version": (None, 1 * KB),
+    "focus_flow": (None, 2 * KB),
+    "focus_ticking": (None, 1 * KB),
+    "focus_flow_state": (None, 1 * KB),
+    "linked_task": (None, 1 * KB),
+    "linked_task_id": (None, 1 * KB),
+    "completed_mode": (None, 1 * KB),
+    "awaiting_user_action": (None, 1 * KB),
+    "task_explicitly_unlinked": (None, 1 * KB),
+    "task_just_linked": (None, 1 * KB),
+    "pomodoro_duration": (None, 1 * KB),
+    "short_break_duration": (None, 1 * KB),
+    "long_break_duration": (None, 1 * KB),
+    "timer_settings_loaded": (None, 1 * KB),
+    "user_*_total_focus_time": (None, 1 * KB),
+    "user_*_sessions_completed": (None, 1 * KB),
+    "user_*_total_break_time": (None, 1 * KB),
+    "user_*_breaks_completed": (None, 1 * KB),
+    "user_*_stats_loaded": (None, 1 * KB),
+    "user_*_daily_task_sessions": (None, 16 * KB),
+
+    # Focus page
+    "settings_changed": ("focus", 1 * KB),
+    "reset_to_defaults": ("focus", 1 * KB),
+    "showing_unlink_confirmation": ("focus", 1 * KB),
+
+    # Tasks page
+    "editing_task_id": ("tasks", 1 * KB),
+    "editing_subtask_id": ("tasks", 1 * KB),
+    "adding_task": ("tasks", 1 * KB),
+    "adding_subtask_for": ("tasks", 1 * KB),
+    "confirming_subtask_replace": ("tasks", 16 * KB),
+    "delete_confirm_*": ("tasks", 1 * KB),
+    "subtask_updated_*": ("tasks", 1 * KB),
+
+    # Vision board, reloaded from the database; images are static file references
+    "show_vision_board_creator": ("vision_board", 1 * KB),
+    "category_customizations": ("vision_board", 16 * KB),
+    "vision_board_theme": ("vision_board", 1 * KB),
+    "vision_board_frame_shape": ("vision_board", 1 * KB),
+    "adding_item_to_category": ("vision_board", 1 * KB),
+    "show_customize_*": ("vision_board", 1 * KB),
+    "editing_tile_id": ("vision_board", 1 * KB),
+    "editing_tile_data": ("vision_board", 16 * KB),
+    "deleting_tile_id": ("vision_board", 1 * KB),
+    "deleting_tile_title": ("vision_board", 1 * KB),
+
+    # Assistant, reloaded from the database with only the recent messages
+    "assistant_conversation_id": ("assistant", 1 * KB),
+    "assistant_messages": ("assistant", 128 * KB),
+    "assistant_has_older": ("assistant", 1 * KB),
+    "chat_history": ("assistant", 128 * KB),
+
+    # Dashboard, landing and login pages
+    "show_change_password": ("dashboard", 1 * KB),
+    "show_delete_account": ("dashboard", 1 * KB),
+    "testimonial_index": ("landing", 1 * KB),
+    "show_forgot_password": ("auth", 1 * KB),
+}
+
+# Widget values and anything else not listed above
+UNLISTED_BUDGET = 16 * KB
+
+@lru_cache(maxsize=4096)
+def key_schema(key):
+    """Return (name, page, budget) for a session state key; name is the listed key or pattern, or None"""
+    if key in SESSION_KEYS:
+        return (key, *SESSION_KEYS[key])
+    for pattern, (page, budget) in SESSION_KEYS.items():
+        if "*" in pattern and fnmatchcase(key, pattern):
+            return (pattern, page, budget)
+    return (None, None, UNLISTED_BUDGET)
+
+def size_of(value):
+    """Approximate bytes held by a value and everything it contains"""
+    total = 0
+    seen = set()
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item, 0)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, "__dict__") and not isinstance(item, type):
+            # Plain objects, such as an uploaded file's metadata
+            stack.append(vars(item))
+    return total
+
+def measure_session_state():
+    """Return one dict per key in this session's state (key, name, page, bytes, budget), largest first"""
+    rows = []
+    for key in list(st.session_state.keys()):
+        try:
+            value = st.session_state[key]
+        except KeyError:
+            # A widget whose value Streamlit dropped mid-iteration
+            continue
+        name, page, budget = key_schema(key)
+        rows.append({"key": key, "name": name, "page": page, "bytes": size_of(value), "budget": budget})
+    rows.sort(key=lambda row: row["bytes"], reverse=True)
+    return rows
+
+def compact_session_state(page):
+    """Drop the state of pages other than page, and of users other than the logged-in one; returns the keys dropped"""
+    user_id = st.session_state.get("user_id")
+    current_user = f"user_{user_id}_" if user_id else None
+    dropped = []
+    for key in list(st.session_state.keys()):
+        name, key_page, _ = key_schema(key)
+        if key_page is not None and key_page != page:
+            dropped.append(key)
+        elif name is not None and name.startswith("user_*_") and not (current_user and key.startswith(current_user)):
+            dropped.append(key)
+    for key in dropped:
+        del st.session_state[key]
+    return dropped
+
+_footprints = {}
+_footprints_lock = threading.Lock()
+
+def _record_footprint(session_id, rows):
+    """Keep a session's latest footprint, and log keys that went over budget for the first time"""
+    now = time.monotonic()
+    over = {row["key"]: row for row in rows if row["bytes"] > row["budget"]}
+    with _footprints_lock:
+        previous = _footprints.get(session_id)
+        warned = previous["warned"] if previous else set()
+        _footprints[session_id] = {"seen": now, "measured": now, "rows": rows, "warned": warned | set(over)}
+    for key in sorted(set(over) - warned):
+        row = over[key]
+        logger.warning("Session state key over budget", extra={
+            "key": key, "bytes": row["bytes"], "budget": row["budget"], "listed": row["name"] is not None,
+        })
+
+def compact_on_navigation(page):
+    """Compact session state if page isn't the page rendered last; returns whether it was a navigation"""
+    if st.session_state.get("last_page") == page:
+        return False
+    compact_session_state(page)
+    st.session_state.last_page = page
+    return True
+
+def sample_session_state(session_id, force=False):
+    """Measure this session's state if force is set or SAMPLE_SECONDS have passed; call after each rerun"""
+    now = time.monotonic()
+    with _footprints_lock:
+        footprint = _footprints.get(session_id)
+        if footprint is not None:
+            footprint["seen"] = now
+    if force or footprint is None or now - footprint["measured"] >= SAMPLE_SECONDS:
+        _record_footprint(session_id, measure_session_state())
+
+def get_session_footprints():
+    """Return {session id: rows from measure_session_state()} for sessions seen recently, forgetting the rest"""
+    cutoff = time.monotonic() - FORGET_SECONDS
+    with _footprints_lock:
+        for session_id in [sid for sid, footprint in _footprints.items() if footprint["seen"] < cutoff]:
+            del _footprints[session_id]
+        return {session_id: footprint["rows"] for session_id, footprint in _footprints.items()}
@@ -0,0 +1,230 @@
+"""
+Persistent login sessions.
+
+Signing in creates a random token. The browser keeps the token in a cookie,
+and only its SHA-256 is stored in user_sessions. A page refresh or a new tab
+starts a fresh Streamlit session. When that happens, app.main reads the
+cookie from the websocket request headers and resumes the login without
+another password check.
+
+The cookie is HttpOnly, so page scripts never see the token, and Secure
+unless SESSION_COOKIE_SECURE=0, which plain-HTTP deployments need. Streamlit
+can't set response headers on its own routes, so sync_session_cookie() adds
+one to Streamlit's Tornado app: the page gets a one-time grant for the
+change, and a fetch of COOKIE_ROUTE with it answers with the Set-Cookie
+header. Grants live in this process, so like Streamlit's own upload and
+media routes this needs a browser's requests to reach the same worker.
+
+Session lookups are cached in-process for TOKEN_CACHE_SECONDS. A session
+revoked from another server process therefore stays usable here for up to
+that long.
+"""
+import hashlib
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from http.cookies import SimpleCookie
+
+import streamlit as st
+import streamlit.components.v1 as components
+import tornado.web
+from streamlit import config, runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.web.server.server_util import make_url_path_regex
+from models.login_session import LoginSession
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+SESSION_COOKIE = "zenflow_session"
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_DAYS", "14")) * 24 * 3600
+# Slide the expiry forward at most this often, so resuming rarely writes
+SESSION_REFRESH_SECONDS = 3600
+
+TOKEN_CACHE_SECONDS = 60
+TOKEN_CACHE_SIZE = 10000
+
+# Browsers only keep a Secure cookie over HTTPS (some not even on http://localhost)
+SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "1") != "0"
+
+COOKIE_ROUTE = "_zenflow/session"
+# A grant not redeemed by the page this soon is dropped
+COOKIE_GRANT_SECONDS = 60
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def hash_token(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _cached_user(token_hash):
+    """Return (hit, user_id); user_id is None for a cached miss"""
+    with _cache_lock:
+        entry = _cache.get(token_hash)
+        if entry is None:
+            return False, None
+        user_id, cached_at = entry
+        if time.monotonic() - cached_at > TOKEN_CACHE_SECONDS:
+            del _cache[token_hash]
+            return False, None
+        return True, user_id
+
+def _cache_user(token_hash, user_id):
+    with _cache_lock:
+        _cache[token_hash] = (user_id, time.monotonic())
+        _cache.move_to_end(token_hash)
+        while len(_cache) > TOKEN_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def _forget(token_hashes):
+    with _cache_lock:
+        for token_hash in token_hashes:
+            _cache.pop(token_hash, None)
+
+def lookup_session(token_hash):
+    """Return the user ID for a live session token hash, or None"""
+    hit, user_id = _cached_user(token_hash)
+    if hit:
+        return user_id
+    user_id = LoginSession.resume(token_hash, SESSION_TTL_SECONDS, SESSION_REFRESH_SECONDS)
+    # Misses are cached too, so a stale cookie doesn't hit the database on every reconnect
+    _cache_user(token_hash, user_id)
+    return user_id
+
+def _read_cookie():
+    """Read the session token from the headers of this session's websocket request"""
+    try:
+        from streamlit.web.server.websocket_headers import _get_websocket_headers
+        headers = _get_websocket_headers() or {}
+    except Exception as e:
+        logger.warning("Could not read request headers: %s", e)
+        return None
+
+    cookie = SimpleCookie()
+    try:
+        cookie.load(headers.get("Cookie", ""))
+    except Exception:
+        return None
+    morsel = cookie.get(SESSION_COOKIE)
+    return morsel.value if morsel else None
+
+def start_session(user_id):
+    """Create a session for a user who just signed in and queue its cookie"""
+    token = secrets.token_urlsafe(32)
+    token_hash = hash_token(token)
+    if not LoginSession.create(user_id, token_hash, SESSION_TTL_SECONDS):
+        return False
+
+    _cache_user(token_hash, user_id)
+    st.session_state.session_token_hash = token_hash
+    st.session_state.session_cookie_update = (token, SESSION_TTL_SECONDS)
+    return True
+
+def resume_session():
+    """Return the user ID from the session cookie, checked once per Streamlit session"""
+    if st.session_state.get("session_checked"):
+        return None
+    st.session_state.session_checked = True
+
+    token = _read_cookie()
+    if not token:
+        return None
+    token_hash = hash_token(token)
+    user_id = lookup_session(token_hash)
+    if user_id:
+        st.session_state.session_token_hash = token_hash
+        # Re-send the cookie so its lifetime slides along with the stored expiry
+        st.session_state.session_cookie_update = (token, SESSION_TTL_SECONDS)
+    return user_id
+
+def end_session():
+    """Revoke the current session and queue clearing its cookie"""
+    token_hash = st.session_state.pop("session_token_hash", None)
+    if token_hash:
+        LoginSession.revoke(token_hash)
+        _forget([token_hash])
+    st.session_state.session_cookie_update = ("", 0)
+
+def revoke_other_sessions(user_id):
+    """Sign a user out everywhere except this session, e.g. after a password change"""
+    revoked = LoginSession.revoke_for_user(user_id, st.session_state.get("session_token_hash"))
+    _forget(revoked)
+    return len(revoked)
+
+_grants = {}
+_grants_lock = threading.Lock()
+_route_installed = False
+
+def _add_grant(token, max_age):
+    """Hold a cookie change for the page to redeem once; returns the grant"""
+    grant = secrets.token_urlsafe(32)
+    now = time.monotonic()
+    with _grants_lock:
+        for key in [key for key, (_, _, expires) in _grants.items() if expires < now]:
+            del _grants[key]
+        _grants[hash_token(grant)] = (token, max_age, now + COOKIE_GRANT_SECONDS)
+    return grant
+
+def _redeem_grant(grant):
+    """Return (token, max_age) for an unexpired grant and forget it, or None"""
+    with _grants_lock:
+        entry = _grants.pop(hash_token(grant), None)
+    if entry is None or entry[2] < time.monotonic():
+        return None
+    return entry[0], entry[1]
+
+class _SessionCookieHandler(tornado.web.RequestHandler):
+    """Answer a grant from sync_session_cookie() with the cookie change it holds"""
+
+    def get(self):
+        self.set_header("Cache-Control", "no-store")
+        update = _redeem_grant(self.get_argument("grant", ""))
+        if update is None:
+            self.send_error(404)
+            return
+        token, max_age = update
+        options = dict(path="/", httponly=True, secure=SESSION_COOKIE_SECURE, samesite="Strict")
+        if max_age:
+            self.set_cookie(SESSION_COOKIE, token, max_age=max_age, **options)
+        else:
+            self.clear_cookie(SESSION_COOKIE, **options)
+        self.set_status(204)
+
+def _install_cookie_route():
+    """Add COOKIE_ROUTE to the Tornado app serving this session, once per process"""
+    global _route_installed
+    if _route_installed:
+        return True
+    ctx = get_script_run_ctx()
+    client = runtime.get_instance().get_client(ctx.session_id) if ctx else None
+    application = getattr(client, "application", None)
+    if application is None:
+        logger.warning("No Tornado app to add the session cookie route to")
+        return False
+    with _grants_lock:
+        if not _route_installed:
+            # add_handlers() puts these ahead of Streamlit's catch-all static route
+            path = make_url_path_regex(config.get_option("server.baseUrlPath"), COOKIE_ROUTE)
+            application.add_handlers(r".*", [(path, _SessionCookieHandler)])
+            _route_installed = True
+    return True
+
+def sync_session_cookie():
+    """Write any queued cookie change to the browser; call once per run"""
+    update = st.session_state.pop("session_cookie_update", None)
+    if update is None or not _install_cookie_route():
+        return
+    grant = _add_grant(*update)
+    base = config.get_option("server.baseUrlPath").strip("/")
+    path = "/" + "/".join(part for part in (base, COOKIE_ROUTE) if part)
+    # The Set-Cookie comes from the server, so the token itself never reaches the page
+    components.html(
+        f"""
+        <script>
+        fetch("{path}?grant={grant}", {{credentials: "same-origin", cache: "no-store"}});
+        </script>
+        """,
+        height=0,
+    )
@@ -1,23 +1,43 @@
+import hashlib
+import os
+from functools import lru_cache
+from pathlib import Path
+
 import streamlit as st
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Generated stylesheets are written here and served by Streamlit's static file serving
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+STYLESHEET_DIR = STATIC_DIR / "css"
+STYLESHEET_URL = "app/static/css"
+
+def _detect_dark_theme():
+    """Work out whether the dark theme is active"""
+    # Get the theme from session state or detect from Streamlit's options
+    if 'theme' in st.session_state:
+        # Use the user-selected theme from session state
+        return st.session_state.theme == 'dark'
+    
+    # Fallback to auto-detection
+    try:
+        base_theme = st.get_option("theme.base")
+        return base_theme == "dark"
+    except:
+        # Fallback to session state if Streamlit options aren't available
+        return st.session_state.get('theme', 'light') == 'dark'
 
 def get_theme_colors():
     """
     Returns the current theme's color palette.
     This function can be used to access theme colors in other parts of the app.
     """
-    # Get the theme from session state or detect from Streamlit's options
-    if 'theme' in st.session_state:
-        # Use the user-selected theme from session state
-        is_dark_theme = st.session_state.theme == 'dark'
-    else:
-        # Fallback to auto-detection
-        try:
-            base_theme = st.get_option("theme.base")
-            is_dark_theme = base_theme == "dark"
-        except:
-            # Fallback to session state if Streamlit options aren't available
-            is_dark_theme = st.session_state.get('theme', 'light') == 'dark'
-    
+    return dict(_palette(_detect_dark_theme()))
+
+@lru_cache(maxsize=None)
+def _palette(is_dark_theme):
+    """Build the color palette for a theme (cached, treat as read-only)"""
     # Base palette colors
     primary_color = "#549aff"        # Logo blue
     accent_color = "#6f7bf7"         # Soft indigo
@@ -108,33 +128,9 @@ def get_theme_colors():
         "form_accent_color": form_accent_color
     }
 
-def apply_theme_aware_styles():
-    """
-    Apply consistent styling that works well with Streamlit's theme system in both light and dark modes.
-    Returns whether dark mode is active.
-    """
-    # Get the theme from session state or detect from Streamlit's options
-    if 'theme' in st.session_state:
-        # Use the user-selected theme from session state
-        is_dark_theme = st.session_state.theme == 'dark'
-    else:
-        # Fallback to auto-detection
-        try:
-            base_theme = st.get_option("theme.base")
-            is_dark_theme = base_theme == "dark"
-        except:
-            # Fallback to session state if Streamlit options aren't available
-            is_dark_theme = st.session_state.get('theme', 'light') == 'dark'
-    
-    # Store theme in session state for consistent use across the app
-    st.session_state.theme = "dark" if is_dark_theme else "light"
-    
-    # Get all theme colors
-    colors = get_theme_colors()
-    
-    # Apply consistent styling for both themes
-    st.markdown(f"""
-    <style>
+def _base_css(colors):
+    """Return the app-wide CSS for a palette"""
+    return f"""
     /* Base typography and spacing */
     html, body, [data-testid="stAppViewContainer"] {{
         font-family: "Segoe UI", -apple-system, BlinkMacSystemFont, sans-serif;
@@ -461,17 +457,90 @@ def apply_theme_aware_styles():
     div[role="progressbar"] > div:nth-child(2) {{
         background-color: {colors["primary_color"]};
     }}
-    </style>
-    """, unsafe_allow_html=True)
+    """
+
+def _static_serving_enabled():
+    """Check whether Streamlit serves files from the static folder"""
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+@lru_cache(maxsize=None)
+def build_stylesheet(is_dark_theme, page_css=None, args=()):
+    """
+    Build a stylesheet once per (theme, page styles) and return it with its content hash.
+    page_css is a function taking the color palette (plus any args) and returning CSS.
+    """
+    colors = _palette(is_dark_theme)
+    css = _base_css(colors) if page_css is None else page_css(colors, *args)
+    digest = hashlib.sha1(css.encode("utf-8")).hexdigest()[:12]
+    return css, digest
+
+@lru_cache(maxsize=None)
+def _stylesheet_tag(is_dark_theme, page_css=None, args=(), use_static=True):
+    """Return the markup that loads a stylesheet, writing the hashed file on first use"""
+    css, digest = build_stylesheet(is_dark_theme, page_css, args)
+    
+    if use_static:
+        filename = f"theme-{digest}.css"
+        path = STYLESHEET_DIR / filename
+        try:
+            if not path.exists():
+                STYLESHEET_DIR.mkdir(parents=True, exist_ok=True)
+                # Write to a temp file first so a half-written stylesheet is never served
+                tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+                tmp_path.write_text(css, encoding="utf-8")
+                os.replace(tmp_path, path)
+            return f'<link rel="stylesheet" href="{STYLESHEET_URL}/{filename}">'
+        except OSError as e:
+            logger.warning("Could not write stylesheet %s, inlining it instead: %s", filename, e)
+    
+    return f"<style>{css}</style>"
+
+def apply_page_styles(page_css, *args):
+    """
+    Load a page-specific stylesheet built by page_css(colors, *args).
+    The CSS is generated once per theme and arguments; reruns only send a link tag.
+    """
+    is_dark_theme = _detect_dark_theme()
+    st.markdown(
+        _stylesheet_tag(is_dark_theme, page_css, args, _static_serving_enabled()),
+        unsafe_allow_html=True
+    )
+
+def apply_theme_aware_styles(page_css=None):
+    """
+    Apply consistent styling that works well with Streamlit's theme system in both light and dark modes.
+    Pass page_css to also load that page's stylesheet. Returns whether dark mode is active.
+    """
+    is_dark_theme = _detect_dark_theme()
     
-    return is_dark_theme 
+    # Store theme in session state for consistent use across the app
+    st.session_state.theme = "dark" if is_dark_theme else "light"
+    
+    # The stylesheets are built once and cached, so each rerun only sends short link tags
+    use_static = _static_serving_enabled()
+    markup = _stylesheet_tag(is_dark_theme, None, (), use_static)
+    if page_css is not None:
+        markup += _stylesheet_tag(is_dark_theme, page_css, (), use_static)
+    st.markdown(markup, unsafe_allow_html=True)
+    
+    return is_dark_theme
 
-def get_component_styles():
+def get_component_styles(is_dark_theme=None):
     """
     Returns a dictionary of common component styles that can be reused across the app.
     These styles are based on the current theme colors.
     """
-    colors = get_theme_colors()
+    if is_dark_theme is None:
+        is_dark_theme = _detect_dark_theme()
+    return _component_styles(is_dark_theme)
+
+@lru_cache(maxsize=None)
+def _component_styles(is_dark_theme):
+    """Build the component styles for a theme once"""
+    colors = _palette(is_dark_theme)
     
     # Define reusable component styles
     return {
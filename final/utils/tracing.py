@@ -0,0 +1,226 @@
+"""
+Span tracing for reruns and background work.
+
+app.py starts a trace for every rerun. The email sender starts one per
+batch and the AI job workers one per job. Inside a trace, span() and
+add_span() record nested timings. Database statements (from TimedCursor),
+AI provider calls, SMTP and image encoding add spans this way. Outside a
+trace they do nothing.
+
+Finished traces are kept in a ring buffer of TRACE_BUFFER_SIZE for the debug
+panel (get_slowest_traces). If TRACE_FILE is set, they are also appended to
+it by a background thread as OTLP/JSON lines, one trace per line. The
+OpenTelemetry collector's otlpjsonfile receiver reads that format, and any
+JSON tool can read it offline.
+
+TRACE_SAMPLE_RATE (default 1) is the fraction of traces recorded; 0 turns
+tracing off.
+"""
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+TRACE_FILE = os.getenv("TRACE_FILE")
+TRACE_PANEL = os.getenv("TRACE_PANEL") == "1"
+
+# A runaway loop of queries shouldn't hold unbounded spans in memory
+MAX_SPANS_PER_TRACE = 1000
+EXPORT_QUEUE_SIZE = 1000
+
+SERVICE_NAME = "zenflow"
+
+_current_span = contextvars.ContextVar("zenflow_current_span", default=None)
+_traces = deque(maxlen=TRACE_BUFFER_SIZE)
+_traces_lock = threading.Lock()
+_export_queue = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+_exporter = None
+_exporter_lock = threading.Lock()
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "end", "attributes", "error")
+
+    def __init__(self, trace, name, parent_id, start, attributes):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.start = start
+        self.end = None
+        self.attributes = attributes
+        self.error = None
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+class Trace:
+    """A tree of spans; times are perf_counter seconds, anchored to wall time once"""
+
+    __slots__ = ("trace_id", "root", "spans", "dropped_spans", "wall_start_ns", "perf_start")
+
+    def __init__(self, name, attributes):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.wall_start_ns = time.time_ns()
+        self.perf_start = time.perf_counter()
+        self.root = Span(self, name, None, self.perf_start, attributes)
+        self.spans = [self.root]
+        self.dropped_spans = 0
+
+    @property
+    def name(self):
+        return self.root.name
+
+    @property
+    def duration(self):
+        return self.root.duration
+
+    def _add(self, span):
+        if len(self.spans) < MAX_SPANS_PER_TRACE:
+            self.spans.append(span)
+        else:
+            self.dropped_spans += 1
+
+    def unix_nanos(self, perf_seconds):
+        return self.wall_start_ns + int((perf_seconds - self.perf_start) * 1e9)
+
+def current_span():
+    """The innermost open span in this thread, or None outside a trace"""
+    return _current_span.get()
+
+@contextmanager
+def start_trace(name, **attributes):
+    """Trace the enclosed block as a root span; inside an existing trace this is just a span"""
+    if _current_span.get() is not None:
+        with span(name, **attributes) as inner:
+            yield inner
+        return
+    if TRACE_SAMPLE_RATE <= 0 or (TRACE_SAMPLE_RATE < 1 and random.random() >= TRACE_SAMPLE_RATE):
+        yield None
+        return
+
+    trace = Trace(name, attributes)
+    token = _current_span.set(trace.root)
+    try:
+        yield trace.root
+    except Exception as e:
+        trace.root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        trace.root.end = time.perf_counter()
+        _current_span.reset(token)
+        _finish(trace)
+
+@contextmanager
+def span(name, **attributes):
+    """Time the enclosed block as a child of the current span"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, time.perf_counter(), attributes)
+    parent.trace._add(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+def add_span(name, start, end, error=None, **attributes):
+    """Record an already finished child span from perf_counter() start and end times"""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    child = Span(parent.trace, name, parent.span_id, start, attributes)
+    child.end = end
+    child.error = error
+    parent.trace._add(child)
+    return child
+
+def _finish(trace):
+    with _traces_lock:
+        _traces.append(trace)
+    if TRACE_FILE:
+        _start_exporter()
+        try:
+            _export_queue.put_nowait(trace)
+        except queue.Full:
+            # Losing a trace beats blocking a rerun on disk
+            pass
+
+def get_recent_traces():
+    with _traces_lock:
+        return list(_traces)
+
+def get_slowest_traces(limit=10):
+    """The slowest traces still in the ring buffer, slowest first"""
+    return sorted(get_recent_traces(), key=lambda trace: trace.duration, reverse=True)[:limit]
+
+def clear_traces():
+    with _traces_lock:
+        _traces.clear()
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def to_otlp(trace):
+    """Return the trace as an OTLP/JSON ExportTraceServiceRequest"""
+    spans = []
+    for s in trace.spans:
+        entry = {
+            "traceId": trace.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 1,
+            "startTimeUnixNano": str(trace.unix_nanos(s.start)),
+            "endTimeUnixNano": str(trace.unix_nanos(s.end if s.end is not None else s.start)),
+            "attributes": [{"key": key, "value": _otlp_value(value)}
+                           for key, value in s.attributes.items() if value is not None],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        }
+        if s.parent_id:
+            entry["parentSpanId"] = s.parent_id
+        spans.append(entry)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "zenflow.tracing"}, "spans": spans}],
+    }]}
+
+def _export_loop():
+    while True:
+        trace = _export_queue.get()
+        try:
+            with open(TRACE_FILE, "a") as f:
+                f.write(json.dumps(to_otlp(trace)) + "\n")
+        except OSError as e:
+            logger.error("Could not write trace: %s", e, extra={"path": TRACE_FILE})
+
+def _start_exporter():
+    global _exporter
+    if _exporter is not None:
+        return
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = threading.Thread(target=_export_loop, name="trace-exporter", daemon=True)
+            _exporter.start()
@@ -1,24 +1,26 @@
 import streamlit as st
 from datetime import datetime
-from utils.ai import initialize_gemini, get_ai_assistant_response
+from utils.ai import (
+    initialize_gemini,
+    stream_ai_assistant_response,
+    new_chat_history,
+    restore_chat_history,
+    build_chat_history,
+    record_chat_turn,
+    HISTORY_KEEP_TURNS,
+    SUMMARY_BATCH_TURNS
+)
+from models.conversation import Conversation
 from utils.theme import apply_theme_aware_styles
 
-def show_assistant():
-    """
-    Display the AI Assistant page
-    """
-    # Add warning banner at the top
-    st.warning("""
-        🚧 **Work in Progress**
-        
-        The AI Assistant feature is currently under development. We're working on enhancing its capabilities, adding more productivity-focused features, and improving response quality. Stay tuned for updates!
-    """)
-    
-    # Apply theme-aware styling
-    is_dark_theme = apply_theme_aware_styles()
-    
+# Messages kept in session state; older ones are loaded from the database on request
+RECENT_MESSAGE_WINDOW = 20
+OLDER_MESSAGES_PAGE_SIZE = 20
+
+def assistant_page_css(colors):
+    """Assistant page CSS, built once per theme"""
     # Define theme-specific colors
-    if is_dark_theme:
+    if colors["is_dark_theme"]:
         primary_color = "#4F8BF9"
         secondary_color = "#1E1E1E"
         text_color = "#FFFFFF"
@@ -39,9 +41,7 @@ def show_assistant():
         suggestion_bg = "#F6F6F6"
         suggestion_hover = "#EAEAEA"
     
-    # Custom styling for the assistant page
-    st.markdown(f"""
-    <style>
+    return f"""
         /* Chat Messages Styling */
         .stChatMessage [data-testid="stChatMessageContent"] {{
             border-radius: 15px;
@@ -108,8 +108,109 @@ def show_assistant():
             padding-bottom: 5px;
             border-bottom: 1px solid {border_color};
         }}
-    </style>
-    """, unsafe_allow_html=True)
+    """
+
+def load_conversation():
+    """Resume the user's latest conversation with only its recent messages in session state"""
+    user_id = st.session_state.user_id
+    conversation = Conversation.get_latest(user_id)
+    
+    if conversation:
+        messages, has_older = Conversation.get_messages(conversation["id"], user_id, limit=RECENT_MESSAGE_WINDOW)
+        # Everything after the summary, at most a full verbatim window plus a pending batch
+        recent = Conversation.get_unsummarized_messages(
+            conversation["id"], user_id, limit=2 * (HISTORY_KEEP_TURNS + SUMMARY_BATCH_TURNS)
+        )
+        st.session_state.assistant_conversation_id = conversation["id"]
+        st.session_state.assistant_messages = messages
+        st.session_state.assistant_has_older = has_older
+        st.session_state.chat_history = restore_chat_history(conversation["summary"], recent)
+    else:
+        reset_conversation()
+
+def reset_conversation():
+    """Start with an empty conversation; it is created in the database on the first reply"""
+    st.session_state.assistant_conversation_id = None
+    st.session_state.assistant_messages = []
+    st.session_state.assistant_has_older = False
+    st.session_state.chat_history = new_chat_history()
+
+def load_older_messages():
+    """Prepend the previous page of messages from the database"""
+    loaded = [message for message in st.session_state.assistant_messages if message.get("id")]
+    if not loaded:
+        return
+    older, has_older = Conversation.get_messages(
+        st.session_state.assistant_conversation_id,
+        st.session_state.user_id,
+        before_id=loaded[0]["id"],
+        limit=OLDER_MESSAGES_PAGE_SIZE
+    )
+    st.session_state.assistant_messages = older + st.session_state.assistant_messages
+    st.session_state.assistant_has_older = has_older
+
+def save_turn(prompt, user_message, reply_message):
+    """Append a finished turn to the stored conversation and keep its summary in step"""
+    user_id = st.session_state.user_id
+    if st.session_state.assistant_conversation_id is None:
+        st.session_state.assistant_conversation_id = Conversation.create(user_id, title=prompt[:80])
+    conversation_id = st.session_state.assistant_conversation_id
+    if conversation_id is None:
+        return
+    
+    message_ids = Conversation.append_turn(conversation_id, user_id, prompt, reply_message["content"])
+    if message_ids:
+        user_message["id"], reply_message["id"] = message_ids
+    
+    # Keep the history sent with the next prompt within its token budget
+    history = st.session_state.chat_history
+    summary_before = history["summary"]
+    record_chat_turn(history, prompt, reply_message["content"])
+    if history["summary"] != summary_before:
+        Conversation.save_summary(conversation_id, user_id, history["summary"], kept_messages=2 * len(history["turns"]))
+
+def stream_reply(prompt):
+    """Show the user's prompt and stream the assistant's reply into the chat"""
+    user_message = {"id": None, "role": "user", "content": prompt}
+    st.session_state.assistant_messages.append(user_message)
+    
+    # Display user message
+    with st.chat_message("user"):
+        st.markdown(prompt, unsafe_allow_html=True)
+    
+    # Render the reply as it arrives instead of waiting behind a spinner
+    result = {}
+    with st.chat_message("assistant"):
+        history = build_chat_history(st.session_state.chat_history)
+        st.write_stream(stream_ai_assistant_response(prompt, history, result))
+        
+        if result["error"]:
+            st.error(result["error"])
+            return False
+    
+    reply_message = {"id": None, "role": "assistant", "content": result["text"]}
+    st.session_state.assistant_messages.append(reply_message)
+    save_turn(prompt, user_message, reply_message)
+    
+    # Only the recent window stays in session state; older messages can be reloaded
+    if len(st.session_state.assistant_messages) > RECENT_MESSAGE_WINDOW:
+        del st.session_state.assistant_messages[:-RECENT_MESSAGE_WINDOW]
+        st.session_state.assistant_has_older = True
+    return True
+
+def show_assistant():
+    """
+    Display the AI Assistant page
+    """
+    # Add warning banner at the top
+    st.warning("""
+        🚧 **Work in Progress**
+        
+        The AI Assistant feature is currently under development. We're working on enhancing its capabilities, adding more productivity-focused features, and improving response quality. Stay tuned for updates!
+    """)
+    
+    # Apply theme-aware styling along with the cached assistant page stylesheet
+    apply_theme_aware_styles(assistant_page_css)
     
     # Display header
     st.markdown('<div class="header-assistant">ZenCoach Assistant</div>', unsafe_allow_html=True)
@@ -121,12 +222,9 @@ def show_assistant():
         st.error("Gemini API not available. Please check your .env file to ensure you have a valid Google AI API key.")
         return
     
-    # Initialize chat history in session state if not already present
-    if "assistant_messages" not in st.session_state:
-        st.session_state.assistant_messages = []
-    
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
+    # Resume the stored conversation the first time the page is opened this session
+    if "assistant_conversation_id" not in st.session_state:
+        load_conversation()
     
     # Function to set user input based on clicked suggestion
     def set_user_input(suggestion):
@@ -150,12 +248,19 @@ def show_assistant():
         How can I help you be more productive today?
         """
         
-        # Add the welcome message to the session state
+        # Add the welcome message to the session state (it isn't stored with the conversation)
         st.session_state.assistant_messages.append({
+            "id": None,
             "role": "assistant", 
             "content": welcome_message
         })
     
+    # Older messages stay in the database until asked for
+    if st.session_state.assistant_has_older:
+        if st.button("Load older messages", key="load_older_messages"):
+            load_older_messages()
+            st.rerun()
+    
     # Display all chat messages (including the welcome message if just added)
     for message in st.session_state.assistant_messages:
         with st.chat_message(message["role"]):
@@ -183,62 +288,15 @@ def show_assistant():
             col_index = i % 3
             
             if cols[col_index].button(suggestion, key=f"suggestion_{i}", use_container_width=True):
-                # This code runs when the suggestion button is clicked
-                # Set the question in the chat input
-                query = suggestion
-                
                 # Directly process the suggestion as if it was submitted
-                # Add user message to chat history
-                st.session_state.assistant_messages.append({"role": "user", "content": query})
-                
-                # Get AI response with spinner
-                with st.spinner("Thinking..."):
-                    response_text, chat_history, error = get_ai_assistant_response(
-                        query,
-                        st.session_state.chat_history
-                    )
-                    
-                    if error:
-                        st.error(error)
-                    else:
-                        # Store the updated chat history
-                        if chat_history:
-                            st.session_state.chat_history = chat_history
-                        
-                        # Add the response to the session state
-                        st.session_state.assistant_messages.append({"role": "assistant", "content": response_text})
-                
-                # Rerun to update the UI with the new messages
-                st.rerun()
+                if stream_reply(suggestion):
+                    # Rerun to hide the suggestions now the conversation has started
+                    st.rerun()
     
     # Chat input
     if prompt := st.chat_input("Ask about productivity or time management...", key="user_input"):
-        # Add user message to chat history
-        st.session_state.assistant_messages.append({"role": "user", "content": prompt})
-        
-        # Display user message
-        with st.chat_message("user"):
-            st.markdown(prompt, unsafe_allow_html=True)
-        
-        # Get AI response with spinner to indicate loading
-        with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                response_text, chat_history, error = get_ai_assistant_response(
-                    prompt,
-                    st.session_state.chat_history
-                )
-                
-                if error:
-                    st.error(error)
-                    return
-                
-                # Store the updated chat history
-                if chat_history:
-                    st.session_state.chat_history = chat_history
-                
-                # Display and save the response
-                st.markdown(response_text, unsafe_allow_html=True)
-                st.session_state.assistant_messages.append({"role": "assistant", "content": response_text})
+        if not stream_reply(prompt):
+            return
     
     # Add sidebar options
     st.sidebar.markdown("<div class='sidebar-header'>Assistant Options</div>", unsafe_allow_html=True)
@@ -248,8 +306,9 @@ def show_assistant():
     if clear_chat:
         confirm_clear = st.sidebar.checkbox("Confirm clearing chat history", key="confirm_clear")
         if confirm_clear:
-            st.session_state.assistant_messages = []
-            st.session_state.chat_history = []
+            if st.session_state.assistant_conversation_id:
+                Conversation.delete(st.session_state.assistant_conversation_id, st.session_state.user_id)
+            reset_conversation()
             st.rerun()
     
     # Add productivity tips in the sidebar
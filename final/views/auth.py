@@ -8,6 +8,10 @@ from utils.email_service import send_welcome_email, send_password_reminder_email
 import uuid
 from datetime import datetime, timedelta
 from utils.db import get_db_connection
+from utils.sessions import start_session, revoke_other_sessions
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 def validate_email(email):
     """Validate email format and perform additional checks"""
@@ -366,6 +370,7 @@ def show_auth_page():
             try:
                 st.image(logo_path, width=150)
             except Exception as e:
+                logger.warning("Error loading logo: %s", e)
                 st.error(f"Error loading logo: {str(e)}")
             st.markdown('</div>', unsafe_allow_html=True)
     
@@ -431,29 +436,35 @@ def show_auth_page():
                                         # Hash the temporary password
                                         temp_password_hash = hash_password(temp_password)
                                         
-                                        # Update user's password in database
+                                        # Update the password and queue its email in one transaction,
+                                        # so a user never gets a password that wasn't saved (or vice versa)
                                         conn = get_db_connection()
                                         with conn.cursor() as cursor:
                                             cursor.execute(
                                                 "UPDATE users SET password_hash = %s WHERE email = %s",
                                                 (temp_password_hash, reset_email)
                                             )
-                                            conn.commit()
-                                        
-                                        # Send email with temporary password
-                                        success, error = send_password_reminder_email(
-                                            reset_email,
-                                            user['first_name'],
-                                            temp_password
-                                        )
+                                            success, error = send_password_reminder_email(
+                                                reset_email,
+                                                user['first_name'],
+                                                temp_password,
+                                                cursor=cursor
+                                            )
+                                            if success:
+                                                conn.commit()
+                                            else:
+                                                conn.rollback()
                                         
                                         if success:
+                                            # The old password no longer works, so neither should its logins
+                                            revoke_other_sessions(user['id'])
                                             st.success("A temporary password has been sent to your email. Please check your inbox.")
                                             st.session_state.show_forgot_password = False
                                             st.rerun()
                                         else:
                                             st.error(f"Failed to send email: {error}")
                                     except Exception as e:
+                                        logger.exception("Error resetting password")
                                         st.error(f"An error occurred: {str(e)}")
                                         conn.rollback()
                                     finally:
@@ -509,6 +520,7 @@ def show_auth_page():
                                                         if user_id:
                                                             st.session_state.user_id = user_id
                                                             st.session_state.authenticated = True
+                                                            start_session(user_id)
                                                             st.session_state.current_page = "dashboard"
                                                             st.rerun()
                                                         else:
@@ -520,12 +532,13 @@ def show_auth_page():
                                 else:
                                     st.session_state.user_id = user_id
                                     st.session_state.authenticated = True
+                                    # Remember the login so a refresh doesn't ask for the password again
+                                    start_session(user_id)
                                     st.session_state.current_page = "dashboard"
                                     st.rerun()
                     except Exception as e:
+                        logger.exception("Error logging in")
                         st.error(f"An error occurred: {str(e)}")
-                        import traceback
-                        st.error(traceback.format_exc())
             
             # Return to landing page button
             if st.button("Back to Home", key="login_back", use_container_width=True):
@@ -595,13 +608,13 @@ def show_auth_page():
                                     # Log the user in directly after registration
                                     st.session_state.user_id = user_id
                                     st.session_state.authenticated = True
+                                    start_session(user_id)
                                     st.session_state.current_page = "dashboard"
                                     st.success("Registration successful! Welcome to ZenFlow.")
                                     st.rerun()
                 except Exception as e:
+                    logger.exception("Error during signup")
                     st.error(f"An error occurred during signup: {str(e)}")
-                    import traceback
-                    st.error(traceback.format_exc())
             
             # Return to landing page button
             if st.button("Back to Home", key="signup_back", use_container_width=True):
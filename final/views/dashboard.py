@@ -4,6 +4,10 @@ from datetime import datetime, timedelta
 from utils.db import get_task_statistics, get_upcoming_tasks, get_db_connection
 from utils.theme import apply_theme_aware_styles
 from utils.auth import verify_password, hash_password
+from utils.sessions import revoke_other_sessions, end_session
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 def format_date(date_str):
     """Format date string or timestamp to MM/DD/YYYY format"""
@@ -63,6 +67,8 @@ def show_change_password():
                             (new_password_hash, st.session_state.user_id)
                         )
                         conn.commit()
+                        # Sign out other browsers that still have the old password's session
+                        revoke_other_sessions(st.session_state.user_id)
                         st.success("Password updated successfully!")
                         
                         # Clear the form
@@ -72,6 +78,7 @@ def show_change_password():
                         st.error("Current password is incorrect")
                 
             except Exception as e:
+                logger.exception("Error changing password")
                 st.error(f"An error occurred: {str(e)}")
             finally:
                 if conn:
@@ -138,12 +145,17 @@ def show_delete_account():
                         st.success("Your account has been permanently deleted.")
                         
                         # Clear session and redirect to login
+                        end_session()
+                        cookie_update = st.session_state.session_cookie_update
                         st.session_state.clear()
+                        # Keep the queued cookie clear so the browser drops the deleted account's cookie
+                        st.session_state.session_cookie_update = cookie_update
                         st.rerun()
                     else:
                         st.error("Incorrect password")
                 
             except Exception as e:
+                logger.exception("Error deleting account")
                 conn.rollback()
                 st.error(f"An error occurred: {str(e)}")
             finally:
@@ -162,6 +174,7 @@ def show_dashboard():
         try:
             stats = get_task_statistics(st.session_state.user_id)
         except Exception as e:
+            logger.exception("Error loading task statistics")
             st.error("Unable to fetch task statistics. Please try refreshing the page.")
             stats = {
                 "total_tasks": 0,
@@ -231,6 +244,7 @@ def show_dashboard():
                     }
                 )
         except Exception as e:
+            logger.exception("Error loading upcoming tasks")
             st.error("Unable to fetch upcoming tasks. Please try refreshing the page.")
         
         # Add a button to navigate to tasks page
@@ -271,5 +285,6 @@ def show_dashboard():
                 st.markdown("---")
             
     except Exception as e:
+        logger.exception("Error loading dashboard")
         st.error("An error occurred while loading the dashboard. Please try refreshing the page.")
         st.write("If the problem persists, please contact support.")
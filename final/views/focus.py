@@ -1,32 +1,374 @@
 import streamlit as st
+import math
 import time
-import datetime
 from streamlit_extras.stylable_container import stylable_container
 from utils.db import (
     get_focus_stats, update_focus_stats, reset_focus_stats, get_tasks,
     get_task_id_by_name, update_task_focus_stats, get_task_focus_stats,
     get_timer_settings, update_timer_settings, get_focus_stats_by_list,
     get_unlinked_focus_stats, get_task_focus_stats_for_user,
-    save_focus_session, update_focus_flow_state, get_focus_flow_state
+    save_focus_session, transition_focus_flow_state, get_focus_flow_state
 )
-from utils.theme import apply_theme_aware_styles, get_theme_colors, get_component_styles
+from utils.theme import apply_theme_aware_styles, apply_page_styles, get_theme_colors, get_component_styles
 
 def format_time(seconds):
     """Format seconds into MM:SS display format"""
     minutes, seconds = divmod(seconds, 60)
     return f"{minutes:02d}:{seconds:02d}"
 
+# A timer left running, paused or awaiting a choice this long is not resumed
+STALE_FLOW_SECONDS = 2 * 60 * 60
+# How often a page re-reads the stored timer; in between it counts down on its own
+FLOW_REFRESH_SECONDS = 5
+
+def mode_duration(mode):
+    """Length in seconds of a session of the given mode, from the timer settings"""
+    if mode == 'pomodoro':
+        return st.session_state.pomodoro_duration * 60
+    elif mode == 'short_break':
+        return st.session_state.short_break_duration * 60
+    return st.session_state.long_break_duration * 60
+
+def load_timer_state(refresh=False):
+    """
+    Mirror the stored focus timer into session state for this rerun.
+    focus_flow_state is the timer; these keys are only a copy to render from,
+    so a session can move to another worker or survive a restart. Reruns of
+    a running timer reuse the row for FLOW_REFRESH_SECONDS and count down
+    from the seconds the database reported, using this process's monotonic
+    clock; any other rerun, or one after a transition, reads it again.
+    """
+    now = time.monotonic()
+    ticking = st.session_state.pop('focus_ticking', False)
+    cached = st.session_state.get('focus_flow')
+    if (refresh or not ticking or cached is None or cached['user_id'] != st.session_state.user_id
+            or now - cached['read_at'] >= FLOW_REFRESH_SECONDS):
+        cached = {
+            'user_id': st.session_state.user_id,
+            'read_at': now,
+            'row': dict(get_focus_flow_state(st.session_state.user_id)),
+        }
+        st.session_state.focus_flow = cached
+    flow = cached['row']
+    
+    mode = flow['current_mode'] or 'pomodoro'
+    running = flow['ends_at'] is not None
+    paused = running and flow['paused_at'] is not None
+    remaining = flow['remaining_seconds']
+    if remaining is None:
+        remaining = mode_duration(mode)
+    elif running and not paused:
+        remaining = max(0, math.ceil(remaining - (now - cached['read_at'])))
+    st.session_state.focus_version = flow['version']
+    st.session_state.timer_mode = mode
+    st.session_state.focus_flow_state = flow['flow_state']
+    st.session_state.timer_running = running
+    st.session_state.timer_paused = paused
+    st.session_state.time_remaining = remaining
+    st.session_state.timer_duration = flow['duration_seconds'] or mode_duration(mode)
+    st.session_state.linked_task_id = flow['current_task_id']
+    st.session_state.linked_task = flow['task_name'] if flow['current_task_id'] else None
+    st.session_state.awaiting_user_action = flow['flow_state'] == 'completed'
+    st.session_state.completed_mode = 'pomodoro' if mode == 'pomodoro' else 'break'
+    return flow
+
+def change_timer(action, **params):
+    """Apply a transition to the stored timer; False if another tab or worker changed it first"""
+    version = transition_focus_flow_state(
+        st.session_state.user_id, st.session_state.focus_version, action, **params
+    )
+    # Either way the mirrored row is out of date now
+    st.session_state.pop('focus_flow', None)
+    if version is None:
+        st.toast("The timer was changed in another window.", icon="🔄")
+        return False
+    st.session_state.focus_version = version
+    return True
+
+def reset_timer(mode):
+    """Stop any session and show a full one of the given mode"""
+    return change_timer("ready", mode=mode, task_id=st.session_state.linked_task_id, duration=mode_duration(mode))
+
+def start_timer(mode, duration=None):
+    """Run a session of the given mode, for its length in the timer settings unless duration is given"""
+    if duration is None:
+        duration = mode_duration(mode)
+    return change_timer(
+        "start",
+        flow_state='focusing' if mode == 'pomodoro' else 'break',
+        mode=mode,
+        task_id=st.session_state.linked_task_id,
+        duration=duration,
+        remaining=duration
+    )
+
+def focus_page_css(colors):
+    """Static CSS for the Focus page, built once per theme"""
+    return f"""
+    .main-focus-container {{
+        display: flex;
+        flex-direction: column;
+        width: 100%;
+        max-width: 1200px;
+        margin: 0 auto;
+    }}
+    .info-cards-container {{
+        display: flex;
+        width: 100%;
+        gap: 20px;
+    }}
+    .info-card {{
+        flex: 1;
+        min-width: 0;
+    }}
+    div[data-testid="stExpander"] {{
+        width: 100%;
+    }}
+    div[data-testid="stExpander"] > div {{
+        width: 100%;
+    }}
+    .settings-label {{
+        color: {colors['primary_color']};
+        font-weight: 600;
+    }}
+    .benefits-heading {{
+        color: #549aff;
+        margin-bottom: 10px;
+    }}
+    
+    .mode-selector {{
+        display: flex;
+        justify-content: center;
+        gap: 10px;
+        margin-bottom: 20px;
+    }}
+    .mode-button {{
+        padding: 8px 16px;
+        border-radius: 30px;
+        cursor: pointer;
+        font-weight: 500;
+        font-size: 14px;
+        transition: all 0.2s ease;
+        text-align: center;
+        min-width: 120px;
+    }}
+    .mode-button.active {{
+        color: white;
+        transform: scale(1.05);
+    }}
+    .mode-button:hover {{
+        transform: translateY(-2px);
+    }}
+    
+    /* Linked task panel */
+    .task-info-label {{
+        margin-bottom: 5px;
+    }}
+    .task-info-name {{
+        font-size: 1.1rem;
+        font-weight: 500;
+        color: {colors['primary_color']};
+    }}
+    .task-info-note {{
+        margin-top: 5px;
+        font-size: 0.9rem;
+        color: {colors['text_color']}80;
+    }}
+    .task-info-note.spaced {{
+        margin-top: 0;
+        margin-bottom: 10px;
+    }}
+    .task-info-label.spaced {{
+        margin-bottom: 10px;
+    }}
+    .spaced-block {{
+        margin: 20px 0;
+    }}
+    
+    .timer-display {{
+        font-size: 8rem;
+        font-weight: 700;
+        font-family: 'Roboto Mono', monospace;
+        margin: 30px 0;
+        padding: 20px;
+        text-align: center;
+    }}
+    
+    /* Center all buttons in the timer container */
+    .main-controls-container {{
+        display: flex;
+        justify-content: center;
+        gap: 20px;
+        margin: 20px auto;
+    }}
+    .centered-flex {{
+        display: flex;
+        justify-content: center;
+    }}
+    
+    /* Style for all control buttons */
+    .control-button button {{
+        width: 60px !important;
+        height: 60px !important;
+        border-radius: 50% !important;
+        display: flex !important;
+        align-items: center !important;
+        justify-content: center !important;
+        font-size: 24px !important;
+        padding: 0 !important;
+        margin: 0 auto !important;
+    }}
+    
+    /* Fix the issue with the column divs */
+    [data-testid="column"] {{
+        display: flex !important;
+        justify-content: center !important;
+        align-items: center !important;
+    }}
+    
+    /* Ensure buttons are centered inside their containers */
+    [data-testid="stButton"] {{
+        display: flex !important;
+        justify-content: center !important;
+        margin: 0 auto !important;
+    }}
+    
+    /* Make the actual button elements centered */
+    [data-testid="stButton"] > button {{
+        margin: 0 auto !important;
+        display: block !important;
+    }}
+    
+    /* Transition prompt styling */
+    .transition-prompt {{
+        background-color: rgba(255, 255, 255, 0.1);
+        border-radius: 10px;
+        padding: 20px;
+        margin: 20px 0;
+        text-align: center;
+        border: 1px solid rgba(255, 255, 255, 0.2);
+    }}
+    .transition-prompt h3 {{
+        margin-bottom: 15px;
+    }}
+    .action-button {{
+        margin: 0 10px;
+    }}
+    
+    /* Statistics */
+    .stats-header {{
+        color: #00BFFF;
+        font-size: 1.9rem;
+        font-weight: 700;
+        margin: 1.5rem 0;
+        padding: 0.5rem;
+        text-align: center;
+    }}
+    .stats-tile {{
+        text-align: center;
+        padding: 20px;
+        border-radius: 10px;
+        background-color: {colors['primary_color']};
+        box-shadow: 0 8px 16px rgba(0,0,0,0.15);
+    }}
+    .stats-tile h3 {{
+        font-size: 2.2rem;
+        color: white;
+        font-weight: 700;
+    }}
+    .stats-tile p {{
+        margin-top: 5px;
+        color: white;
+        font-weight: 500;
+    }}
+    .analytics-heading {{
+        color: {colors['primary_color']};
+        font-size: 1.4rem;
+        font-weight: 600;
+        margin: 1rem 0;
+    }}
+    .analytics-subheading {{
+        color: {colors['text_color']};
+        font-size: 1.1rem;
+        font-weight: 600;
+        margin: 1rem 0;
+    }}
+    .analytics-note {{
+        margin-top: 20px;
+    }}
+    .analytics-note p {{
+        font-size: 1.1rem;
+        color: {colors['text_color']};
+    }}
+    
+    /* Running session status */
+    .session-status {{
+        text-align: center;
+    }}
+    .session-status-title {{
+        font-size: 1.1rem;
+        font-weight: 500;
+    }}
+    .session-status-title.with-detail {{
+        margin-bottom: 5px;
+    }}
+    .session-status-title .focus {{
+        color: {colors['primary_color']};
+    }}
+    .session-status-title .break {{
+        color: {colors['accent_color']};
+    }}
+    .session-status-detail {{
+        font-size: 0.9rem;
+    }}
+    
+    /* Session complete prompt */
+    .highlight-text {{
+        color: #00BFFF;
+    }}
+    .centered-text {{
+        text-align: center;
+    }}
+    """
+
+def focus_mode_buttons_css(colors, timer_mode):
+    """Highlight the active timer mode button"""
+    rules = []
+    for position, mode in enumerate(["pomodoro", "short_break", "long_break"], 1):
+        if mode == timer_mode:
+            mode_style = f"background-color: {colors['primary_color']}; color: white;"
+        else:
+            mode_style = f"background-color: white; color: {colors['text_color']}; border: 1px solid {colors['border_color']};"
+        rules.append(f"""
+    div[data-testid="stButton"]:nth-of-type({position}) button {{
+        {mode_style}
+        border-radius: 30px;
+        font-weight: 500;
+    }}""")
+    return "".join(rules)
+
+def focus_controls_css(colors):
+    """Round start, pause and reset buttons"""
+    styles = get_component_styles(colors["is_dark_theme"])
+    return f"""
+    div[data-testid="stButton"]:nth-of-type(4) button {{
+        {styles["control_button"]}
+    }}
+    div[data-testid="stButton"]:nth-of-type(5) button {{
+        {styles["pause_button"]}
+    }}
+    div[data-testid="stButton"]:nth-of-type(6) button {{
+        {styles["reset_button"]}
+    }}
+    """
+
 def show_focus():
     """Display the modernized Focus page with Pomodoro timer"""
     # Apply theme-aware styling
-    is_dark_theme = apply_theme_aware_styles()
+    is_dark_theme = apply_theme_aware_styles(focus_page_css)
     colors = get_theme_colors()
     styles = get_component_styles()  # Get reusable component styles
     
-    # Initialize session state variables if they don't exist
-    if 'timer_mode' not in st.session_state:
-        st.session_state.timer_mode = 'pomodoro'  # 'pomodoro', 'short_break', or 'long_break'
-    
     # Load timer settings from database if user is logged in
     if ('timer_settings_loaded' not in st.session_state) and hasattr(st.session_state, 'user_id') and st.session_state.user_id:
         # Get timer settings from database
@@ -50,27 +392,11 @@ def show_focus():
         if 'long_break_duration' not in st.session_state:
             st.session_state.long_break_duration = 15  # minutes
     
-    if 'timer_running' not in st.session_state:
-        st.session_state.timer_running = False
-        
-    if 'timer_paused' not in st.session_state:
-        st.session_state.timer_paused = False
-    
-    if 'time_remaining' not in st.session_state:
-        st.session_state.time_remaining = st.session_state.pomodoro_duration * 60  # seconds
-    
-    if 'last_update_time' not in st.session_state:
-        st.session_state.last_update_time = None
-        
-    if 'target_end_time' not in st.session_state:
-        st.session_state.target_end_time = None
-    
-    # Enhanced task linking variables
-    if 'linked_task' not in st.session_state:
-        st.session_state.linked_task = None
-        
-    if 'linked_task_id' not in st.session_state:
-        st.session_state.linked_task_id = None
+    # Timer state, linked task and flow state come from the database on every rerun
+    flow = load_timer_state()
+    if flow['flow_state'] != 'ready' and flow['idle_seconds'] is not None and flow['idle_seconds'] > STALE_FLOW_SECONDS:
+        reset_timer('pomodoro')
+        flow = load_timer_state()
     
     # Flag to track if task was just linked from Tasks page
     if 'task_just_linked' not in st.session_state:
@@ -80,10 +406,6 @@ def show_focus():
     if 'task_explicitly_unlinked' not in st.session_state:
         st.session_state.task_explicitly_unlinked = False
     
-    # Track focus flow state
-    if 'focus_flow_state' not in st.session_state:
-        st.session_state.focus_flow_state = 'ready'  # 'ready', 'focusing', 'break', 'completed'
-    
     # Define user-specific session state keys
     user_prefix = f"user_{st.session_state.user_id}_" if hasattr(st.session_state, 'user_id') and st.session_state.user_id else "anonymous_"
     
@@ -112,46 +434,6 @@ def show_focus():
             st.session_state[f'{user_prefix}total_focus_time'] = saved_stats["total_focus_time"]
             st.session_state[f'{user_prefix}sessions_completed'] = saved_stats["pomodoros_completed"]
             st.session_state[f'{user_prefix}stats_loaded'] = True
-            
-            # Load the current focus flow state from the database
-            flow_state = get_focus_flow_state(st.session_state.user_id)
-            
-            # If there's an active state in the database, restore it
-            if flow_state and flow_state['flow_state'] != 'ready' and flow_state['last_updated']:
-                # Only restore if it's recent (within the last 2 hours)
-                last_updated = flow_state['last_updated']
-                now = datetime.datetime.now()
-                if last_updated and (now - last_updated).total_seconds() < 7200:  # 2 hours
-                    # Restore task linkage
-                    if flow_state['current_task_id'] and flow_state['task_name']:
-                        st.session_state.linked_task_id = flow_state['current_task_id']
-                        st.session_state.linked_task = flow_state['task_name']
-                    
-                    # Restore timer state
-                    st.session_state.timer_mode = flow_state['current_mode']
-                    st.session_state.focus_flow_state = flow_state['flow_state']
-                    
-                    # Only restore time remaining if it's not null
-                    if flow_state['time_remaining_seconds']:
-                        st.session_state.time_remaining = flow_state['time_remaining_seconds']
-                    
-                    # If it was in progress, automatically resume
-                    if flow_state['flow_state'] in ['focusing', 'break']:
-                        st.session_state.timer_running = True
-                        st.session_state.timer_paused = False
-                        
-                        # Calculate new target end time
-                        current_time = time.time()
-                        st.session_state.last_update_time = current_time
-                        st.session_state.target_end_time = current_time + st.session_state.time_remaining
-                    
-                    # If it was in completed state, set awaiting_user_action
-                    elif flow_state['flow_state'] == 'completed':
-                        st.session_state.awaiting_user_action = True
-                        if flow_state['current_mode'] == 'pomodoro':
-                            st.session_state.completed_mode = 'pomodoro'
-                        else:
-                            st.session_state.completed_mode = 'break'
         else:
             # Set defaults if no user is logged in
             st.session_state[f'{user_prefix}total_focus_time'] = 0
@@ -163,26 +445,18 @@ def show_focus():
     
     # Check if we should auto-start a Pomodoro session from the tasks page
     if st.session_state.get('start_pomodoro', False):
-        # Set the timer mode to pomodoro
-        st.session_state.timer_mode = 'pomodoro'
+        task_id = st.session_state.get('focus_task_id')
+        if task_id is None and st.session_state.get('focus_task_name'):
+            task_id = get_task_id_by_name(st.session_state.user_id, st.session_state.focus_task_name)
         
-        # Set the time remaining to the pomodoro duration
-        st.session_state.time_remaining = st.session_state.pomodoro_duration * 60
-        
-        # Set the linked task
-        if 'focus_task_name' in st.session_state:
-            st.session_state.linked_task = st.session_state.focus_task_name
-            st.session_state.task_just_linked = True
-            
-        # Store the task ID directly if available
-        if 'focus_task_id' in st.session_state:
-            st.session_state.linked_task_id = st.session_state.focus_task_id
+        # A running session keeps going with the task; otherwise a fresh pomodoro waits for it
+        if st.session_state.timer_running:
+            changed = change_timer("link", task_id=task_id)
         else:
-            # If no task ID provided, try to find it
-            st.session_state.linked_task_id = None
-        
-        # Update focus flow state
-        st.session_state.focus_flow_state = 'ready'
+            changed = change_timer("ready", mode='pomodoro', task_id=task_id, duration=mode_duration('pomodoro'))
+        if changed and task_id is not None:
+            st.session_state.task_just_linked = True
+        load_timer_state()
         
         # Clear the flags to prevent auto-starting on page refresh
         st.session_state.start_pomodoro = False
@@ -199,19 +473,7 @@ def show_focus():
             st.error("Please finish or stop your current session before starting a new one.")
             return False
         
-        st.session_state.timer_mode = mode
-        # Set the appropriate duration based on the mode
-        if mode == 'pomodoro':
-            st.session_state.time_remaining = st.session_state.pomodoro_duration * 60
-        elif mode == 'short_break':
-            st.session_state.time_remaining = st.session_state.short_break_duration * 60
-        else:  # 'long_break'
-            st.session_state.time_remaining = st.session_state.long_break_duration * 60
-        
-        st.session_state.timer_running = False
-        st.session_state.timer_paused = False
-        st.session_state.target_end_time = None
-        return True
+        return reset_timer(mode)
     
     # Function to update timer when slider values change
     def update_pomodoro_time():
@@ -229,28 +491,7 @@ def show_focus():
             # We'll now only track that something changed, not update the timer yet
             st.session_state.settings_changed = True
     
-    # Page layout - changed to full width since settings moved to sidebar
-    st.markdown(f"""
-    <style>
-    .main-focus-container {{
-        display: flex;
-        flex-direction: column;
-        width: 100%;
-        max-width: 1200px;
-        margin: 0 auto;
-    }}
-    .info-cards-container {{
-        display: flex;
-        width: 100%;
-        gap: 20px;
-    }}
-    .info-card {{
-        flex: 1;
-        min-width: 0;
-    }}
-    </style>
-    """, unsafe_allow_html=True)
-    
+    # Page layout styles live in focus_page_css
     # Main container div
     st.markdown('<div class="main-focus-container">', unsafe_allow_html=True)
     
@@ -260,16 +501,6 @@ def show_focus():
     # Timer Settings Card
     st.markdown('<div class="info-card">', unsafe_allow_html=True)
     with st.expander("⚙️ Timer Settings", expanded=False):
-        st.markdown("""
-        <style>
-        div[data-testid="stExpander"] {
-            width: 100%;
-        }
-        div[data-testid="stExpander"] > div {
-            width: 100%;
-        }
-        </style>
-        """, unsafe_allow_html=True)
         # 5. Settings
         # Check if we should reset to defaults
         use_default_values = False
@@ -279,7 +510,7 @@ def show_focus():
             st.session_state.reset_to_defaults = False
         
         # Pomodoro Duration
-        st.markdown(f"<p style='color: {colors['primary_color']}; font-weight: 600;'><strong>Pomodoro Duration (min)</strong></p>", unsafe_allow_html=True)
+        st.markdown("<p class='settings-label'><strong>Pomodoro Duration (min)</strong></p>", unsafe_allow_html=True)
         pomodoro_duration = st.slider(
             "Pomodoro Duration",
             min_value=5,
@@ -293,7 +524,7 @@ def show_focus():
         )
         
         # Short Break Duration
-        st.markdown(f"<p style='color: {colors['primary_color']}; font-weight: 600;'><strong>Short Break Duration (min)</strong></p>", unsafe_allow_html=True)
+        st.markdown("<p class='settings-label'><strong>Short Break Duration (min)</strong></p>", unsafe_allow_html=True)
         short_break_duration = st.slider(
             "Short Break Duration",
             min_value=5,
@@ -307,7 +538,7 @@ def show_focus():
         )
         
         # Long Break Duration
-        st.markdown(f"<p style='color: {colors['primary_color']}; font-weight: 600;'><strong>Long Break Duration (min)</strong></p>", unsafe_allow_html=True)
+        st.markdown("<p class='settings-label'><strong>Long Break Duration (min)</strong></p>", unsafe_allow_html=True)
         long_break_duration = st.slider(
             "Long Break Duration",
             min_value=15,
@@ -341,6 +572,8 @@ def show_focus():
                 if settings_changed:
                     save_btn = st.button("Save Settings", disabled=save_disabled, key="save_settings", type="primary", use_container_width=True)
                     if save_btn:
+                        elapsed_seconds = st.session_state.timer_duration - st.session_state.time_remaining
+                        
                         # Update session state with new values
                         st.session_state.pomodoro_duration = pomodoro_duration
                         st.session_state.short_break_duration = short_break_duration
@@ -363,28 +596,10 @@ def show_focus():
                             # Simply reset the timer mode
                             set_timer_mode(st.session_state.timer_mode)
                         else:
-                            # Timer is running, update time remaining based on new duration
-                            if st.session_state.timer_mode == 'pomodoro':
-                                new_duration_seconds = pomodoro_duration * 60
-                                elapsed_seconds = (st.session_state.pomodoro_duration * 60) - st.session_state.time_remaining
-                                if elapsed_seconds < new_duration_seconds:
-                                    st.session_state.time_remaining = new_duration_seconds - elapsed_seconds
-                                    if st.session_state.target_end_time is not None:
-                                        st.session_state.target_end_time = time.time() + st.session_state.time_remaining
-                            elif st.session_state.timer_mode == 'short_break':
-                                new_duration_seconds = short_break_duration * 60
-                                elapsed_seconds = (st.session_state.short_break_duration * 60) - st.session_state.time_remaining
-                                if elapsed_seconds < new_duration_seconds:
-                                    st.session_state.time_remaining = new_duration_seconds - elapsed_seconds
-                                    if st.session_state.target_end_time is not None:
-                                        st.session_state.target_end_time = time.time() + st.session_state.time_remaining
-                            else:  # long_break
-                                new_duration_seconds = long_break_duration * 60
-                                elapsed_seconds = (st.session_state.long_break_duration * 60) - st.session_state.time_remaining
-                                if elapsed_seconds < new_duration_seconds:
-                                    st.session_state.time_remaining = new_duration_seconds - elapsed_seconds
-                                    if st.session_state.target_end_time is not None:
-                                        st.session_state.target_end_time = time.time() + st.session_state.time_remaining
+                            # Timer is running, stretch or shorten it unless the new length has already passed
+                            new_duration_seconds = mode_duration(st.session_state.timer_mode)
+                            if elapsed_seconds < new_duration_seconds:
+                                change_timer("resize", duration=new_duration_seconds)
                         
                         # Show success message and refresh the UI
                         st.success("Settings saved!")
@@ -422,19 +637,9 @@ def show_focus():
     # Pomodoro Technique Card
     st.markdown('<div class="info-card">', unsafe_allow_html=True)
     with st.expander("🍅 Pomodoro Technique", expanded=False):
-        st.markdown("""
-        <style>
-        div[data-testid="stExpander"] {
-            width: 100%;
-        }
-        div[data-testid="stExpander"] > div {
-            width: 100%;
-        }
-        </style>
-        """, unsafe_allow_html=True)
         # Use separate markdown calls to avoid issues with complex HTML rendering
         st.markdown("<p>A time management method that breaks work into focused intervals separated by short breaks.</p>", unsafe_allow_html=True)
-        st.markdown("<h4 style='color: #549aff; margin-bottom: 10px;'>Benefits:</h4>", unsafe_allow_html=True)
+        st.markdown("<h4 class='benefits-heading'>Benefits:</h4>", unsafe_allow_html=True)
         
         # Use bullet points with Streamlit's native markdown support
         st.markdown("• Improves focus and concentration")
@@ -454,86 +659,28 @@ def show_focus():
             key="timer_container",
             css_styles=styles["timer_container"]
         ):
-            # 1. Mode Selector
-            st.markdown("""
-            <style>
-            .mode-selector {
-                display: flex;
-                justify-content: center;
-                gap: 10px;
-                margin-bottom: 20px;
-            }
-            .mode-button {
-                padding: 8px 16px;
-                border-radius: 30px;
-                cursor: pointer;
-                font-weight: 500;
-                font-size: 14px;
-                transition: all 0.2s ease;
-                text-align: center;
-                min-width: 120px;
-            }
-            .mode-button.active {
-                color: white;
-                transform: scale(1.05);
-            }
-            .mode-button:hover {
-                transform: translateY(-2px);
-            }
-            </style>
-            """, unsafe_allow_html=True)
+            # 1. Mode Selector (the active mode's button is highlighted by a cached stylesheet)
+            apply_page_styles(focus_mode_buttons_css, st.session_state.timer_mode)
             
             # Instead of HTML buttons + hidden Streamlit buttons, use direct Streamlit buttons with styling
             cols = st.columns(3)
             with cols[0]:
-                pomodoro_style = f"background-color: {colors['primary_color']}; color: white;" if st.session_state.timer_mode == "pomodoro" else f"background-color: white; color: {colors['text_color']}; border: 1px solid {colors['border_color']};"
                 pomodoro_btn = st.button("Pomodoro", key="pomodoro_btn", use_container_width=True)
                 if pomodoro_btn:
                     set_timer_mode('pomodoro')
                     st.rerun()
-                st.markdown(f"""
-                <style>
-                    div[data-testid="stButton"]:nth-of-type(1) button {{
-                        {pomodoro_style}
-                        border-radius: 30px;
-                        font-weight: 500;
-                    }}
-                </style>
-                """, unsafe_allow_html=True)
                 
             with cols[1]:
-                short_break_style = f"background-color: {colors['primary_color']}; color: white;" if st.session_state.timer_mode == "short_break" else f"background-color: white; color: {colors['text_color']}; border: 1px solid {colors['border_color']};"
                 short_break_btn = st.button("Short Break", key="short_break_btn", use_container_width=True)
                 if short_break_btn:
                     set_timer_mode('short_break')
                     st.rerun()
-                # Apply custom styling to the button
-                st.markdown(f"""
-                <style>
-                    div[data-testid="stButton"]:nth-of-type(2) button {{
-                        {short_break_style}
-                        border-radius: 30px;
-                        font-weight: 500;
-                    }}
-                </style>
-                """, unsafe_allow_html=True)
                 
             with cols[2]:
-                long_break_style = f"background-color: {colors['primary_color']}; color: white;" if st.session_state.timer_mode == "long_break" else f"background-color: white; color: {colors['text_color']}; border: 1px solid {colors['border_color']};"
                 long_break_btn = st.button("Long Break", key="long_break_btn", use_container_width=True)
                 if long_break_btn:
                     set_timer_mode('long_break')
                     st.rerun()
-                # Apply custom styling to the button
-                st.markdown(f"""
-                <style>
-                    div[data-testid="stButton"]:nth-of-type(3) button {{
-                        {long_break_style}
-                        border-radius: 30px;
-                        font-weight: 500;
-                    }}
-                </style>
-                """, unsafe_allow_html=True)
             
             # 2. Task Display - Show currently linked task and add unlinking functionality
             if st.session_state.linked_task:
@@ -553,13 +700,13 @@ def show_focus():
                     task_cols = st.columns([5, 1])
                     with task_cols[0]:
                         st.markdown(f"""
-                        <div style="margin-bottom: 5px;">
+                        <div class="task-info-label">
                             <strong>You are currently focusing on:</strong>
                         </div>
-                        <div style="font-size: 1.1rem; font-weight: 500; color: {colors['primary_color']};">
+                        <div class="task-info-name">
                             {st.session_state.linked_task}
                         </div>
-                        <div style="margin-top: 5px; font-size: 0.9rem; color: {colors['text_color']}80;">
+                        <div class="task-info-note">
                             All focus sessions will be linked to this task until you change or unlink it.
                         </div>
                         """, unsafe_allow_html=True)
@@ -571,20 +718,20 @@ def show_focus():
 
                     # Show confirmation dialog outside of the columns
                     if hasattr(st.session_state, 'showing_unlink_confirmation') and st.session_state.showing_unlink_confirmation:
-                        st.markdown("<div style='margin: 20px 0;'>", unsafe_allow_html=True)
+                        st.markdown("<div class='spaced-block'>", unsafe_allow_html=True)
                         unlink_confirmation = st.warning("Are you sure you want to unlink this task? Future sessions will not be associated with it.")
                         
                         # Stack buttons vertically
                         if st.button("Yes, unlink", key="confirm_unlink", use_container_width=True):
-                            st.session_state.linked_task = None
-                            st.session_state.linked_task_id = None
+                            change_timer("link", task_id=None)
                             st.session_state.task_explicitly_unlinked = True
                             st.session_state.showing_unlink_confirmation = False
                             st.rerun()
                         
                         if st.button("Unlink and Switch to New Task", key="unlink_and_switch", use_container_width=True):
-                            st.session_state.linked_task = None
-                            st.session_state.linked_task_id = None
+                            if change_timer("link", task_id=None):
+                                st.session_state.linked_task = None
+                                st.session_state.linked_task_id = None
                             st.session_state.task_explicitly_unlinked = False  # Don't set this to True since we're switching
                         
                         if st.button("Cancel", key="cancel_unlink", use_container_width=True):
@@ -606,11 +753,11 @@ def show_focus():
                     }}
                     """
                 ):
-                    st.markdown(f"""
-                    <div style="margin-bottom: 10px;">
+                    st.markdown("""
+                    <div class="task-info-label spaced">
                         <strong>No task is currently linked to your focus session.</strong>
                     </div>
-                    <div style="font-size: 0.9rem; color: {colors['text_color']}80; margin-bottom: 10px;">
+                    <div class="task-info-note spaced">
                         You can proceed with a general focus session or select a specific task to track.
                     </div>
                     """, unsafe_allow_html=True)
@@ -626,19 +773,6 @@ def show_focus():
                             st.rerun()
             
             # 3. Timer Display
-            st.markdown("""
-            <style>
-            .timer-display {
-                font-size: 8rem;
-                font-weight: 700;
-                font-family: 'Roboto Mono', monospace;
-                margin: 30px 0;
-                padding: 20px;
-        text-align: center;
-            }
-            </style>
-            """, unsafe_allow_html=True)
-            
             # Calculate progress
             if st.session_state.timer_mode == 'pomodoro':
                 # Use the session state's slider value for progress calculation
@@ -673,77 +807,19 @@ def show_focus():
             """, unsafe_allow_html=True)
             
             # 4. Control Buttons
-            st.markdown("""
-            <style>
-            /* Center all buttons in the timer container */
-            .main-controls-container {
-                display: flex;
-                justify-content: center;
-                gap: 20px;
-                margin: 20px auto;
-            }
-            
-            /* Style for all control buttons */
-            .control-button button {
-                width: 60px !important;
-                height: 60px !important;
-                border-radius: 50% !important;
-                display: flex !important;
-                align-items: center !important;
-                justify-content: center !important;
-                font-size: 24px !important;
-                padding: 0 !important;
-                margin: 0 auto !important;
-            }
-            
-            /* Fix the issue with the column divs */
-            [data-testid="column"] {
-                display: flex !important;
-                justify-content: center !important;
-                align-items: center !important;
-            }
-            
-            /* Ensure buttons are centered inside their containers */
-            [data-testid="stButton"] {
-                display: flex !important;
-                justify-content: center !important;
-                margin: 0 auto !important;
-            }
-            
-            /* Make the actual button elements centered */
-            [data-testid="stButton"] > button {
-                margin: 0 auto !important;
-                display: block !important;
-            }
-            
-            /* Transition prompt styling */
-            .transition-prompt {
-                background-color: rgba(255, 255, 255, 0.1);
-                border-radius: 10px;
-                padding: 20px;
-                margin: 20px 0;
-                text-align: center;
-                border: 1px solid rgba(255, 255, 255, 0.2);
-            }
-            .transition-prompt h3 {
-                margin-bottom: 15px;
-            }
-            .action-button {
-                margin: 0 10px;
-            }
-            </style>
-            """, unsafe_allow_html=True)
-            
             st.markdown("<div class='main-controls-container'>", unsafe_allow_html=True)
             
             # Create control buttons directly using Streamlit - only if not in transition mode
             if not ("awaiting_user_action" in st.session_state and st.session_state.awaiting_user_action):
+                # Round button styling, only loaded while the controls are shown
+                apply_page_styles(focus_controls_css)
+                
                 # Create a single row for all buttons
                 cols = st.columns([1, 1, 1])
                 
                 # Start button
                 with cols[0]:
-                    st.markdown("<div style='display: flex; justify-content: center;'>", unsafe_allow_html=True)
+                    st.markdown("<div class='centered-flex'>", unsafe_allow_html=True)
                     start_disabled = st.session_state.timer_running and not st.session_state.timer_paused
                     if st.button("▶️", key="start_btn", disabled=start_disabled):
                         # Check if we're ready to start
@@ -766,42 +842,14 @@ def show_focus():
                                     can_start = False
                         
                         if can_start:
-                            current_time = time.time()
-                            st.session_state.timer_running = True
-                            st.session_state.timer_paused = False
-                            st.session_state.last_update_time = current_time
-                            st.session_state.target_end_time = current_time + st.session_state.time_remaining
-                            
-                            # Update flow state
-                            if st.session_state.timer_mode == 'pomodoro':
-                                st.session_state.focus_flow_state = 'focusing'
+                            # A paused session picks up where it stopped; otherwise a full one starts
+                            if st.session_state.timer_paused:
+                                change_timer("resume")
                             else:
-                                st.session_state.focus_flow_state = 'break'
-                            
-                            # Save flow state to database if user is logged in
-                            if hasattr(st.session_state, 'user_id') and st.session_state.user_id:
-                                # Convert current_time to datetime for database
-                                session_start = datetime.datetime.fromtimestamp(current_time)
-                                update_focus_flow_state(
-                                    st.session_state.user_id,
-                                    st.session_state.focus_flow_state,
-                                    st.session_state.timer_mode,
-                                    st.session_state.time_remaining,
-                                    st.session_state.linked_task_id,
-                                    session_start
-                                )
+                                start_timer(st.session_state.timer_mode, st.session_state.timer_duration)
                                 
                             st.rerun()
                     st.markdown("</div>", unsafe_allow_html=True)
-                    
-                    # Apply custom styling to the button
-                    st.markdown(f"""
-                    <style>
-                        div[data-testid="stButton"]:nth-of-type(4) button {{
-                            {styles["control_button"]}
-                        }}
-                    </style>
-                    """, unsafe_allow_html=True)
                 
                 # Pause button
                 with cols[1]:
@@ -809,54 +857,22 @@ def show_focus():
                     pause_disabled = not st.session_state.timer_running
                     if st.button(pause_icon, key="pause_btn", disabled=pause_disabled):
                         if st.session_state.timer_running:
-                            st.session_state.timer_paused = not st.session_state.timer_paused
-                            current_time = time.time()
-                            
-                            if st.session_state.timer_paused:
-                                # When pausing, store the pause time
-                                st.session_state.pause_time = current_time
-                            else:
-                                # When resuming, adjust the target end time
-                                if hasattr(st.session_state, 'pause_time'):
-                                    pause_duration = current_time - st.session_state.pause_time
-                                    if st.session_state.target_end_time is not None:
-                                        st.session_state.target_end_time += pause_duration
-                            
-                            # Set the last update time to now
-                            st.session_state.last_update_time = current_time
+                            change_timer("resume" if st.session_state.timer_paused else "pause")
                         st.rerun()
-                    
-                    # Apply custom styling to the button
-                    st.markdown(f"""
-                    <style>
-                        div[data-testid="stButton"]:nth-of-type(5) button {{
-                            {styles["pause_button"]}
-                        }}
-                    </style>
-                    """, unsafe_allow_html=True)
                 
                 # Reset button
                 with cols[2]:
                     if st.button("🔄", key="reset_btn"):
                         # If a completed session, log it before resetting
                         if st.session_state.timer_running and st.session_state.timer_mode == 'pomodoro':
-                            elapsed_seconds = st.session_state.pomodoro_duration * 60 - st.session_state.time_remaining
+                            elapsed_seconds = st.session_state.timer_duration - st.session_state.time_remaining
                             if elapsed_seconds > 0:
                                 # Log the partial session
                                 st.session_state[f'{user_prefix}total_focus_time'] += elapsed_seconds
                         
-                        # Reset timer
-                        set_timer_mode(st.session_state.timer_mode)  # This resets the time based on current mode
+                        # Reset timer, running or not, to a full session of the current mode
+                        reset_timer(st.session_state.timer_mode)
                         st.rerun()
-                    
-                    # Apply custom styling to the button
-                    st.markdown(f"""
-                    <style>
-                        div[data-testid="stButton"]:nth-of-type(6) button {{
-                            {styles["reset_button"]}
-                        }}
-                    </style>
-                    """, unsafe_allow_html=True)
             
             st.markdown("</div>", unsafe_allow_html=True)
     
@@ -870,90 +886,44 @@ def show_focus():
                 # Show different messages based on task linking status
                 if st.session_state.linked_task:
                     st.markdown(f"""
-                    <h3 style='color: #00BFFF;'>🎉 Focus Session Complete!</h3>
-                    <p style='color: #00BFFF;'>You've completed a focus session for: <strong>{st.session_state.linked_task}</strong></p>
+                    <h3 class='highlight-text'>🎉 Focus Session Complete!</h3>
+                    <p class='highlight-text'>You've completed a focus session for: <strong>{st.session_state.linked_task}</strong></p>
                     <p>This session has been logged under this task.</p>
                     """, unsafe_allow_html=True)
                 else:
                     st.markdown(f"""
-                    <h3 style='color: #00BFFF;'>🎉 Focus Session Complete!</h3>
-                    <p style='color: #00BFFF;'>You've completed a general focus session (not linked to any task).</p>
+                    <h3 class='highlight-text'>🎉 Focus Session Complete!</h3>
+                    <p class='highlight-text'>You've completed a general focus session (not linked to any task).</p>
                     """, unsafe_allow_html=True)
                 
                 # Create a grid of action buttons with clear options
                 action_cols = st.columns([1, 1])
                 with action_cols[0]:
-                    st.markdown("<div style='text-align: center;'><strong>Continue with:</strong></div>", unsafe_allow_html=True)
+                    st.markdown("<div class='centered-text'><strong>Continue with:</strong></div>", unsafe_allow_html=True)
                     if st.button("⏱️ Start Short Break", key="start_short_break", use_container_width=True):
-                        # Reset awaiting action
-                        st.session_state.awaiting_user_action = False
-                        # Change mode to short break
-                        set_timer_mode("short_break")
-                        # Update flow state
-                        st.session_state.focus_flow_state = 'break'
-                        # Auto-start timer
-                        current_time = time.time()
-                        st.session_state.timer_running = True
-                        st.session_state.timer_paused = False
-                        st.session_state.last_update_time = current_time
-                        st.session_state.target_end_time = current_time + st.session_state.time_remaining
-                        
-                        # Save flow state to database if logged in
-                        if hasattr(st.session_state, 'user_id') and st.session_state.user_id:
-                            session_start = datetime.datetime.fromtimestamp(current_time)
-                            update_focus_flow_state(
-                                st.session_state.user_id,
-                                'break',
-                                'short_break',
-                                st.session_state.time_remaining,
-                                st.session_state.linked_task_id,
-                                session_start
-                            )
-                            
+                        start_timer("short_break")
                         st.rerun()
                     
                     if st.button("🧠 Start Long Break", key="start_long_break", use_container_width=True):
-                        # Reset awaiting action
-                        st.session_state.awaiting_user_action = False
-                        # Change mode to long break
-                        set_timer_mode("long_break")
-                        # Update flow state
-                        st.session_state.focus_flow_state = 'break'
-                        # Auto-start timer
-                        current_time = time.time()
-                        st.session_state.timer_running = True
-                        st.session_state.timer_paused = False
-                        st.session_state.last_update_time = current_time
-                        st.session_state.target_end_time = current_time + st.session_state.time_remaining
+                        start_timer("long_break")
                         st.rerun()
                 
                 with action_cols[1]:
-                    st.markdown("<div style='text-align: center;'><strong>Other options:</strong></div>", unsafe_allow_html=True)
+                    st.markdown("<div class='centered-text'><strong>Other options:</strong></div>", unsafe_allow_html=True)
                     if st.button("🚀 Start New Focus Session", key="start_new_pomodoro", use_container_width=True):
-                        # Reset awaiting action
-                        st.session_state.awaiting_user_action = False
-                        # Change mode to pomodoro
-                        set_timer_mode("pomodoro")
-                        # Update flow state
-                        st.session_state.focus_flow_state = 'ready'
-                        # Auto-start timer
-                        current_time = time.time()
-                        st.session_state.timer_running = True
-                        st.session_state.timer_paused = False
-                        st.session_state.last_update_time = current_time
-                        st.session_state.target_end_time = current_time + st.session_state.time_remaining
+                        start_timer("pomodoro")
                         st.rerun()
                     
                     if st.session_state.linked_task:
                         if st.button("📋 Switch Task", key="switch_task", use_container_width=True):
                             # Redirect to tasks page to select a new task
-                            st.session_state.awaiting_user_action = False
+                            reset_timer("pomodoro")
                             st.session_state.current_page = "tasks"
                             st.rerun()
                     else:
                         if st.button("📋 Select a Task", key="select_task", use_container_width=True):
                             # Redirect to tasks page to select a new task
-                            st.session_state.awaiting_user_action = False
+                            reset_timer("pomodoro")
                             st.session_state.current_page = "tasks"
                             st.rerun()
                 
@@ -964,91 +934,52 @@ def show_focus():
                 # Add different messaging depending on task status
                 if st.session_state.linked_task:
                     st.markdown(f"""
-                    <h3 style='color: #00BFFF;'>⏱️ {break_type.capitalize()} Break Completed!</h3>
-                    <p style='color: #00BFFF;'>Your break following work on <strong>{st.session_state.linked_task}</strong> is over.</p>
+                    <h3 class='highlight-text'>⏱️ {break_type.capitalize()} Break Completed!</h3>
+                    <p class='highlight-text'>Your break following work on <strong>{st.session_state.linked_task}</strong> is over.</p>
                     <p>Ready to continue your focus sessions?</p>
                     """, unsafe_allow_html=True)
                 else:
                     st.markdown(f"""
-                    <h3 style='color: #00BFFF;'>⏱️ {break_type.capitalize()} Break Completed!</h3>
-                    <p style='color: #00BFFF;'>Your break is over.</p>
+                    <h3 class='highlight-text'>⏱️ {break_type.capitalize()} Break Completed!</h3>
+                    <p class='highlight-text'>Your break is over.</p>
                     <p>Ready to continue with your focus sessions?</p>
                     """, unsafe_allow_html=True)
                 
                 # Create a grid of action buttons with clear options
                 action_cols = st.columns([1, 1])
                 with action_cols[0]:
-                    st.markdown("<div style='text-align: center;'><strong>Continue with:</strong></div>", unsafe_allow_html=True)
+                    st.markdown("<div class='centered-text'><strong>Continue with:</strong></div>", unsafe_allow_html=True)
                     
                     # Button to start a new focus session with same task
                     if st.session_state.linked_task:
                         # Show task name in the button
                         if st.button(f"🚀 Focus on: {st.session_state.linked_task}", key="continue_with_task", use_container_width=True):
-                            # Reset awaiting action
-                            st.session_state.awaiting_user_action = False
-                            # Change mode to pomodoro
-                            set_timer_mode("pomodoro")
-                            # Update flow state
-                            st.session_state.focus_flow_state = 'ready'
-                            # Auto-start timer
-                            current_time = time.time()
-                            st.session_state.timer_running = True
-                            st.session_state.timer_paused = False
-                            st.session_state.last_update_time = current_time
-                            st.session_state.target_end_time = current_time + st.session_state.time_remaining
+                            start_timer("pomodoro")
                             st.rerun()
                     else:
                         # Generic start button
                         if st.button("🚀 Start New Focus Session", key="start_new_pomodoro", use_container_width=True):
-                            # Reset awaiting action
-                            st.session_state.awaiting_user_action = False
-                            # Change mode to pomodoro
-                            set_timer_mode("pomodoro")
-                            # Update flow state
-                            st.session_state.focus_flow_state = 'ready'
-                            # Auto-start timer
-                            current_time = time.time()
-                            st.session_state.timer_running = True
-                            st.session_state.timer_paused = False
-                            st.session_state.last_update_time = current_time
-                            st.session_state.target_end_time = current_time + st.session_state.time_remaining
+                            start_timer("pomodoro")
                             st.rerun()
                     
                     # Option to extend break
                     if st.button("⏱️ Extend Break by 5 Minutes", key="extend_break", use_container_width=True):
-                        # Reset awaiting action
-                        st.session_state.awaiting_user_action = False
-                        # Use same break mode
-                        current_mode = st.session_state.timer_mode
-                        # Set time to 5 minutes
-                        st.session_state.time_remaining = 5 * 60
-                        # Update flow state
-                        st.session_state.focus_flow_state = 'break'
-                        # Auto-start timer
-                        current_time = time.time()
-                        st.session_state.timer_running = True
-                        st.session_state.timer_paused = False
-                        st.session_state.last_update_time = current_time
-                        st.session_state.target_end_time = current_time + st.session_state.time_remaining
+                        # Same break mode, for 5 minutes
+                        start_timer(st.session_state.timer_mode, 5 * 60)
                         st.rerun()
                 
                 with action_cols[1]:
-                    st.markdown("<div style='text-align: center;'><strong>Other options:</strong></div>", unsafe_allow_html=True)
+                    st.markdown("<div class='centered-text'><strong>Other options:</strong></div>", unsafe_allow_html=True)
                     
                     if st.button("📋 Switch Task", key="switch_task", use_container_width=True):
                         # Redirect to tasks page to select a new task
-                        st.session_state.awaiting_user_action = False
+                        reset_timer("pomodoro")
                         st.session_state.current_page = "tasks"
                         st.rerun()
                     
                     if st.button("❌ End Focus Mode", key="end_focus_mode", use_container_width=True):
-                        # Reset all session states
-                        st.session_state.awaiting_user_action = False
-                        st.session_state.timer_running = False
-                        st.session_state.timer_paused = False
-                        st.session_state.target_end_time = None
-                        st.session_state.focus_flow_state = 'ready'
-                        # Don't reset linked task - preserve it
+                        # Back to a fresh pomodoro; the linked task is kept
+                        reset_timer("pomodoro")
                         st.rerun()
     
     # Stats Cards
@@ -1058,8 +989,8 @@ def show_focus():
     time_display = f"{total_hours}h {remaining_minutes}m" if total_hours > 0 else f"{total_minutes}m"
     
     # Create a header for the statistics section
-    st.markdown(f"""
-    <h3 style="color: #00BFFF; font-size: 1.9rem; font-weight: 700; margin: 1.5rem 0; padding: 0.5rem; text-align: center;">
+    st.markdown("""
+    <h3 class="stats-header">
     📊 Your Statistics
     </h3>
     """, unsafe_allow_html=True)
@@ -1068,20 +999,18 @@ def show_focus():
     stats_cols = st.columns(2)
     
     with stats_cols[0]:
-        # Use a custom div with inline styles for the first card
         st.markdown(f"""
-        <div style="text-align: center; padding: 20px; border-radius: 10px; background-color: {colors['primary_color']}; box-shadow: 0 8px 16px rgba(0,0,0,0.15);">
-            <h3 style="font-size: 2.2rem; color: white; font-weight: 700;">{time_display}</h3>
-            <p style="margin-top: 5px; color: white; font-weight: 500;">Total Focus Time</p>
+        <div class="stats-tile">
+            <h3>{time_display}</h3>
+            <p>Total Focus Time</p>
             </div>
         """, unsafe_allow_html=True)
     
     with stats_cols[1]:
-        # Use a custom div with inline styles for the second card
         st.markdown(f"""
-        <div style="text-align: center; padding: 20px; border-radius: 10px; background-color: {colors['primary_color']}; box-shadow: 0 8px 16px rgba(0,0,0,0.15);">
-            <h3 style="font-size: 2.2rem; color: white; font-weight: 700;">{st.session_state[f'{user_prefix}sessions_completed']}</h3>
-            <p style="margin-top: 5px; color: white; font-weight: 500;">Sessions Completed</p>
+        <div class="stats-tile">
+            <h3>{st.session_state[f'{user_prefix}sessions_completed']}</h3>
+            <p>Sessions Completed</p>
         </div>
         """, unsafe_allow_html=True)
     
@@ -1109,8 +1038,8 @@ def show_focus():
             analytics_tabs = st.tabs(["Lists & Categories", "Task Performance", "Unlinked Sessions"])
             
             with analytics_tabs[0]:
-                st.markdown(f"""
-                <h4 style="color: {colors['primary_color']}; font-size: 1.4rem; font-weight: 600; margin: 1rem 0;">
+                st.markdown("""
+                <h4 class="analytics-heading">
                 Focus Time by List
                 </h4>
                 """, unsafe_allow_html=True)
@@ -1136,8 +1065,8 @@ def show_focus():
                     st.bar_chart(chart_df, x="List", y="Minutes")
                     
                     # Display data in a table
-                    st.markdown(f"""
-                    <h5 style="color: {colors['text_color']}; font-size: 1.1rem; font-weight: 600; margin: 1rem 0;">
+                    st.markdown("""
+                    <h5 class="analytics-subheading">
                     Detailed Focus Stats by List
                     </h5>
                     """, unsafe_allow_html=True)
@@ -1160,8 +1089,8 @@ def show_focus():
                     st.info("No focus data by list available yet. Complete some focused sessions with tasks to see analytics.")
             
             with analytics_tabs[1]:
-                st.markdown(f"""
-                <h4 style="color: {colors['primary_color']}; font-size: 1.4rem; font-weight: 600; margin: 1rem 0;">
+                st.markdown("""
+                <h4 class="analytics-heading">
                 Top Tasks by Focus Time
                 </h4>
                 """, unsafe_allow_html=True)
@@ -1190,8 +1119,8 @@ def show_focus():
                     st.info("No task-specific focus data available yet. Link tasks to your focus sessions to see analytics.")
             
             with analytics_tabs[2]:
-                st.markdown(f"""
-                <h4 style="color: {colors['primary_color']}; font-size: 1.4rem; font-weight: 600; margin: 1rem 0;">
+                st.markdown("""
+                <h4 class="analytics-heading">
                 Unlinked Sessions
                 </h4>
                 """, unsafe_allow_html=True)
@@ -1218,8 +1147,8 @@ def show_focus():
                         unlinked_percentage = (unlinked_stats['unlinked_focus_time'] / st.session_state[f'{user_prefix}total_focus_time']) * 100
                         
                         st.markdown(f"""
-                        <div style="margin-top: 20px;">
-                            <p style="font-size: 1.1rem; color: {colors['text_color']};">
+                        <div class="analytics-note">
+                            <p>
                                 <strong>{unlinked_percentage:.1f}%</strong> of your total focus time is not linked to specific tasks.
                             </p>
                         </div>
@@ -1233,197 +1162,127 @@ def show_focus():
                 else:
                     st.info("No unlinked focus sessions data available.")
     
-    # Timer logic - update time remaining if timer is running
+    # Timer logic - time remaining counts down between reads of the stored timer, so just redraw until it runs out
     if st.session_state.timer_running and not st.session_state.timer_paused:
-        current_time = time.time()
-        
-        if st.session_state.last_update_time:
-            # Calculate time remaining based on target end time
-            if st.session_state.target_end_time is not None:
-                st.session_state.time_remaining = max(0, int(st.session_state.target_end_time - current_time))
-        
-        # Update the last update time
-        st.session_state.last_update_time = current_time
-        
-        # Check if timer has finished
+        # Check if timer has finished, confirming with the database in case another tab paused or changed it
         if st.session_state.time_remaining <= 0:
-            # Timer completed
-            if st.session_state.timer_mode == 'pomodoro':
-                # Log completed pomodoro
-                st.session_state[f'{user_prefix}sessions_completed'] += 1
-                focus_time_seconds = st.session_state.pomodoro_duration * 60
-                st.session_state[f'{user_prefix}total_focus_time'] += focus_time_seconds
-                
-                # Update focus flow state
-                st.session_state.focus_flow_state = 'completed'
-                
-                # Track daily sessions for this task if linked
-                if st.session_state.linked_task and st.session_state.linked_task_id:
-                    task_key = f"{st.session_state.linked_task_id}"
+            load_timer_state(refresh=True)
+        if st.session_state.timer_running and not st.session_state.timer_paused and st.session_state.time_remaining <= 0:
+            # Only the session that moves the timer to completed logs it; any other tab just shows the prompt
+            if change_timer("complete"):
+                if st.session_state.timer_mode == 'pomodoro':
+                    # Log completed pomodoro, counting from the stored totals in case another session logged one
+                    if hasattr(st.session_state, 'user_id') and st.session_state.user_id:
+                        saved_stats = get_focus_stats(st.session_state.user_id)
+                        st.session_state[f'{user_prefix}total_focus_time'] = saved_stats["total_focus_time"]
+                        st.session_state[f'{user_prefix}sessions_completed'] = saved_stats["pomodoros_completed"]
+                    st.session_state[f'{user_prefix}sessions_completed'] += 1
+                    focus_time_seconds = st.session_state.timer_duration
+                    st.session_state[f'{user_prefix}total_focus_time'] += focus_time_seconds
                     
-                    # Initialize daily task tracking if needed
-                    if task_key not in st.session_state[f'{user_prefix}daily_task_sessions']:
-                        st.session_state[f'{user_prefix}daily_task_sessions'][task_key] = {
-                            'task_name': st.session_state.linked_task,
-                            'sessions': 0,
-                            'total_time': 0
-                        }
-                    
-                    # Update the task's daily tracking
-                    st.session_state[f'{user_prefix}daily_task_sessions'][task_key]['sessions'] += 1
-                    st.session_state[f'{user_prefix}daily_task_sessions'][task_key]['total_time'] += focus_time_seconds
-                
-                # Save the session to the database for the logged-in user
-                if hasattr(st.session_state, 'user_id') and st.session_state.user_id:
-                    # Update overall focus stats
-                    update_focus_stats(st.session_state.user_id, st.session_state[f'{user_prefix}total_focus_time'], st.session_state[f'{user_prefix}sessions_completed'])
-                    
-                    # Save the session to history
-                    session_id = save_focus_session(
-                        st.session_state.user_id, 
-                        st.session_state.linked_task_id, 
-                        'pomodoro', 
-                        focus_time_seconds
-                    )
-                    
-                    # Check for rewards/badges
-                    if session_id:
-                        # Check for badge rewards when session is completed
-                        from models.focus_session import FocusSession
-                        success, newly_earned = FocusSession.complete_session(session_id, st.session_state.user_id)
+                    # Track daily sessions for this task if linked
+                    if st.session_state.linked_task and st.session_state.linked_task_id:
+                        task_key = f"{st.session_state.linked_task_id}"
                         
-                        # If any badges were earned, set redirect flag
-                        if success and newly_earned:
-                            st.session_state.redirect_to_rewards = True
-                    
-                    # Update the focus flow state in the database
-                    update_focus_flow_state(
-                        st.session_state.user_id,
-                        'completed',
-                        'pomodoro',
-                        0,
-                        st.session_state.linked_task_id,
-                        None
-                    )
+                        # Initialize daily task tracking if needed
+                        if task_key not in st.session_state[f'{user_prefix}daily_task_sessions']:
+                            st.session_state[f'{user_prefix}daily_task_sessions'][task_key] = {
+                                'task_name': st.session_state.linked_task,
+                                'sessions': 0,
+                                'total_time': 0
+                            }
+                        
+                        # Update the task's daily tracking
+                        st.session_state[f'{user_prefix}daily_task_sessions'][task_key]['sessions'] += 1
+                        st.session_state[f'{user_prefix}daily_task_sessions'][task_key]['total_time'] += focus_time_seconds
                     
-                    # If a task is linked, update task-specific focus stats
-                    if st.session_state.linked_task_id is not None:
-                        # We can use the task ID directly without lookup
-                        task_id = st.session_state.linked_task_id
+                    # Save the session to the database for the logged-in user
+                    if hasattr(st.session_state, 'user_id') and st.session_state.user_id:
+                        # Update overall focus stats
+                        update_focus_stats(st.session_state.user_id, st.session_state[f'{user_prefix}total_focus_time'], st.session_state[f'{user_prefix}sessions_completed'])
+                        
+                        # Save the session to history
+                        session_id = save_focus_session(
+                            st.session_state.user_id, 
+                            st.session_state.linked_task_id, 
+                            'pomodoro', 
+                            focus_time_seconds
+                        )
                         
-                        # Update task-specific focus stats (adding the current session)
-                        success = update_task_focus_stats(task_id, st.session_state.user_id, focus_time_seconds, 1)
-                        if success:
-                            task_name = st.session_state.linked_task
-                            st.toast(f"Focus time recorded for task: {task_name}", icon="📊")
+                        # Check for rewards/badges
+                        if session_id:
+                            # Check for badge rewards when session is completed
+                            from models.focus_session import FocusSession
+                            success, newly_earned = FocusSession.complete_session(session_id, st.session_state.user_id)
                             
-                            # Do NOT reset the linked task after completion - maintain task continuity
-                            # We only want to reset if the user explicitly chooses to unlink
-                        elif st.session_state.linked_task:
-                            # Fallback to name lookup for backward compatibility
-                            task_id = get_task_id_by_name(st.session_state.user_id, st.session_state.linked_task)
+                            # If any badges were earned, set redirect flag
+                            if success and newly_earned:
+                                st.session_state.redirect_to_rewards = True
+                        
+                        # If a task is linked, update task-specific focus stats
+                        if st.session_state.linked_task_id is not None:
+                            # We can use the task ID directly without lookup
+                            task_id = st.session_state.linked_task_id
                             
-                            if task_id:
-                                # Update task-specific focus stats (adding the current session)
-                                success = update_task_focus_stats(task_id, st.session_state.user_id, focus_time_seconds, 1)
-                                if success:
-                                    task_name = st.session_state.linked_task
-                                    st.toast(f"Focus time recorded for task: {task_name}", icon="📊")
-                                    
-                                    # Do NOT reset the linked task after completion
+                            # Update task-specific focus stats (adding the current session)
+                            success = update_task_focus_stats(task_id, st.session_state.user_id, focus_time_seconds, 1)
+                            if success:
+                                task_name = st.session_state.linked_task
+                                st.toast(f"Focus time recorded for task: {task_name}", icon="📊")
+                                
+                                # Do NOT reset the linked task after completion - maintain task continuity
+                                # We only want to reset if the user explicitly chooses to unlink
+                            elif st.session_state.linked_task:
+                                # Fallback to name lookup for backward compatibility
+                                task_id = get_task_id_by_name(st.session_state.user_id, st.session_state.linked_task)
+                                
+                                if task_id:
+                                    # Update task-specific focus stats (adding the current session)
+                                    success = update_task_focus_stats(task_id, st.session_state.user_id, focus_time_seconds, 1)
+                                    if success:
+                                        task_name = st.session_state.linked_task
+                                        st.toast(f"Focus time recorded for task: {task_name}", icon="📊")
+                                        
+                                        # Do NOT reset the linked task after completion
+                                    else:
+                                        st.error(f"Failed to update focus stats for task: {st.session_state.linked_task}")
                                 else:
-                                    st.error(f"Failed to update focus stats for task: {st.session_state.linked_task}")
-                            else:
-                                st.error(f"Could not find task ID for '{st.session_state.linked_task}'")
-                
-                # Show completion message
-                st.toast("Pomodoro complete! Great job! 🎉", icon="🎉")
-                
-                # Set awaiting_user_action flag
-                if "awaiting_user_action" not in st.session_state:
-                    st.session_state.awaiting_user_action = False
-                st.session_state.awaiting_user_action = True
-                
-                # Save current mode for transition
-                st.session_state.completed_mode = "pomodoro"
-            
-            elif st.session_state.timer_mode == 'short_break' or st.session_state.timer_mode == 'long_break':
-                # Break completed
-                st.toast("Break time over! Ready to focus?", icon="⏱️")
-                
-                # Update break statistics
-                if st.session_state.timer_mode == 'short_break':
-                    break_time_seconds = st.session_state.short_break_duration * 60
-                else:  # long_break
-                    break_time_seconds = st.session_state.long_break_duration * 60
-                
-                # Update break counters
-                st.session_state[f'{user_prefix}total_break_time'] += break_time_seconds
-                st.session_state[f'{user_prefix}breaks_completed'] += 1
-                
-                # Update focus flow state
-                st.session_state.focus_flow_state = 'completed'
-                
-                # Save stats if logged in
-                if hasattr(st.session_state, 'user_id') and st.session_state.user_id:
-                    # Save the break session to history
-                    break_type = 'short_break' if st.session_state.timer_mode == 'short_break' else 'long_break'
-                    save_focus_session(
-                        st.session_state.user_id, 
-                        st.session_state.linked_task_id, 
-                        break_type, 
-                        break_time_seconds
-                    )
+                                    st.error(f"Could not find task ID for '{st.session_state.linked_task}'")
                     
-                    # Update the focus flow state in the database
-                    update_focus_flow_state(
-                        st.session_state.user_id,
-                        'completed',
-                        break_type,
-                        0,
-                        st.session_state.linked_task_id,
-                        None
-                    )
+                    # Show completion message
+                    st.toast("Pomodoro complete! Great job! 🎉", icon="🎉")
                 
-                # Set awaiting_user_action flag
-                if "awaiting_user_action" not in st.session_state:
-                    st.session_state.awaiting_user_action = False
-                st.session_state.awaiting_user_action = True
+                elif st.session_state.timer_mode == 'short_break' or st.session_state.timer_mode == 'long_break':
+                    # Break completed
+                    st.toast("Break time over! Ready to focus?", icon="⏱️")
+                    
+                    # Update break statistics, with the length the break actually ran
+                    break_time_seconds = st.session_state.timer_duration
+                    
+                    # Update break counters
+                    st.session_state[f'{user_prefix}total_break_time'] += break_time_seconds
+                    st.session_state[f'{user_prefix}breaks_completed'] += 1
+                    
+                    # Save stats if logged in
+                    if hasattr(st.session_state, 'user_id') and st.session_state.user_id:
+                        # Save the break session to history
+                        break_type = 'short_break' if st.session_state.timer_mode == 'short_break' else 'long_break'
+                        save_focus_session(
+                            st.session_state.user_id, 
+                            st.session_state.linked_task_id, 
+                            break_type, 
+                            break_time_seconds
+                        )
                 
-                # Save current mode for transition
-                st.session_state.completed_mode = "break"
-            
-            # Reset timer for all timer modes (pomodoro, short_break, long_break)
-            st.session_state.timer_running = False
-            st.session_state.timer_paused = False
-            st.session_state.target_end_time = None
-            
             # Force a rerun to show the transition prompt
             time.sleep(0.1)  # Small delay to reduce CPU usage
             st.rerun()
         else:
             # Timer is still running
-            # Rerun to update the timer display
+            # Rerun to update the timer display, counting down without another database read
+            st.session_state.focus_ticking = True
             time.sleep(0.1)  # Small delay to reduce CPU usage
             st.rerun()
-    elif st.session_state.timer_running and st.session_state.last_update_time is None:
-        # Initialize timer that was just started
-        current_time = time.time()
-        st.session_state.last_update_time = current_time
-        
-        # Calculate total duration
-        if st.session_state.timer_mode == 'pomodoro':
-            total_duration = st.session_state.pomodoro_duration * 60
-        elif st.session_state.timer_mode == 'short_break':
-            total_duration = st.session_state.short_break_duration * 60
-        else:  # long_break
-            total_duration = st.session_state.long_break_duration * 60
-        
-        st.session_state.target_end_time = current_time + st.session_state.time_remaining
-        
-        # Rerun to update the timer display
-        time.sleep(0.1)  # Small delay to reduce CPU usage
-        st.rerun()
     
     # Display the current mode status based on timer_mode
     if st.session_state.timer_running and (st.session_state.timer_mode == 'short_break' or st.session_state.timer_mode == 'long_break'):
@@ -1443,20 +1302,20 @@ def show_focus():
         ):
             if st.session_state.linked_task:
                 st.markdown(f"""
-                <div style="text-align: center;">
-                    <div style="font-size: 1.1rem; font-weight: 500; margin-bottom: 5px;">
-                        <span style="color: {colors['accent_color']};">⏱️ {break_type} Break in Progress</span>
+                <div class="session-status">
+                    <div class="session-status-title with-detail">
+                        <span class="break">⏱️ {break_type} Break in Progress</span>
                     </div>
-                    <div style="font-size: 0.9rem;">
+                    <div class="session-status-detail">
                         Following your work on: <strong>{st.session_state.linked_task}</strong>
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
             else:
                 st.markdown(f"""
-                <div style="text-align: center;">
-                    <div style="font-size: 1.1rem; font-weight: 500;">
-                        <span style="color: {colors['accent_color']};">⏱️ {break_type} Break in Progress</span>
+                <div class="session-status">
+                    <div class="session-status-title">
+                        <span class="break">⏱️ {break_type} Break in Progress</span>
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
@@ -1477,22 +1336,22 @@ def show_focus():
         ):
             if st.session_state.linked_task:
                 st.markdown(f"""
-                <div style="text-align: center;">
-                    <div style="font-size: 1.1rem; font-weight: 500; margin-bottom: 5px;">
-                        <span style="color: {colors['primary_color']};">🎯 Focus Session in Progress</span>
+                <div class="session-status">
+                    <div class="session-status-title with-detail">
+                        <span class="focus">🎯 Focus Session in Progress</span>
                     </div>
-                    <div style="font-size: 0.9rem;">
+                    <div class="session-status-detail">
                         You are focusing on: <strong>{st.session_state.linked_task}</strong>
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
             else:
                 st.markdown(f"""
-                <div style="text-align: center;">
-                    <div style="font-size: 1.1rem; font-weight: 500;">
-                        <span style="color: {colors['primary_color']};">🎯 Focus Session in Progress</span>
+                <div class="session-status">
+                    <div class="session-status-title">
+                        <span class="focus">🎯 Focus Session in Progress</span>
                     </div>
-                    <div style="font-size: 0.9rem;">
+                    <div class="session-status-detail">
                         General focus session (not linked to any task)
                     </div>
                 </div>
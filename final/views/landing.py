@@ -3,14 +3,16 @@ import os
 from utils.theme import apply_theme_aware_styles, get_theme_colors
 import pathlib
 import base64
+from utils.tracing import span
 
 # Define base path
 base_path = pathlib.Path(__file__).parent.parent
 
 def get_image_as_base64(image_path):
     """Convert an image to base64 string"""
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode()
+    with span("image.encode", path=os.path.basename(image_path)):
+        with open(image_path, "rb") as img_file:
+            return base64.b64encode(img_file.read()).decode()
 
 def show_landing_page():
     """Display the landing page with branding elements, testimonials, and login/signup buttons."""
@@ -4,6 +4,7 @@ from streamlit_extras.let_it_rain import rain
 import os
 import base64
 import pathlib
+from utils.tracing import span
 
 def get_unearned_badge_tagline(badge):
     """Generate a meaningful tagline for unearned badges"""
@@ -31,8 +32,9 @@ def get_badge_image_as_base64(image_path):
     """Safely convert an image to base64 string with error handling"""
     try:
         if os.path.exists(image_path):
-            with open(image_path, "rb") as img_file:
-                return base64.b64encode(img_file.read()).decode()
+            with span("image.encode", path=os.path.basename(image_path)):
+                with open(image_path, "rb") as img_file:
+                    return base64.b64encode(img_file.read()).decode()
         return None
     except Exception:
         return None
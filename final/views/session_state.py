@@ -0,0 +1,32 @@
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from utils.session_state import get_session_footprints, measure_session_state
+
+def _kb(size):
+    return round(size / 1024, 1)
+
+def show_session_state_panel():
+    """Sidebar panel with this session's state per key, and every recent session's total (SESSION_STATE_PANEL=1)"""
+    rows = measure_session_state()
+    with st.sidebar.expander("🧠 Session state", expanded=False):
+        st.markdown(f"**This session** · {_kb(sum(row['bytes'] for row in rows))} KB · {len(rows)} keys")
+        st.dataframe([{
+            "key": row["key"],
+            "page": row["page"] or ("" if row["name"] else "unlisted"),
+            "KB": _kb(row["bytes"]),
+            "budget KB": _kb(row["budget"]),
+            "over": "⚠️" if row["bytes"] > row["budget"] else "",
+        } for row in rows], hide_index=True, use_container_width=True)
+
+        ctx = get_script_run_ctx()
+        footprints = get_session_footprints()
+        st.markdown(f"**Sessions in this process** · {len(footprints)}")
+        sessions = [{
+            "session": session_id[:8] + (" (this)" if ctx is not None and session_id == ctx.session_id else ""),
+            "KB": _kb(sum(row["bytes"] for row in session_rows)),
+            "largest key": session_rows[0]["key"] if session_rows else "",
+        } for session_id, session_rows in footprints.items()]
+        sessions.sort(key=lambda session: session["KB"], reverse=True)
+        if sessions:
+            st.dataframe(sessions, hide_index=True, use_container_width=True)
+        st.caption("Other sessions as last measured, on navigation or every minute.")
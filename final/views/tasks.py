@@ -2,6 +2,7 @@ import streamlit as st
 from datetime import datetime, timedelta, time as datetime_time
 import pandas as pd
 import time
+import json
 from utils.db import (
     get_all_lists_for_user, 
     get_list_id_by_name, 
@@ -13,9 +14,13 @@ from utils.db import (
     get_subtasks_for_task,
     add_subtasks_for_task,
     update_subtask,
-    get_task_focus_stats
+    get_task_focus_stats,
+    move_task_between,
+    get_active_ai_jobs,
+    pop_finished_ai_jobs,
+    get_tasks_without_subtasks
 )
-from utils.ai import generate_subtasks, generate_action_plan, initialize_gemini
+from utils.ai_jobs import enqueue_job, generation_available
 from models.task import Task
 from utils.theme import apply_theme_aware_styles
 
@@ -30,6 +35,22 @@ def format_date(date_str):
     except:
         return date_str
         
+def show_finished_ai_job(job):
+    """Show the outcome of a finished background AI job"""
+    if job['status'] == 'failed':
+        st.error(job['error'] or "AI generation failed. Please try again.")
+    elif job['kind'] == 'subtasks':
+        result = json.loads(job['result']) if job['result'] else {}
+        st.success(f"Generated {result.get('count', 0)} subtasks")
+    elif job['kind'] == 'subtasks_batch':
+        result = json.loads(job['result']) if job['result'] else {}
+        message = f"Broke down {result.get('tasks', 0)} tasks"
+        if result.get('skipped'):
+            message += f" ({result['skipped']} could not be broken down, try them one at a time)"
+        st.success(message)
+    else:
+        st.success("Generated action plan successfully")
+
 # Helper functions to handle different UI components without nesting violations
 def show_delete_confirmation(task_id, task_name):
     """Show delete confirmation buttons with safe nesting"""
@@ -140,16 +161,9 @@ def show_inline_task_edit(task):
             st.session_state.editing_task_id = None
             st.rerun()
 
-def show_tasks():
-    """Display the tasks page"""
-    st.title("Tasks")
-    
-    # Apply theme-aware styling
-    is_dark_theme = apply_theme_aware_styles()
-    
-    # Add task-specific styling
-    st.markdown("""
-    <style>
+def tasks_page_css(colors):
+    """Task page CSS, built once per theme"""
+    css = """
     /* Task-specific styling */
     .task-container {
         border-radius: 0.5rem;
@@ -174,13 +188,24 @@ def show_tasks():
         border-radius: 4px;
         font-size: 0.9rem;
     }
-    </style>
-    """, unsafe_allow_html=True)
     
-    # Apply theme-specific colors
-    if is_dark_theme:
-        st.markdown("""
-        <style>
+    /* Task action buttons */
+    .stButton > button {
+        width: 100%;
+    }
+    .button-container {
+        display: flex;
+        gap: 10px;
+        margin-bottom: 10px;
+    }
+    .button-container > div {
+        flex: 1;
+    }
+    """
+    
+    # Theme-specific colors
+    if colors["is_dark_theme"]:
+        css += """
         .task-container {
             background-color: #1E1E1E;
             border: 1px solid #333333;
@@ -199,11 +224,9 @@ def show_tasks():
             background-color: rgba(187, 134, 252, 0.1);
             border-left: 3px solid #BB86FC;
         }
-        </style>
-        """, unsafe_allow_html=True)
+        """
     else:
-        st.markdown("""
-        <style>
+        css += """
         .task-container {
             background-color: #FFFFFF;
             border: 1px solid #E6E6E6;
@@ -222,11 +245,34 @@ def show_tasks():
             background-color: rgba(98, 0, 234, 0.05);
             border-left: 3px solid #6200EA;
         }
-        </style>
-        """, unsafe_allow_html=True)
+        """
+    return css
+
+def show_tasks():
+    """Display the tasks page"""
+    st.title("Tasks")
+    
+    # Apply theme-aware styling along with the cached task page stylesheet
+    apply_theme_aware_styles(tasks_page_css)
+    
+    # Check if AI generation is available
+    gemini_available = generation_available()
+    
+    # Report AI jobs that finished since the last rerun
+    for job in pop_finished_ai_jobs(st.session_state.user_id):
+        show_finished_ai_job(job)
     
-    # Check if Gemini API is initialized
-    gemini_available = initialize_gemini()
+    # Queued and running AI jobs, keyed by (task_id, kind)
+    jobs = get_active_ai_jobs(st.session_state.user_id)
+    active_jobs = {(job['task_id'], job['kind']): job for job in jobs if job['task_id'] is not None}
+    # Lists with a "Break Down All" batch queued or running
+    batch_lists = {job['list_id'] for job in jobs if job['kind'] == 'subtasks_batch'}
+    
+    # The page doesn't poll while jobs run; finished ones are reported on the user's next interaction
+    if jobs:
+        note_col, check_col = st.columns([4, 1])
+        note_col.caption(f"⏳ {len(jobs)} AI request(s) in progress. Results appear on your next action.")
+        check_col.button("🔄 Check now", key="check_ai_jobs")
     
     # Create a two-column layout
     col1, col2 = st.columns([1, 3])
@@ -353,6 +399,23 @@ def show_tasks():
             if not tasks:
                 st.info(f"No tasks in {st.session_state.active_list}. Add your first task!")
             else:
+                # Break down every open task without subtasks in a single background job
+                batch_pending = active_list_id in batch_lists
+                if batch_pending:
+                    st.caption("⏳ Breaking down tasks...")
+                elif st.button("🤖 Break Down All", key="break_down_all",
+                               help="Generate subtasks for every open task in this list that has none yet"):
+                    if not gemini_available:
+                        st.error("Gemini API key not configured. Please check your .env file.")
+                    else:
+                        open_tasks = get_tasks_without_subtasks(active_list_id, st.session_state.user_id)
+                        if open_tasks:
+                            enqueue_job(st.session_state.user_id, None, "subtasks_batch", list_id=active_list_id,
+                                        tasks=[{"id": t['id'], "name": t['name']} for t in open_tasks])
+                            st.rerun()
+                        else:
+                            st.info("Every open task in this list already has subtasks.")
+                
                 for task in tasks:
                     # Get subtask information
                     subtasks = get_subtasks_for_task(task['id'])
@@ -484,6 +547,24 @@ def show_tasks():
                                     # Set confirmation state for this specific task
                                     st.session_state[f"delete_confirm_{task['id']}"] = True
                                     st.rerun()
+                            
+                            # Move buttons only rewrite this task's rank; completed tasks always sort after open ones,
+                            # so neighbours come from the same group
+                            group = [t for t in tasks if t['completed'] == task['completed']]
+                            position = next(i for i, t in enumerate(group) if t['id'] == task['id'])
+                            if position > 0:
+                                move_up_container = st.container()
+                                if move_up_container.button("⬆️ Move Up", key=f"move_up_{task['id']}"):
+                                    before_id = group[position - 2]['id'] if position > 1 else None
+                                    move_task_between(task['id'], st.session_state.user_id, before_id, group[position - 1]['id'])
+                                    st.rerun()
+                            
+                            if position < len(group) - 1:
+                                move_down_container = st.container()
+                                if move_down_container.button("⬇️ Move Down", key=f"move_down_{task['id']}"):
+                                    after_id = group[position + 2]['id'] if position < len(group) - 2 else None
+                                    move_task_between(task['id'], st.session_state.user_id, group[position + 1]['id'], after_id)
+                                    st.rerun()
                         
                         # Show warning if task can't be completed
                         if subtask_count['total'] > 0 and not all_subtasks_completed:
@@ -639,36 +720,26 @@ def show_tasks():
                             # Schedule a rerun after finishing all subtasks
                             st.rerun()
                         
-                        # Add CSS for button container
-                        st.markdown("""
-                            <style>
-                            .stButton > button {
-                                width: 100%;
-                            }
-                            .button-container {
-                                display: flex;
-                                gap: 10px;
-                                margin-bottom: 10px;
-                            }
-                            .button-container > div {
-                                flex: 1;
-                            }
-                            </style>
-                        """, unsafe_allow_html=True)
+                        # Show progress of queued AI jobs for this task
+                        subtasks_pending = (task['id'], "subtasks") in active_jobs
+                        plan_pending = (task['id'], "action_plan") in active_jobs
+                        if subtasks_pending:
+                            st.caption("⏳ Generating subtasks...")
+                        if plan_pending:
+                            st.caption("⏳ Generating action plan...")
                         
                         # Create a container for the buttons
                         st.markdown('<div class="button-container">', unsafe_allow_html=True)
                         
                         # Generate Subtasks button
-                        if st.button("🤖 Generate Subtasks", key=f"gen_subtasks_{task['id']}"):
+                        if st.button("🤖 Generate Subtasks", key=f"gen_subtasks_{task['id']}", disabled=subtasks_pending):
                             if not gemini_available:
                                 st.error("Gemini API key not configured. Please check your .env file.")
                             elif subtasks:
                                 st.session_state.confirming_subtask_replace = task['id']
                                 st.rerun()
                             else:
-                                st.session_state.generating_subtasks_for = task['id']
-                                st.session_state.generating_subtasks_task_name = task['name']
+                                enqueue_job(st.session_state.user_id, task['id'], "subtasks", task_name=task['name'])
                                 st.rerun()
                         
                         # Add Single Subtask button
@@ -677,14 +748,14 @@ def show_tasks():
                             st.rerun()
                         
                         # Generate Action Plan button
-                        if st.button("📋 Generate Action Plan", key=f"gen_plan_{task['id']}"):
+                        # Runs alongside a queued subtask job, using the subtasks the task has now
+                        if st.button("📋 Generate Action Plan", key=f"gen_plan_{task['id']}", disabled=plan_pending):
                             if not gemini_available:
                                 st.error("Gemini API key not configured. Please check your .env file.")
                             else:
-                                st.session_state.generating_plan_for = task['id']
-                                st.session_state.generating_plan_task_name = task['name']
                                 subtask_names = [s['name'] for s in subtasks] if subtasks else []
-                                st.session_state.generating_plan_subtasks = subtask_names
+                                enqueue_job(st.session_state.user_id, task['id'], "action_plan",
+                                            task_name=task['name'], subtasks=subtask_names)
                                 st.rerun()
                         
                         # Close the button container
@@ -781,8 +852,7 @@ def show_tasks():
                 if proceed_container.button("Proceed", key="confirm_replace_subtasks"):
                     task = Task.get_by_id(task_id)
                     if task:
-                        st.session_state.generating_subtasks_for = task_id
-                        st.session_state.generating_subtasks_task_name = task["name"]
+                        enqueue_job(st.session_state.user_id, task_id, "subtasks", task_name=task["name"])
                         st.session_state.confirming_subtask_replace = None
                         st.rerun()
                     else:
@@ -793,61 +863,4 @@ def show_tasks():
                 if cancel_container.button("Cancel", key="cancel_replace_subtasks"):
                     st.session_state.confirming_subtask_replace = None
                     st.rerun()
-            
-            # Handle generating subtasks
-            if st.session_state.get("generating_subtasks_for"):
-                task_id = st.session_state.generating_subtasks_for
-                task_name = st.session_state.generating_subtasks_task_name
-                
-                st.info(f"Generating subtasks for '{task_name}'...")
-                
-                # Show a spinner while generating
-                with st.spinner("AI is breaking down this task..."):
-                    subtasks, error = generate_subtasks(task_name)
-                
-                if error:
-                    st.error(error)
-                elif subtasks:
-                    # Add the subtasks to the database
-                    success = add_subtasks_for_task(task_id, subtasks)
-                    
-                    if success:
-                        st.session_state.success = f"Generated {len(subtasks)} subtasks"
-                    else:
-                        st.session_state.error = "Failed to save generated subtasks"
-                else:
-                    st.session_state.error = "No subtasks were generated"
-                
-                st.session_state.generating_subtasks_for = None
-                st.session_state.generating_subtasks_task_name = None
-                st.rerun()
-            
-            # Handle generating action plan
-            if st.session_state.get("generating_plan_for"):
-                task_id = st.session_state.generating_plan_for
-                task_name = st.session_state.generating_plan_task_name
-                subtasks = st.session_state.generating_plan_subtasks
-                
-                st.info(f"Generating action plan for '{task_name}'...")
-                
-                # Show a spinner while generating
-                with st.spinner("AI is creating a detailed action plan..."):
-                    action_plan, error = generate_action_plan(task_name, subtasks=subtasks)
-                
-                if error:
-                    st.error(error)
-                elif action_plan:
-                    # Update the task with the action plan
-                    success = update_task(task_id, action_plan=action_plan)
-                    
-                    if success:
-                        st.session_state.success = "Generated action plan successfully"
-                    else:
-                        st.session_state.error = "Failed to save generated action plan"
-                else:
-                    st.session_state.error = "No action plan was generated"
-                
-                st.session_state.generating_plan_for = None
-                st.session_state.generating_plan_task_name = None
-                st.session_state.generating_plan_subtasks = None
-                st.rerun()
+
@@ -0,0 +1,33 @@
+import streamlit as st
+from utils.tracing import get_slowest_traces
+
+def _span_depths(trace):
+    """Nesting depth of each span, for indenting the breakdown"""
+    depths = {trace.root.span_id: 0}
+    for span in trace.spans[1:]:
+        depths[span.span_id] = depths.get(span.parent_id, 0) + 1
+    return depths
+
+def show_trace_panel(limit=10):
+    """Sidebar panel listing the slowest recent traces in this server process (TRACE_PANEL=1)"""
+    traces = get_slowest_traces(limit)
+    with st.sidebar.expander("🐢 Slowest traces", expanded=False):
+        if not traces:
+            st.caption("No traces recorded yet.")
+            return
+        for trace in traces:
+            st.markdown(f"**{trace.name}** · {trace.duration * 1000:.0f} ms · {len(trace.spans)} spans")
+            depths = _span_depths(trace)
+            rows = []
+            for span in sorted(trace.spans[1:], key=lambda s: s.start):
+                rows.append({
+                    "span": "· " * (depths[span.span_id] - 1) + span.name,
+                    "start ms": round((span.start - trace.root.start) * 1000, 1),
+                    "ms": round(span.duration * 1000, 1),
+                    "error": span.error or "",
+                })
+            if rows:
+                st.dataframe(rows, hide_index=True, use_container_width=True)
+            if trace.dropped_spans:
+                st.caption(f"{trace.dropped_spans} more spans were dropped")
+            st.caption(f"trace {trace.trace_id}")
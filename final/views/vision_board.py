@@ -4,6 +4,12 @@ import streamlit as st
 from models.vision_board import VisionBoard
 from utils.theme import apply_theme_aware_styles
 from utils.db import save_vision_board_customizations, load_vision_board_customizations
+from utils.blobs import to_reference
+from utils.log import get_logger
+from utils.tracing import span
+
+logger = get_logger(__name__)
+
 # from utils.vision_board import (
 #     save_uploaded_image, 
 #     save_image_from_url, 
@@ -12,6 +18,13 @@ from utils.db import save_vision_board_customizations, load_vision_board_customi
 #     available_themes
 # )
 
+def load_customizations(user_id):
+    """Load saved customizations with background images swapped for static file references"""
+    customizations = load_vision_board_customizations(user_id)
+    for settings in customizations.values():
+        settings["bg_image"] = to_reference(settings["bg_image"])
+    return customizations
+
 def show_vision_board():
     """Display the vision board page with new UI focused on customization"""
     if "user_id" not in st.session_state:
@@ -126,7 +139,7 @@ def show_vision_board():
     # Initialize session state variables
     if "show_vision_board_creator" not in st.session_state:
         # Load saved customizations from database
-        saved_customizations = load_vision_board_customizations(user_id)
+        saved_customizations = load_customizations(user_id)
         if saved_customizations:
             st.session_state.show_vision_board_creator = True
             st.session_state.category_customizations = saved_customizations
@@ -141,7 +154,7 @@ def show_vision_board():
         st.session_state.vision_board_theme = current_theme or "default"
     if "category_customizations" not in st.session_state:
         # Load saved customizations from database
-        st.session_state.category_customizations = load_vision_board_customizations(user_id)
+        st.session_state.category_customizations = load_customizations(user_id)
     
     # Ensure all existing categories have the description field
     for key in st.session_state.category_customizations:
@@ -251,6 +264,7 @@ def show_vision_board():
                         if save_vision_board_customizations(user_id, st.session_state.category_customizations):
                             st.rerun()
                     except Exception as e:
+                        logger.exception("Error saving vision board customizations")
                         st.error("Failed to save changes. Please try again.")
         
         # Empty space for better layout
@@ -352,6 +366,7 @@ def show_vision_board():
                                                 if save_vision_board_customizations(user_id, st.session_state.category_customizations):
                                                     st.rerun()
                                             except Exception as e:
+                                                logger.exception("Error saving vision board changes")
                                                 st.error("Failed to save changes. Please try again.")
                                     
                                     with custom_col2:
@@ -398,6 +413,7 @@ def show_vision_board():
                                                 if save_vision_board_customizations(user_id, st.session_state.category_customizations):
                                                     st.rerun()
                                             except Exception as e:
+                                                logger.exception("Error saving vision board changes")
                                                 st.error("Failed to save changes. Please try again.")
 
                                     # Add description customization
@@ -416,6 +432,7 @@ def show_vision_board():
                                             if save_vision_board_customizations(user_id, st.session_state.category_customizations):
                                                 st.rerun()
                                         except Exception as e:
+                                            logger.exception("Error saving vision board changes")
                                             st.error("Failed to save changes. Please try again.")
 
                                     # Add background image upload option
@@ -436,21 +453,28 @@ def show_vision_board():
                                         from io import BytesIO
                                         
                                         # Read the file and encode it
-                                        bytes_data = uploaded_file.getvalue()
-                                        b64str = base64.b64encode(bytes_data).decode()
+                                        with span("image.encode", bytes=uploaded_file.size):
+                                            bytes_data = uploaded_file.getvalue()
+                                            b64str = base64.b64encode(bytes_data).decode()
                                         
                                         # Set the image in the customization data
                                         file_ext = uploaded_file.name.split(".")[-1]
                                         img_str = f"data:image/{file_ext};base64,{b64str}"
                                         
-                                        # Update the bg_image in session state
-                                        st.session_state.category_customizations[cat_key]["bg_image"] = img_str
-                                        # Automatically save the change
-                                        try:
-                                            if save_vision_board_customizations(user_id, st.session_state.category_customizations):
-                                                st.success("Background image uploaded successfully!")
-                                        except Exception as e:
-                                            st.error("Failed to save changes. Please try again.")
+                                        # The uploader keeps its file across reruns, so only save a new image
+                                        img_ref = to_reference(img_str)
+                                        if img_ref != st.session_state.category_customizations[cat_key]["bg_image"]:
+                                            # Update the bg_image in session state
+                                            st.session_state.category_customizations[cat_key]["bg_image"] = img_str
+                                            # Automatically save the change
+                                            try:
+                                                if save_vision_board_customizations(user_id, st.session_state.category_customizations):
+                                                    # Once stored, session state only needs a reference to the image
+                                                    st.session_state.category_customizations[cat_key]["bg_image"] = img_ref
+                                                    st.success("Background image uploaded successfully!")
+                                            except Exception as e:
+                                                logger.exception("Error saving vision board changes")
+                                                st.error("Failed to save changes. Please try again.")
                                     
                                     # Option to remove the background image if one exists
                                     if st.session_state.category_customizations[cat_key]["bg_image"] is not None:
@@ -461,6 +485,7 @@ def show_vision_board():
                                                 if save_vision_board_customizations(user_id, st.session_state.category_customizations):
                                                     st.rerun()
                                             except Exception as e:
+                                                logger.exception("Error saving vision board changes")
                                                 st.error("Failed to save changes. Please try again.")
                                     
                                     # Add a "Done" button to close the customization panel
@@ -485,6 +510,7 @@ def show_vision_board():
                                                 if save_vision_board_customizations(user_id, st.session_state.category_customizations):
                                                     st.rerun()
                                             except Exception as e:
+                                                logger.exception("Error saving vision board changes")
                                                 st.error("Failed to save changes. Please try again.")
                                 
                                 # Get the category-specific style settings
@@ -666,6 +692,7 @@ def show_vision_board():
                     st.session_state.adding_item_to_category = None
                     st.rerun()
                 except Exception as e:
+                    logger.exception("Error adding vision board item")
                     st.error(f"Error adding vision board item: {str(e)}")
         
         # Handle cancel button